@@ -0,0 +1,298 @@
+"""
+扩展性基准测试：由仓库自带的Mn2N.vasp生成 n×n×m 超胞，分别计时建模和能带计算的各个阶段，
+扫描原子数和k点数，结果写入JSON文件，并对每个阶段拟合随原子数（和k点数）变化的标度指数
+
+用法:
+    python benchmarks/bench_scaling.py --sizes 1x1x1,2x2x1,4x4x1 --nk 100,1000 --output results.json
+
+make_supercell(poscar_data, repeats) 生成超胞的结构数据
+
+write_poscar(poscar_data, filename) 把结构数据写成POSCAR文件
+
+supercell_parameters(repeats, poscar) 基础参数按超胞扩展磁序和在位能
+
+time_stage(func, repeat) 多次运行取最短时间
+
+benchmark_structure(params, nk_list, repeat, with_pythtb, workdir) 对一个超胞计时所有阶段
+
+fit_exponent(x, y) 在双对数坐标下拟合标度指数
+
+
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+# 直接从源码目录运行时使用仓库中的pyamtb
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from pyamtb.parameters import Parameters
+from pyamtb.read_datas import read_poscar
+from pyamtb.structure import clear_structure_cache
+from pyamtb.hamiltonian import BlochHamiltonian
+from pyamtb.hoppings import HoppingTable
+from pyamtb.plotting import plot_bands
+from pyamtb.tight_binding_model import (calculate_all_couplings, remove_duplicate_hoppings, onsite_terms,
+                                        adjust_degenerate_bands, check_flat_bands)
+
+# 基准结构，与tests中的Mn2N模型相同的参数
+BASE_POSCAR = os.path.join(ROOT, "Mn2N.vasp")
+BASE_SETTINGS = {
+    "use_elements": ["Mn", "N"],
+    "t0_distance": 2.5,
+    "maxdistance": 2.6,
+    "mindist": 0.1,
+    "dimk": 2,
+    "nspin": 2,
+    "magnetic_order": "+-0",
+    "onsite_energy": [0.5, 0.5, 0.7],
+    "energy_threshold": 1e-5,
+}
+
+# 阶段名，顺序即计时顺序
+STAGES = ["read_poscar", "calculate_all_couplings", "remove_duplicate_hoppings", "set_hop", "assemble",
+          "solve_all", "adjust_degenerate_bands", "check_flat_bands", "plot"]
+
+# 与k点数有关的阶段
+K_STAGES = ["solve_all", "adjust_degenerate_bands", "check_flat_bands", "plot"]
+
+
+def make_supercell(poscar_data, repeats):
+    """
+    生成 n1×n2×n3 超胞，原子按 (原胞中的原子, 平移) 排列，同种元素仍然相邻
+
+    参数:
+        poscar_data (dict): read_poscar的返回值（分数坐标）
+        repeats (tuple): 三个方向的重复次数
+
+    返回:
+        dict: 超胞的结构数据，键与read_poscar相同
+    """
+    repeats = np.asarray(repeats, dtype=int)
+    shifts = np.stack(np.meshgrid(*[np.arange(n) for n in repeats], indexing="ij"), axis=-1).reshape(-1, 3)
+    coords = (poscar_data["coordinates"][:, None, :] + shifts[None]) / repeats
+    ncell = len(shifts)
+    return {
+        "comment": f"{poscar_data['comment']} {'x'.join(map(str, repeats))} supercell",
+        "scale": 1,
+        "lattice": poscar_data["lattice"] * repeats[:, None],
+        "elements": list(poscar_data["elements"]),
+        "atom_counts": [n * ncell for n in poscar_data["atom_counts"]],
+        "total_atoms": poscar_data["total_atoms"] * ncell,
+        "is_direct": True,
+        "coordinates": coords.reshape(-1, 3),
+        "atom_symbols": [s for s in poscar_data["atom_symbols"] for _ in range(ncell)],
+    }
+
+
+def write_poscar(poscar_data, filename):
+    """把分数坐标的结构数据写成POSCAR文件"""
+    lines = [poscar_data["comment"], "1.0"]
+    lines += [" ".join(f"{x:.10f}" for x in row) for row in poscar_data["lattice"]]
+    lines += [" ".join(poscar_data["elements"]), " ".join(map(str, poscar_data["atom_counts"])), "Direct"]
+    lines += [" ".join(f"{x:.10f}" for x in row) for row in poscar_data["coordinates"]]
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def supercell_parameters(repeats, poscar):
+    """
+    基础参数按超胞扩展：每个原子的磁序和在位能重复到它的所有平移像上
+
+    参数:
+        repeats (tuple): 三个方向的重复次数
+        poscar (str): 超胞POSCAR文件
+
+    返回:
+        Parameters: 参数实例
+    """
+    ncell = int(np.prod(repeats))
+    params = Parameters()
+    for key, value in BASE_SETTINGS.items():
+        setattr(params, key, value)
+    params.poscar = poscar
+    params.magnetic_order = "".join(c * ncell for c in BASE_SETTINGS["magnetic_order"])
+    params.onsite_energy = list(np.repeat(BASE_SETTINGS["onsite_energy"], ncell))
+    params.is_print_tb_model = params.is_print_tb_model_hop = False
+    return params
+
+
+def time_stage(func, repeat=3):
+    """
+    运行func repeat次，返回最短的墙钟时间和最后一次的返回值
+
+    参数:
+        func (callable): 无参数的函数
+        repeat (int): 运行次数
+
+    返回:
+        tuple: (秒数, 返回值)
+    """
+    best, result = float("inf"), None
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def benchmark_structure(params, nk_list, repeat=3, with_pythtb=True, workdir="."):
+    """
+    对一个超胞计时所有阶段，与k点数有关的阶段对nk_list中的每个值分别计时
+
+    参数:
+        params (Parameters): supercell_parameters的返回值
+        nk_list (list): k路径上的点数
+        repeat (int): 每个阶段运行的次数，取最短时间
+        with_pythtb (bool): 是否计时pythtb的set_hop建模（大超胞时很慢）
+        workdir (str): 绘图输出目录
+
+    返回:
+        list: 每个k点数一条记录，包含原子数、态数、跃迁数和各阶段的秒数
+    """
+    def read():
+        clear_structure_cache()
+        return read_poscar(params.poscar, selected_elements=params.use_elements)
+
+    t_read, poscar_data = time_stage(read, repeat)
+    t_couplings, couplings = time_stage(
+        lambda: calculate_all_couplings(poscar_data, params.use_elements, params=params), repeat)
+    t_dedup, unique = time_stage(lambda: remove_duplicate_hoppings(couplings), repeat)
+    table = HoppingTable.from_couplings(unique)
+    lattice, coords = poscar_data["lattice"] / params.a0, poscar_data["coordinates"]
+    onsite = onsite_terms(params, len(coords))
+
+    t_set_hop = None
+    if with_pythtb:
+        try:
+            from pythtb import tb_model
+
+            def set_hop():
+                model = tb_model(params.dimk, params.dimr, lattice, coords, nspin=params.nspin)
+                table.set_hops(model)
+                return model
+            t_set_hop, _ = time_stage(set_hop, repeat)
+        except ImportError:
+            pass
+    t_assemble, ham = time_stage(lambda: BlochHamiltonian.from_hopping_table(
+        table, lattice, coords, onsite, params.dimk, params.nspin), repeat)
+
+    records = []
+    for nk in nk_list:
+        k_vec, k_dist, k_node = ham.k_path(params.kpath, nk)
+        t_solve, evals = time_stage(lambda: ham.solve_all(k_vec), repeat)
+        t_degenerate, _ = time_stage(lambda: adjust_degenerate_bands(
+            *ham.solve_all(k_vec, eig_vectors=True), energy_threshold=params.energy_threshold), repeat)
+        t_flat, _ = time_stage(lambda: check_flat_bands(evals), repeat)
+        t_plot, _ = time_stage(lambda: plot_bands(os.path.join(workdir, "bands.png"), k_dist, evals, k_node,
+                                                   params.klabel), repeat)
+        records.append({
+            "natoms": len(coords),
+            "nstates": ham.nstate,
+            "nhoppings": len(table),
+            "nk": len(k_vec),
+            "read_poscar": t_read,
+            "calculate_all_couplings": t_couplings,
+            "remove_duplicate_hoppings": t_dedup,
+            "set_hop": t_set_hop,
+            "assemble": t_assemble,
+            # solve_all之外的eig_vectors求解计入adjust_degenerate_bands
+            "solve_all": t_solve,
+            "adjust_degenerate_bands": t_degenerate,
+            "check_flat_bands": t_flat,
+            "plot": t_plot,
+        })
+    return records
+
+
+def fit_exponent(x, y):
+    """
+    在双对数坐标下用最小二乘拟合 y ∝ x^p，返回p；有效点少于两个或x不变时返回None
+
+    参数:
+        x, y (list): 自变量和计时，y中的None和非正值被忽略
+    """
+    points = [(a, b) for a, b in zip(x, y) if b is not None and b > 0 and a > 0]
+    if len(points) < 2 or len({a for a, _ in points}) < 2:
+        return None
+    logx, logy = np.log([a for a, _ in points]), np.log([b for _, b in points])
+    return float(np.polyfit(logx, logy, 1)[0])
+
+
+def scaling_exponents(records):
+    """对每个阶段拟合随原子数（k点数取最大值时）和随k点数（原子数取最大值时）的标度指数"""
+    nk_max = max(r["nk"] for r in records)
+    natoms_max = max(r["natoms"] for r in records)
+    by_atoms = [r for r in records if r["nk"] == nk_max]
+    by_k = [r for r in records if r["natoms"] == natoms_max]
+    return {
+        "natoms": {stage: fit_exponent([r["natoms"] for r in by_atoms], [r[stage] for r in by_atoms])
+                   for stage in STAGES},
+        "nk": {stage: fit_exponent([r["nk"] for r in by_k], [r[stage] for r in by_k]) for stage in K_STAGES},
+    }
+
+
+def _parse_sizes(text):
+    """"1x1x1,2x2x1" -> [(1, 1, 1), (2, 2, 1)]"""
+    return [tuple(int(n) for n in item.lower().split("x")) for item in text.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scaling benchmark on Mn2N supercells")
+    parser.add_argument("--sizes", type=str, default="1x1x1,2x2x1,4x4x1,6x6x1",
+                        help='Supercells, e.g. "1x1x1,2x2x1,4x4x2"')
+    parser.add_argument("--nk", type=str, default="100,1000", help='k-points along the path, e.g. "100,1000"')
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage, the fastest is kept")
+    parser.add_argument("--pythtb-max-atoms", type=int, default=200,
+                        help="Skip timing pythtb set_hop above this many atoms")
+    parser.add_argument("--output", type=str, default="benchmark_results.json", help="JSON output file")
+    args = parser.parse_args(argv)
+
+    sizes = _parse_sizes(args.sizes)
+    nk_list = [int(n) for n in args.nk.split(",")]
+    base = read_poscar(BASE_POSCAR)
+    records = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for repeats in sizes:
+            poscar = os.path.join(workdir, "POSCAR_" + "x".join(map(str, repeats)))
+            write_poscar(make_supercell(base, repeats), poscar)
+            params = supercell_parameters(repeats, poscar)
+            with_pythtb = base["total_atoms"] * int(np.prod(repeats)) <= args.pythtb_max_atoms
+            for record in benchmark_structure(params, nk_list, args.repeat, with_pythtb, workdir):
+                record["supercell"] = list(repeats)
+                records.append(record)
+                print(f"{'x'.join(map(str, repeats)):>8} atoms={record['natoms']:<5} nk={record['nk']:<6} "
+                      + " ".join(f"{stage}={record[stage]:.4f}" for stage in STAGES if record[stage] is not None))
+
+    result = {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+        },
+        "records": records,
+        "scaling": scaling_exponents(records),
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print("Scaling exponents vs atoms:", {k: v and round(v, 2) for k, v in result["scaling"]["natoms"].items()})
+    print("Scaling exponents vs k-points:", {k: v and round(v, 2) for k, v in result["scaling"]["nk"].items()})
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
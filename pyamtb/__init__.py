@@ -2,12 +2,19 @@
 pyamtb - A Python package for tight-binding model calculations
 """
 
+import importlib
+
 __version__ = "0.1.1"
 
-from .parameters import Parameters
-from .read_datas import read_poscar, read_parameters
-from .tight_binding_model import calculate_band_structure, create_pythtb_model
-from .check_distance import calculate_distances
+# 公开的名字在第一次访问时才导入所在的子模块，`import pyamtb` 不会加载matplotlib、pythtb等重量级依赖
+_LAZY_ATTRIBUTES = {
+    'Parameters': 'parameters',
+    'read_poscar': 'read_datas',
+    'read_parameters': 'read_datas',
+    'calculate_band_structure': 'tight_binding_model',
+    'create_pythtb_model': 'tight_binding_model',
+    'calculate_distances': 'check_distance',
+}
 
 __all__ = [
     'Parameters',
@@ -16,4 +23,16 @@ __all__ = [
     'calculate_band_structure',
     'create_pythtb_model',
     'calculate_distances'
-] 
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(f".{_LAZY_ATTRIBUTES[name]}", __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
@@ -0,0 +1,252 @@
+"""
+批量计算：对一个目录（或通配符）下的所有结构，用同一个参数文件在进程池中依次做距离分析、建模、能带和态密度计算，
+每个结构的失败互不影响，结果汇总到一张表中
+
+find_structures(pattern) 由目录或通配符找出结构文件
+
+band_gap(evals, fermi_energy) 由本征值计算费米能处的能隙
+
+run_structure(poscar, params, output_dir, name, options) 计算一个结构，返回汇总表的一行
+
+run_batch(pattern, params, output_dir, workers, options) 在进程池中计算所有结构，返回汇总表
+
+save_summary(rows, filename) 把汇总表保存为CSV文件
+
+print_summary(rows) 打印汇总表
+
+
+"""
+
+import copy
+import csv
+import glob
+import os
+import time
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .parallel import limit_blas_threads, limit_worker_threads
+
+# 目录中被视为结构文件的文件名：扩展名为.vasp，或以POSCAR/CONTCAR开头
+STRUCTURE_EXTENSIONS = (".vasp",)
+STRUCTURE_PREFIXES = ("POSCAR", "CONTCAR")
+
+# 汇总表的列
+SUMMARY_COLUMNS = ["name", "status", "natoms", "nn_distance", "nn_count", "n_hoppings", "band_gap",
+                   "max_spin_splitting", "nodal_pattern", "n_flat_bands", "dos_at_fermi",
+                   "t_distance", "t_model", "t_bands", "t_splitting", "t_dos", "t_total", "error"]
+
+# 默认的批量计算选项
+DEFAULT_OPTIONS = {
+    "fermi_energy": 0.0,
+    "split_mesh": 24,
+    "split_levels": 3,
+    "dos": False,
+}
+
+
+def find_structures(pattern):
+    """
+    由目录或通配符找出结构文件
+
+    参数:
+        pattern (str): 目录（取其中扩展名为.vasp或以POSCAR/CONTCAR开头的文件）或通配符
+
+    返回:
+        list: 排序后的文件路径
+    """
+    if os.path.isdir(pattern):
+        paths = [os.path.join(pattern, name) for name in os.listdir(pattern)
+                 if name.endswith(STRUCTURE_EXTENSIONS) or name.startswith(STRUCTURE_PREFIXES)]
+    else:
+        paths = glob.glob(pattern)
+    return sorted(path for path in paths if os.path.isfile(path))
+
+
+def _unique_names(paths):
+    """每个结构的输出文件名（不含扩展名），同名时加上序号"""
+    names, seen = [], {}
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+    return names
+
+
+def band_gap(evals, fermi_energy=0.0):
+    """
+    费米能处的能隙：有能带穿过费米能时为0，否则为费米能以上最低能量与以下最高能量之差
+
+    参数:
+        evals (numpy.ndarray): 本征值，形状为 (nband, nk)
+        fermi_energy (float): 费米能（eV）
+
+    返回:
+        float: 能隙（eV），所有态都在费米能同一侧时为nan
+    """
+    evals = np.asarray(evals)
+    below, above = evals <= fermi_energy, evals > fermi_energy
+    if not below.any() or not above.any():
+        return float("nan")
+    if (below.any(axis=1) & above.any(axis=1)).any():
+        return 0.0
+    return float(evals[above].min() - evals[below].max())
+
+
+def run_structure(poscar, params, output_dir, name, options=None):
+    """
+    计算一个结构：距离分析、建模、能带（以及自旋劈裂、态密度），出错时记录错误而不抛出
+
+    参数:
+        poscar (str): 结构文件路径
+        params (Parameters): 基础参数，不会被修改
+        output_dir (str): 能带图、数据和态密度的输出目录
+        name (str): 输出文件名（不含扩展名）
+        options (dict): 批量计算选项，见DEFAULT_OPTIONS
+
+    返回:
+        dict: 汇总表的一行，键为SUMMARY_COLUMNS
+    """
+    from .read_datas import read_poscar
+    from .check_distance import distance_shells
+    from .tight_binding_model import create_bloch_hamiltonian, calculate_band_structure, check_flat_bands
+
+    options = {**DEFAULT_OPTIONS, **(options or {})}
+    row = {column: "" for column in SUMMARY_COLUMNS}
+    row.update(name=name, status="ok")
+    start = time.perf_counter()
+    stage = "distance"
+    try:
+        params = copy.deepcopy(params)
+        params.poscar = poscar
+        params.output_filename = os.path.join(output_dir, name)
+        # 工作进程之间已经并行，每个结构内部不再开进程，也不逐条打印跃迁和平带
+        params.workers = 1
+        params.is_print_tb_model = params.is_print_tb_model_hop = False
+        check_flat = params.is_check_flat_bands
+        params.is_check_flat_bands = False
+
+        t = time.perf_counter()
+        poscar_data = read_poscar(poscar)
+        missing = [element for element in params.use_elements if element not in poscar_data["elements"]]
+        if missing:
+            raise ValueError(f"use_elements 中的元素 {missing} 不在 {poscar} 中")
+        selected = read_poscar(poscar, selected_elements=params.use_elements)
+        shells = distance_shells(selected, cutoff=params.maxdistance, dimk=params.dimk)
+        row.update(natoms=selected["total_atoms"],
+                   nn_distance=shells[0]["distance"] if shells else "",
+                   nn_count=shells[0]["count"] if shells else 0,
+                   t_distance=time.perf_counter() - t)
+
+        stage, t = "model", time.perf_counter()
+        ham = create_bloch_hamiltonian(params)
+        row.update(n_hoppings=len(ham.hop_i), t_model=time.perf_counter() - t)
+
+        stage, t = "bands", time.perf_counter()
+        bands = calculate_band_structure(ham, params)
+        evals = np.asarray(bands["evals"])
+        row["band_gap"] = band_gap(evals, options["fermi_energy"])
+        if check_flat:
+            row["n_flat_bands"] = len({flat["band_index"] for flat in check_flat_bands(evals)})
+        row["t_bands"] = time.perf_counter() - t
+
+        if ham.spin_diagonal:
+            from .splitting import spin_splitting_map
+            stage, t = "splitting", time.perf_counter()
+            split = spin_splitting_map(ham, options["split_mesh"], levels=options["split_levels"])
+            row.update(max_spin_splitting=split["max_splitting"], nodal_pattern=split.get("nodal_pattern", ""),
+                       t_splitting=time.perf_counter() - t)
+
+        if options["dos"]:
+            from .dos import calculate_dos, save_dos
+            stage, t = "dos", time.perf_counter()
+            energies = np.linspace(params.ylim[0], params.ylim[1], params.dos_num_points)
+            dos = calculate_dos(ham, params.dos_mesh, energies, params.dos_method, params.dos_smearing)
+            save_dos(dos, f"{params.output_filename}_dos.dat")
+            row.update(dos_at_fermi=float(np.interp(options["fermi_energy"], dos["energies"], dos["dos"])),
+                       t_dos=time.perf_counter() - t)
+    except Exception as e:
+        row.update(status=f"failed ({stage})", error=f"{type(e).__name__}: {e}")
+    row["t_total"] = time.perf_counter() - start
+    return row
+
+
+def run_batch(pattern, params, output_dir=".", workers=1, options=None):
+    """
+    对所有结构运行run_structure，每个结构在一个工作进程中计算，一个结构失败（包括工作进程崩溃）不影响其他结构
+
+    参数:
+        pattern (str): 目录或通配符，见find_structures
+        params (Parameters): 基础参数
+        output_dir (str): 输出目录，不存在时创建
+        workers (int): 进程数
+        options (dict): 批量计算选项，见DEFAULT_OPTIONS
+
+    返回:
+        list: 汇总表，每个结构一行，顺序与结构文件相同
+    """
+    paths = find_structures(pattern)
+    if not paths:
+        raise ValueError(f"没有找到结构文件: {pattern}")
+    os.makedirs(output_dir, exist_ok=True)
+    names = _unique_names(paths)
+    workers = 1 if workers is None else min(int(workers), len(paths))
+
+    if workers <= 1:
+        return [run_structure(path, params, output_dir, name, options) for path, name in zip(paths, names)]
+
+    rows = []
+    with limit_blas_threads(1), ProcessPoolExecutor(
+            max_workers=workers, mp_context=get_context("spawn"), initializer=limit_worker_threads) as pool:
+        futures = [pool.submit(run_structure, path, params, output_dir, name, options)
+                   for path, name in zip(paths, names)]
+        for name, future in zip(names, futures):
+            try:
+                rows.append(future.result())
+            except Exception as e:
+                row = {column: "" for column in SUMMARY_COLUMNS}
+                row.update(name=name, status="failed (worker)", error=f"{type(e).__name__}: {e}")
+                rows.append(row)
+    return rows
+
+
+def _format(value):
+    """汇总表中数值的显示格式"""
+    if isinstance(value, float):
+        return "nan" if np.isnan(value) else f"{value:.6g}"
+    return str(value)
+
+
+def save_summary(rows, filename):
+    """
+    把汇总表保存为CSV文件，列为SUMMARY_COLUMNS
+
+    参数:
+        rows (list): run_batch的返回值
+        filename (str): 输出文件名
+    """
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({key: _format(value) for key, value in row.items()})
+
+
+def print_summary(rows, columns=("name", "status", "natoms", "band_gap", "max_spin_splitting", "nodal_pattern",
+                                 "n_flat_bands", "t_total")):
+    """
+    打印汇总表的主要列，失败的结构另外打印错误信息
+
+    参数:
+        rows (list): run_batch的返回值
+        columns (tuple): 打印的列
+    """
+    table = [list(columns)] + [[_format(row[column]) for column in columns] for row in rows]
+    widths = [max(len(line[i]) for line in table) for i in range(len(columns))]
+    for line in table:
+        print("  ".join(cell.ljust(width) for cell, width in zip(line, widths)))
+    for row in rows:
+        if row["error"]:
+            print(f"{row['name']}: {row['error']}")
@@ -0,0 +1,211 @@
+"""
+Berry曲率与反常霍尔电导：∂H/∂k由跃迁表解析得到（BlochHamiltonian.velocity），与本征值在同一批k点上一起计算，
+用Kubo公式求每条能带的Berry曲率，每个k点只需一次对角化；在网格上积分得到σ_xy，可以在热点附近逐级加密
+
+berry_curvature(ham, k_list, direction, tolerance) 批量计算每条能带的Berry曲率 Ω_n^{αβ}(k)
+
+occupation(evals, fermi_energy, temperature) 费米-狄拉克占据数
+
+anomalous_hall_conductivity(ham, mesh, fermi_energy, temperature, direction, levels, zoom, refine_fraction) 网格积分σ_αβ，
+可以对|Ω|贡献最大的格子逐级加密
+
+ahc_prefactor(ham) 由 Σ w Ω 换算到σ的系数和单位
+
+
+"""
+
+import numpy as np
+
+from .dos import monkhorst_pack
+from .hamiltonian import CHUNK_ELEMENTS
+
+# e²/ħ（S）
+E2_HBAR = 2.434134807e-4
+
+
+def _block_curvature(ham, k_list, direction, tolerance):
+    """单个块（nspin=1或非自旋分块对角的模型）的本征值和Berry曲率，形状均为 (nstate, nk)"""
+    alpha, beta = direction
+    evals, vecs = np.linalg.eigh(ham.hamiltonian(k_list))
+    vel = ham.velocity(k_list)[:, [alpha, beta]]
+    # 速度矩阵变换到本征态基: <n|∂H|m>
+    v = np.einsum("kin,kaij,kjm->kanm", vecs.conj(), vel, vecs, optimize=True)
+    delta = evals[:, :, None] - evals[:, None, :]
+    with np.errstate(divide="ignore"):
+        inv = np.where(np.abs(delta) > tolerance, 1.0 / delta ** 2, 0.0)
+    # Ω_n = -2 Im Σ_{m≠n} <n|∂αH|m><m|∂βH|n> / (E_n - E_m)²
+    omega = -2.0 * np.einsum("knm,kmn,knm->kn", v[:, 0], v[:, 1], inv).imag
+    return evals.T, omega.T
+
+
+def berry_curvature(ham, k_list, direction=(0, 1), tolerance=1e-8):
+    """
+    用Kubo公式批量计算每条能带的Berry曲率
+
+        Ω_n^{αβ}(k) = -2 Im Σ_{m≠n} <n|∂H/∂k_α|m><m|∂H/∂k_β|n> / (E_n - E_m)²
+
+    k点分块处理以限制内存；共线磁性模型（spin_diagonal）分别计算两个自旋块，结果按能量合并并带有自旋标记。
+
+    参数:
+        ham (BlochHamiltonian): 紧束缚模型
+        k_list (numpy.ndarray): k点的分数坐标，形状为 (nk, dimk)
+        direction (tuple): 笛卡尔方向 (α, β)，默认 (0, 1) 即 Ω_xy
+        tolerance (float): 能量差小于该值的态对（简并态）不计入（eV）
+
+    返回:
+        tuple: (evals, omega, spin)
+            - evals, omega: 本征值和Berry曲率（单位为lattice长度单位的平方），形状为 (nstate, nk)
+            - spin: 自旋标记，形状同上，+1为向上，-1为向下；不是共线磁性模型时为None
+    """
+    k_list = np.asarray(k_list, dtype=float).reshape(-1, ham.dimk)
+    blocks = ham.spin_blocks() if ham.spin_diagonal else [ham]
+    nstate = blocks[0].nstate
+    chunk = max(1, CHUNK_ELEMENTS // max(1, 4 * nstate * nstate + len(ham.hop_i)))
+    results = []
+    for block in blocks:
+        parts = [_block_curvature(block, k_list[start:start + chunk], direction, tolerance)
+                 for start in range(0, len(k_list), chunk)]
+        results.append((np.concatenate([p[0] for p in parts], axis=1),
+                        np.concatenate([p[1] for p in parts], axis=1)))
+    if len(results) == 1:
+        return results[0][0], results[0][1], None
+
+    evals = np.concatenate([results[0][0], results[1][0]])
+    omega = np.concatenate([results[0][1], results[1][1]])
+    spin = np.repeat([1.0, -1.0], nstate)[:, None] * np.ones(evals.shape[1])
+    order = np.argsort(evals, axis=0, kind="stable")
+    return (np.take_along_axis(evals, order, axis=0), np.take_along_axis(omega, order, axis=0),
+            np.take_along_axis(spin, order, axis=0))
+
+
+def occupation(evals, fermi_energy=0.0, temperature=0.0):
+    """
+    占据数：temperature为0时为阶跃函数，否则为费米-狄拉克分布
+
+    参数:
+        evals (numpy.ndarray): 本征值
+        fermi_energy (float or numpy.ndarray): 费米能（eV），数组时在最后一维增加一维
+        temperature (float): k_B T（eV）
+
+    返回:
+        numpy.ndarray: 占据数，形状为 evals.shape 或 evals.shape + (n_fermi,)
+    """
+    mu = np.asarray(fermi_energy, dtype=float)
+    x = np.asarray(evals)[..., None] - mu if mu.ndim else np.asarray(evals) - mu
+    if temperature <= 0:
+        return (x <= 0).astype(float)
+    return 0.5 * (1.0 - np.tanh(0.5 * x / temperature))
+
+
+def ahc_prefactor(ham):
+    """
+    由布里渊区平均值 Σ_k w_k Σ_n f_n Ω_n（Σ w_k = 1）换算到σ的系数：
+
+        σ = -(e²/ħ) ∫ d^dk/(2π)^d Σ_n f_n Ω_n
+
+    dimk = 2 时σ为面电导，以e²/h为单位（此时 -σ 即Chern数）；dimk = 3 时单位为 S/cm（长度单位为Å）。
+
+    参数:
+        ham (BlochHamiltonian): dimk为2或3的模型
+
+    返回:
+        tuple: (系数, 单位)
+    """
+    lat = ham.lattice[ham.per]
+    if ham.dimk == 2:
+        a1, a2 = (np.pad(v, (0, 3 - len(v))) for v in lat)
+        area = np.linalg.norm(np.cross(a1, a2))
+        return -2 * np.pi / area, "e^2/h"
+    if ham.dimk == 3:
+        volume = abs(np.linalg.det(lat))
+        return -E2_HBAR * 1e8 / volume, "S/cm"
+    raise ValueError(f"反常霍尔电导需要 dimk 为 2 或 3，但得到 {ham.dimk}")
+
+
+def anomalous_hall_conductivity(ham, mesh=100, fermi_energy=0.0, temperature=0.0, direction=(0, 1), levels=0,
+                                zoom=3, refine_fraction=0.02, tolerance=1e-8):
+    """
+    在Monkhorst-Pack网格上积分Berry曲率得到反常霍尔电导σ_αβ
+
+    每个网格点代表以它为中心的一个格子，权重为格子体积。levels > 0 时进行逐级加密：每轮取 |Σ f Ω| × 权重
+    最大的refine_fraction比例的格子（热点），把每个格子分成 zoom^dimk 个子格子并重新计算，子格子也可以在下一轮
+    继续加密。fermi_energy为数组时一次得到σ(μ)，热点按所有费米能中的最大贡献选取。
+    加密针对小能隙附近的尖峰；被积函数光滑时均匀网格本身收敛很快，加密一部分格子反而可能略微增大误差。
+
+    参数:
+        ham (BlochHamiltonian): dimk为2或3的模型
+        mesh (int or list): 粗网格每个周期方向的点数
+        fermi_energy (float or list): 费米能（eV）
+        temperature (float): k_B T（eV）
+        direction (tuple): 笛卡尔方向 (α, β)
+        levels (int): 加密轮数
+        zoom (int): 加密时每个方向的细分数
+        refine_fraction (float): 每轮加密的格子占当前格子数的比例
+        tolerance (float): 见berry_curvature
+
+    返回:
+        dict: 包含
+            - sigma: σ_αβ，形状与fermi_energy相同
+            - sigma_up, sigma_down: 共线磁性模型中两个自旋通道的贡献
+            - unit: σ的单位（dimk=2时为e^2/h，dimk=3时为S/cm）
+            - chern: dimk=2时的Chern数 -σ（以e²/h为单位时）
+            - fermi_energy, mesh, n_evaluated: 费米能、粗网格和计算过的k点数
+    """
+    prefactor, unit = ahc_prefactor(ham)
+    dimk = ham.dimk
+    mesh = [int(n) for n in np.atleast_1d(mesh)]
+    mesh = (mesh * dimk if len(mesh) == 1 else mesh)[:dimk]
+    mu = np.asarray(fermi_energy, dtype=float)
+
+    def integrand(k_points):
+        # 每个k点上 Σ_n f_n Ω_n，按自旋通道分开，形状为 (nk, n_mu, 2)
+        evals, omega, spin = berry_curvature(ham, k_points, direction, tolerance)
+        weighted = occupation(evals, np.atleast_1d(mu), temperature) * omega[..., None]
+        if spin is None:
+            return np.stack([weighted.sum(axis=0), np.zeros_like(weighted[0])], axis=-1)
+        up = spin[..., None] > 0
+        return np.stack([np.where(up, weighted, 0).sum(axis=0), np.where(up, 0, weighted).sum(axis=0)], axis=-1)
+
+    points = monkhorst_pack(mesh)
+    size = np.tile(1.0 / np.asarray(mesh, dtype=float), (len(points), 1))
+    weights = np.full(len(points), 1.0 / len(points))
+    values = integrand(points)
+    n_evaluated = len(points)
+
+    offsets = np.stack(np.meshgrid(*[(np.arange(zoom) + 0.5) / zoom - 0.5] * dimk, indexing="ij"),
+                       axis=-1).reshape(-1, dimk)
+    for _ in range(levels):
+        contribution = np.abs(values.sum(axis=-1)).max(axis=1) * weights
+        n_hot = max(1, int(np.ceil(refine_fraction * len(points))))
+        # 与第n_hot大的贡献相等（对称等价）的格子一起加密，不破坏网格的对称性
+        threshold = np.sort(contribution)[::-1][min(n_hot, len(points)) - 1]
+        hot = np.flatnonzero((contribution >= threshold * (1 - 1e-6)) & (contribution > 0))
+        if not len(hot):
+            break
+        keep = np.ones(len(points), dtype=bool)
+        keep[hot] = False
+        new_points = (points[hot, None, :] + offsets[None] * size[hot, None, :]).reshape(-1, dimk)
+        new_size = np.repeat(size[hot] / zoom, len(offsets), axis=0)
+        new_weights = np.repeat(weights[hot] / len(offsets), len(offsets))
+        new_values = integrand(new_points)
+        n_evaluated += len(new_points)
+        points = np.concatenate([points[keep], new_points])
+        size = np.concatenate([size[keep], new_size])
+        weights = np.concatenate([weights[keep], new_weights])
+        values = np.concatenate([values[keep], new_values])
+
+    total = prefactor * np.einsum("k,kms->ms", weights, values)
+    shape = mu.shape
+    result = {
+        "sigma": total.sum(axis=-1).reshape(shape),
+        "unit": unit,
+        "fermi_energy": mu,
+        "mesh": np.asarray(mesh),
+        "n_evaluated": n_evaluated,
+    }
+    if ham.spin_diagonal:
+        result["sigma_up"] = total[:, 0].reshape(shape)
+        result["sigma_down"] = total[:, 1].reshape(shape)
+    if dimk == 2:
+        result["chern"] = -result["sigma"]
+    return result
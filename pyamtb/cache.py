@@ -0,0 +1,162 @@
+"""
+近邻列表的磁盘缓存：以结构内容和搜索参数的哈希为键，保存为.npz文件
+
+NeighborCache(cache_dir, max_bytes) 按最近使用时间（LRU）淘汰、总大小有上限的缓存目录
+
+NeighborCache.make_key(poscar_data, selected_elements, dimk, mindist, maxdistance, image_range) 计算缓存键
+
+NeighborCache.load(key) 读取并校验缓存，损坏或不匹配的条目会被删除
+
+NeighborCache.store(key, neighbors, n_atoms) 写入缓存并淘汰最久未使用的条目
+
+
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+# 缓存格式版本，修改保存内容时递增，使旧的缓存失效
+CACHE_VERSION = 1
+
+
+class NeighborCache:
+    """
+    保存几何近邻列表 (i, j, R, d) 的缓存目录
+    """
+
+    def __init__(self, cache_dir, max_bytes=512 * 2**20):
+        """
+        参数:
+            cache_dir (str): 缓存目录，不存在时自动创建
+            max_bytes (int): 缓存目录的总大小上限（字节）
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_bytes)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(poscar_data, selected_elements, dimk, mindist, maxdistance, image_range=None):
+        """
+        计算缓存键：结构（晶格、坐标、元素）和近邻搜索参数的SHA-256哈希
+
+        参数:
+            poscar_data (dict): read_poscar返回的结构数据
+            selected_elements (list): 参与建模的元素
+            dimk (int): k空间维度
+            mindist (float): 最小距离
+            maxdistance (float): 最大距离
+            image_range: 格矢量搜索范围，None表示由截断距离自动确定
+
+        返回:
+            str: 十六进制哈希字符串
+        """
+        digest = hashlib.sha256()
+        digest.update(np.ascontiguousarray(poscar_data["lattice"], dtype=np.float64).tobytes())
+        digest.update(np.ascontiguousarray(poscar_data["coordinates"], dtype=np.float64).tobytes())
+        settings = {
+            "version": CACHE_VERSION,
+            "atom_symbols": list(poscar_data["atom_symbols"]),
+            "use_elements": list(selected_elements),
+            "dimk": int(dimk),
+            "mindist": float(mindist),
+            "maxdistance": float(maxdistance),
+            "image_range": image_range,
+        }
+        digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def load(self, key):
+        """
+        读取缓存的近邻列表，命中时更新文件的修改时间（用于LRU淘汰）
+
+        参数:
+            key (str): 缓存键
+
+        返回:
+            tuple: (atom1, atom2, R, distance)，未命中或校验失败时返回None
+        """
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if str(data["key"]) != key or int(data["version"]) != CACHE_VERSION:
+                    raise ValueError("cache key mismatch")
+                atom1, atom2 = data["atom1"], data["atom2"]
+                R, distance = data["R"], data["distance"]
+                n_atoms = int(data["n_atoms"])
+            n = len(atom1)
+            if not (len(atom2) == len(distance) == n and R.shape == (n, 3)):
+                raise ValueError("inconsistent array lengths")
+            if n and (min(atom1.min(), atom2.min()) < 0 or max(atom1.max(), atom2.max()) >= n_atoms):
+                raise ValueError("atom index out of range")
+            if not np.all(np.isfinite(distance)):
+                raise ValueError("non-finite distance")
+        except Exception as e:
+            print(f"缓存文件 {path} 无效，已删除: {e}")
+            self._remove(path)
+            return None
+        os.utime(path)
+        return atom1, atom2, R, distance
+
+    def store(self, key, neighbors, n_atoms):
+        """
+        写入近邻列表，然后按最近使用时间淘汰超出大小上限的条目
+
+        参数:
+            key (str): 缓存键
+            neighbors (tuple): (atom1, atom2, R, distance)
+            n_atoms (int): 结构中的原子数，用于加载时校验索引
+        """
+        atom1, atom2, R, distance = neighbors
+        # 先写入临时文件再重命名，避免并发运行读到不完整的文件
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, key=key, version=CACHE_VERSION, n_atoms=n_atoms,
+                         atom1=atom1, atom2=atom2, R=R, distance=distance)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        self.evict(keep=key)
+
+    def evict(self, keep=None):
+        """
+        删除最久未使用的条目，直到缓存总大小不超过max_bytes
+
+        参数:
+            keep (str): 不删除的缓存键（刚写入的条目）
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npz"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if keep is not None and path == self._path(keep):
+                continue
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
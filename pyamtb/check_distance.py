@@ -1,107 +1,94 @@
-from .tight_binding_model import read_poscar
+from .read_datas import read_poscar
+from .neighbors import cell_list_neighbors
 import numpy as np
 import os
 import tomlkit
 
-def calculate_distances(poscar_filename, element1="Mn", element2="O"):
+def distance_shells(poscar_data, element1=None, element2=None, cutoff=None, decimals=4, dimk=3):
     """
-    计算两种元素之间的所有距离
-    
+    按壳层统计两种元素之间截断距离内的距离，不打印
+
+    格矢量范围由截断距离和晶格几何确定（cell list近邻搜索），小晶胞或斜晶胞中较远的壳层不会遗漏；
+    壳层由四舍五入后的距离经np.unique分组，不逐个保存原子对。
+
+    参数:
+        poscar_data (dict): read_poscar的返回值
+        element1 (str): 第一种元素类型，为None时表示任意元素
+        element2 (str): 第二种元素类型，为None时表示任意元素
+        cutoff (float): 截断距离，默认为最长的晶格矢量长度
+        decimals (int): 划分壳层时距离保留的小数位数
+        dimk (int): 周期方向数，只在前dimk个方向上平移
+
+    返回:
+        list: 每个壳层一个字典，按距离排序，包含
+            - distance: 壳层距离
+            - count: 壳层中的原子对数（多重度）
+            - atom1_index, atom2_index, R_vector: 一个示例原子对
+    """
+    lattice = np.asarray(poscar_data['lattice'], dtype=float)
+    if cutoff is None:
+        cutoff = np.linalg.norm(lattice, axis=1).max()
+
+    # 只在两种元素的原子中搜索近邻
+    symbols = np.asarray(poscar_data["atom_symbols"])
+    match1 = np.ones(len(symbols), dtype=bool) if element1 is None else symbols == element1
+    match2 = np.ones(len(symbols), dtype=bool) if element2 is None else symbols == element2
+    selected = np.flatnonzero(match1 | match2)
+    coords = np.asarray(poscar_data["coordinates"], dtype=float)[selected]
+    atom1, atom2, R_vectors, distance = cell_list_neighbors(coords, lattice, 1e-6, cutoff, dimk, upper=False)
+    keep = match1[selected][atom1] & match2[selected][atom2]
+    atom1, atom2, R_vectors, distance = selected[atom1[keep]], selected[atom2[keep]], R_vectors[keep], distance[keep]
+
+    # 按四舍五入后的距离分组，每个壳层取第一个原子对作为示例
+    shell_distance, first, counts = np.unique(np.round(distance, decimals), return_index=True, return_counts=True)
+    return [{
+        "distance": float(d),
+        "count": int(n),
+        "atom1_index": int(atom1[i]),
+        "atom2_index": int(atom2[i]),
+        "element1": symbols[atom1[i]],
+        "element2": symbols[atom2[i]],
+        "R_vector": R_vectors[i],
+    } for d, n, i in zip(shell_distance, counts, first)]
+
+def calculate_distances(poscar_filename, element1="Mn", element2="O", cutoff=None, decimals=4, dimk=3):
+    """
+    计算两种元素之间截断距离内的所有距离，按壳层（相同距离）统计并打印，见distance_shells
+
     参数:
         poscar_filename (str): POSCAR文件路径
         element1 (str): 第一种元素类型
         element2 (str): 第二种元素类型
-        
+        cutoff (float): 截断距离，默认为最长的晶格矢量长度
+        decimals (int): 划分壳层时距离保留的小数位数
+        dimk (int): 周期方向数，只在前dimk个方向上平移
+
     返回:
-        list: 包含距离信息的列表，按距离排序
+        list: 每个壳层一个字典，按距离排序，见distance_shells
     """
     # 读取POSCAR文件
     poscar_data = read_poscar(poscar_filename)
-    
-    # 获取晶格向量
-    lattice = poscar_data['lattice']
-    
-    
-    # 获取指定元素类型的原子索引和坐标
-    atom_indices1 = [i for i, element in enumerate(poscar_data["atom_symbols"]) if element == element1]
-    atom_indices2 = [i for i, element in enumerate(poscar_data["atom_symbols"]) if element == element2]
-    
-    # 存储所有距离信息
-    all_distances = []
-    
-    # 计算所有可能的原子对之间的距离
-    for idx1, atom1_index in enumerate(atom_indices1):
-        coord1 = poscar_data["coordinates"][atom1_index]
-        
-        for idx2, atom2_index in enumerate(atom_indices2):
-            coord2 = poscar_data["coordinates"][atom2_index]
-            
-            # 考虑周期性边界条件
-            # 生成可能的格矢量偏移
-            for dx in range(-1, 2):
-                for dy in range(-1, 2):
-                    for dz in range(-1, 2):
-                        R = np.array([dx, dy, dz])
-                        
-                        # 计算考虑周期性的距离
-                        diff = coord2 + R - coord1
-                        
-                        # 转换为笛卡尔坐标计算实际距离
-                        diff_cart = np.dot(diff, lattice)
-                        distance = np.linalg.norm(diff_cart)
-                        
-                        all_distances.append({
-                            "atom1_index": atom1_index,
-                            "atom2_index": atom2_index,
-                            "element1": element1,
-                            "element2": element2,
-                            "distance": distance,
-                            "R_vector": R
-                        })
-    
-    # 按距离排序
-    all_distances.sort(key=lambda x: x["distance"])
-    
-    # 按距离统计
-    distance_stats = {}
-    for dist_info in all_distances:
-        # 四舍五入到小数点后4位，便于统计
-        rounded_dist = round(dist_info["distance"], 4)
-        if rounded_dist not in distance_stats:
-            distance_stats[rounded_dist] = {
-                "count": 0,
-                "pairs": []
-            }
-        distance_stats[rounded_dist]["count"] += 1
-        distance_stats[rounded_dist]["pairs"].append((dist_info["atom1_index"], dist_info["atom2_index"], dist_info["R_vector"]))
-    
-    # 将统计结果按距离排序
-    sorted_stats = sorted(distance_stats.items())
-    print("\n距离统计结果:")
-    print(f"{'距离(a.u.)':<12}{'出现次数':<10}{'原子对示例'}")
-    print("-" * 50)
-    for dist, info in sorted_stats:
-        example_pair = info["pairs"][0]
-        print(f"{dist:<12.4f}{info['count']:<10}{example_pair}")
-    
-    return all_distances
+    if cutoff is None:
+        cutoff = np.linalg.norm(poscar_data['lattice'], axis=1).max()
+    shells = distance_shells(poscar_data, element1, element2, cutoff, decimals, dimk)
+
+    print(f"\n距离统计结果 ({element1}-{element2}, 截断距离 {cutoff:.4f}):")
+    print_distances(shells)
+    return shells
 
-def print_distances(distances, max_count=100):
+def print_distances(shells, max_count=100):
     """
-    打印距离信息
-    
+    打印壳层统计表：距离、出现次数（多重度）和一个示例原子对
+
     参数:
-        distances (list): 距离信息列表
-        max_count (int): 最多显示的距离数量
+        shells (list): calculate_distances返回的壳层列表
+        max_count (int): 最多显示的壳层数量
     """
-    print(f"{'原子1':<8}{'原子2':<8}{'元素1':<6}{'元素2':<6}{'距离(Å)':<10}{'距离(a.u.)':<10}{'格矢量':<15}")
-    print("-" * 70)
-    
-    for i, dist_info in enumerate(distances[:max_count]):
-        print(f"{dist_info['atom1_index']:<8}{dist_info['atom2_index']:<8}"
-              f"{dist_info['element1']:<6}{dist_info['element2']:<6}"
-              f"{dist_info['distance']:<10.4f}{dist_info['distance']:<10.4f}"
-              f"{dist_info['R_vector']}")
+    print(f"{'距离(a.u.)':<12}{'出现次数':<10}{'原子对示例 (原子1, 原子2, 格矢量)'}")
+    print("-" * 50)
+    for shell in shells[:max_count]:
+        example = (shell["atom1_index"], shell["atom2_index"], shell["R_vector"].tolist())
+        print(f"{shell['distance']:<12.4f}{shell['count']:<10}{example}")
 
 if __name__ == "__main__":
     # 示例用法
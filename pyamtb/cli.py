@@ -1,9 +1,7 @@
 import argparse
 import os
-from .tight_binding_model import calculate_band_structure, create_pythtb_model
-from .parameters import Parameters
-from .read_datas import read_poscar
-from .check_distance import calculate_distances
+
+# 各子命令的计算模块在解析参数之后、对应分支内导入，--help 和 --version 不加载numpy等依赖
 
 def main():
     parser = argparse.ArgumentParser(description='PyAMTB - Tight-binding model calculations')
@@ -16,41 +14,326 @@ def main():
     calc_parser.add_argument('--config', type=str, help='Path to configuration file')
     calc_parser.add_argument('--poscar', type=str, help='Path to POSCAR file')
     calc_parser.add_argument('--output', type=str, help='Output filename')
+    calc_parser.add_argument('--workers', type=int, help='Number of processes for k-point diagonalization')
+    calc_parser.add_argument('--cache-dir', type=str, help='Directory for caching neighbor lists between runs')
+    calc_parser.add_argument('--store', type=str, help='Directory for memory-mapped eigenvalue/eigenvector output')
+    calc_parser.add_argument('--data', type=str, choices=['npz', 'csv'], help='Also save the bands, k distances, nodes and labels in this format')
+    calc_parser.add_argument('--no-plot', action='store_true', help='Skip rendering the band plot')
+    calc_parser.add_argument('--profile', type=str, metavar='REPORT.json', help='Time each stage (wall time, peak memory, sizes) and save a JSON report')
+    calc_parser.add_argument('--cprofile', type=str, metavar='STAGE', help='Also run cProfile over this stage (e.g. diagonalize, set_hop) and dump the stats next to the report')
+    calc_parser.add_argument('--no-profile-memory', action='store_true', help='Do not trace memory with tracemalloc while profiling')
+    
+    # Hopping-parameter sweep command
+    sweep_parser = subparsers.add_parser('sweep', help='Scan t0, hopping_decay and t0_distance and save all bands to one .npz file')
+    sweep_parser.add_argument('--config', type=str, help='Path to configuration file')
+    sweep_parser.add_argument('--poscar', type=str, help='Path to POSCAR file')
+    sweep_parser.add_argument('--t0', type=str, help='t0 values, "start:stop:num" or a comma-separated list')
+    sweep_parser.add_argument('--hopping-decay', type=str, help='hopping_decay values, "start:stop:num" or a comma-separated list')
+    sweep_parser.add_argument('--t0-distance', type=str, help='t0_distance values, "start:stop:num" or a comma-separated list')
+    sweep_parser.add_argument('--output', type=str, help='Output .npz filename')
+    sweep_parser.add_argument('--workers', type=int, help='Number of processes for the parameter grid')
+    sweep_parser.add_argument('--cache-dir', type=str, help='Directory for caching neighbor lists between runs')
+    
+    # Density of states command
+    dos_parser = subparsers.add_parser('dos', help='Calculate the total and spin-resolved density of states')
+    dos_parser.add_argument('--config', type=str, help='Path to configuration file')
+    dos_parser.add_argument('--poscar', type=str, help='Path to POSCAR file')
+    dos_parser.add_argument('--mesh', type=str, help='Monkhorst-Pack mesh, e.g. "200,200"')
+    dos_parser.add_argument('--method', type=str, choices=['gaussian', 'histogram'], help='Broadening method')
+    dos_parser.add_argument('--smearing', type=float, help='Gaussian width (eV)')
+    dos_parser.add_argument('--output', type=str, help='Output text filename')
+    dos_parser.add_argument('--workers', type=int, help='Number of processes for the k-point mesh')
+    dos_parser.add_argument('--cache-dir', type=str, help='Directory for caching neighbor lists between runs')
+    
+    # Fermi surface command
+    fs_parser = subparsers.add_parser('fermi-surface', help='Spin-resolved constant-energy contours on a 2D k-grid (dimk = 2)')
+    fs_parser.add_argument('--config', type=str, help='Path to configuration file')
+    fs_parser.add_argument('--poscar', type=str, help='Path to POSCAR file')
+    fs_parser.add_argument('--energy', type=float, default=0.0, help='Contour energy (eV)')
+    fs_parser.add_argument('--mesh', type=int, default=64, help='Cells per direction on the coarse grid')
+    fs_parser.add_argument('--refine', type=int, default=4, help='Subdivisions per direction of each crossed cell')
+    fs_parser.add_argument('--levels', type=int, default=0, help='Number of refinement passes')
+    fs_parser.add_argument('--output', type=str, help='Output filename without extension (.npz and plot)')
+    fs_parser.add_argument('--cache-dir', type=str, help='Directory for caching neighbor lists between runs')
+    
+    # Spin-splitting map command
+    split_parser = subparsers.add_parser('spin-splitting', help='Maximum spin splitting over the BZ and its nodal pattern')
+    split_parser.add_argument('--config', type=str, help='Path to configuration file')
+    split_parser.add_argument('--poscar', type=str, help='Path to POSCAR file')
+    split_parser.add_argument('--mesh', type=str, default="24", help='Coarse mesh, e.g. "24" or "24,24"')
+    split_parser.add_argument('--bands', type=str, help='Band indices within each spin channel, e.g. "0,1"')
+    split_parser.add_argument('--levels', type=int, default=3, help='Number of zoom-in levels around the maxima')
+    split_parser.add_argument('--output', type=str, help='Output .npz filename for the coarse map and the result')
+    split_parser.add_argument('--cache-dir', type=str, help='Directory for caching neighbor lists between runs')
+    
+    # Anomalous Hall conductivity command
+    ahc_parser = subparsers.add_parser('ahc', help='Berry curvature and anomalous Hall conductivity from analytic dH/dk (dimk = 2 or 3)')
+    ahc_parser.add_argument('--config', type=str, help='Path to configuration file')
+    ahc_parser.add_argument('--poscar', type=str, help='Path to POSCAR file')
+    ahc_parser.add_argument('--mesh', type=str, default="100", help='Monkhorst-Pack mesh, e.g. "100" or "100,100"')
+    ahc_parser.add_argument('--fermi-energy', type=str, default="0.0", help='Fermi energy (eV), "start:stop:num" or a comma-separated list')
+    ahc_parser.add_argument('--temperature', type=float, default=0.0, help='k_B T of the Fermi-Dirac occupation (eV)')
+    ahc_parser.add_argument('--direction', type=str, default="xy", choices=['xy', 'yz', 'zx'], help='Component of sigma')
+    ahc_parser.add_argument('--levels', type=int, default=0, help='Number of adaptive refinement passes around hot spots')
+    ahc_parser.add_argument('--zoom', type=int, default=3, help='Subdivisions per direction of each refined cell')
+    ahc_parser.add_argument('--refine-fraction', type=float, default=0.02, help='Fraction of cells refined in each pass')
+    ahc_parser.add_argument('--output', type=str, help='Output .npz filename')
+    ahc_parser.add_argument('--cache-dir', type=str, help='Directory for caching neighbor lists between runs')
+    
+    # Slab / ribbon command
+    slab_parser = subparsers.add_parser('slab', help='Bands of a finite slab or ribbon built from the periodic model, with surface weights')
+    slab_parser.add_argument('--config', type=str, help='Path to configuration file')
+    slab_parser.add_argument('--poscar', type=str, help='Path to POSCAR file')
+    slab_parser.add_argument('--finite', type=str, default="0", help='Lattice directions with open boundaries, e.g. "0" (slab) or "0,1" (ribbon of a 3D model)')
+    slab_parser.add_argument('--layers', type=int, default=20, help='Number of cells along the open directions')
+    slab_parser.add_argument('--repeats', type=str, help='Cells along each periodic direction, e.g. "1,2,1"')
+    slab_parser.add_argument('--nk', type=int, default=200, help='Number of k-points along the path')
+    slab_parser.add_argument('--nev', type=int, help='Only compute this many states nearest --sigma with the sparse solver')
+    slab_parser.add_argument('--sigma', type=float, default=0.0, help='Target energy of the sparse solver (eV)')
+    slab_parser.add_argument('--surface-layers', type=int, default=2, help='Layers at each end counted as surface')
+    slab_parser.add_argument('--output', type=str, help='Output .npz filename')
+    slab_parser.add_argument('--cache-dir', type=str, help='Directory for caching neighbor lists between runs')
+    
+    # Batch command over a directory of structures
+    batch_parser = subparsers.add_parser('batch', help='Run distance analysis, model and bands for every structure in a directory or glob')
+    batch_parser.add_argument('structures', type=str, help='Directory (*.vasp, POSCAR*, CONTCAR*) or quoted glob pattern')
+    batch_parser.add_argument('--config', type=str, help='Base configuration file shared by all structures')
+    batch_parser.add_argument('--output-dir', type=str, default='batch', help='Directory for plots, data and the summary')
+    batch_parser.add_argument('--workers', type=int, default=1, help='Number of structures computed in parallel')
+    batch_parser.add_argument('--dos', action='store_true', help='Also compute the density of states of each structure')
+    batch_parser.add_argument('--no-plot', action='store_true', help='Skip rendering band plots')
+    batch_parser.add_argument('--data', type=str, choices=['npz', 'csv'], help='Also save the bands of each structure in this format')
+    batch_parser.add_argument('--fermi-energy', type=float, default=0.0, help='Energy at which the band gap and DOS are evaluated (eV)')
+    batch_parser.add_argument('--split-mesh', type=int, default=24, help='Coarse mesh of the spin-splitting search')
+    batch_parser.add_argument('--summary', type=str, help='Summary CSV filename (default: <output-dir>/batch_summary.csv)')
     
     # Distance calculation command
     dist_parser = subparsers.add_parser('distance', help='Calculate distances between atoms')
     dist_parser.add_argument('--poscar', type=str, required=True, help='Path to POSCAR file')
     dist_parser.add_argument('--element1', type=str, default="Mn", help='First element type')
     dist_parser.add_argument('--element2', type=str, default="N", help='Second element type')
+    dist_parser.add_argument('--cutoff', type=float, help='Largest distance to analyse (default: longest lattice vector)')
     
     args = parser.parse_args()
+    from .parameters import Parameters
     
     if args.command == 'calculate':
-        # Load configuration
-        if args.config:
-            params = Parameters(args.config)
-        else:
-            params = Parameters()
-            
-        # Set output filename if provided
+        from contextlib import nullcontext
+        from .tight_binding_model import calculate_band_structure, create_pythtb_model, create_bloch_hamiltonian
+        from .profiling import Profiler, profiling, span, print_report, cprofile_filename
+        profiler = None
+        if args.profile or args.cprofile:
+            profiler = Profiler(memory=not args.no_profile_memory, cprofile_stage=args.cprofile)
+        
+        with profiling(profiler) if profiler else nullcontext():
+            # Load configuration
+            with span("read_parameters"):
+                if args.config:
+                    params = Parameters(args.config)
+                else:
+                    params = Parameters()
+                
+            # Set output filename if provided
+            if args.output:
+                params.output_filename = args.output
+                
+            if args.workers:
+                params.workers = args.workers
+            if args.cache_dir:
+                params.cache_dir = args.cache_dir
+            if args.store:
+                params.store_dir = args.store
+            if args.data:
+                params.band_data_format = args.data
+            if args.no_plot:
+                params.is_plot_bands = False
+                
+            # Set POSCAR file if provided
+            if args.poscar:
+                poscar_filename = args.poscar
+            else:
+                poscar_filename = os.path.join(params.savedir, params.output_filename + ".vasp")
+                
+            # Create and calculate model
+            if params.solver == "pythtb":
+                model = create_pythtb_model(params)
+            else:
+                model = create_bloch_hamiltonian(params)
+            calculate_band_structure(model, params)
+        outputs = []
+        if params.is_plot_bands:
+            outputs.append(f"{params.output_filename}.{params.output_format}")
+        if params.band_data_format:
+            outputs.append(f"{params.output_filename}.{params.band_data_format}")
+        print(f"Calculation completed! Results saved to {', '.join(outputs)}" if outputs
+              else "Calculation completed! (no plot or data output requested)")
+        
+        # Stage timings, peak memory and sizes of the run
+        if profiler:
+            meta = {"command": "calculate", "config": args.config, "poscar": params.poscar, "solver": params.solver}
+            print_report(profiler.report(**meta))
+            if args.profile:
+                profiler.save(args.profile, **meta)
+                print(f"Profile report saved to {args.profile}")
+            if args.cprofile:
+                stats = cprofile_filename(args.profile or params.output_filename, args.cprofile)
+                if profiler.dump_cprofile(stats):
+                    print(f"cProfile stats of stage {args.cprofile} saved to {stats}")
+                else:
+                    print(f"Stage {args.cprofile} did not run, no cProfile stats saved")
+        
+    elif args.command == 'sweep':
+        from .sweep import sweep_band_structure, save_sweep
+        params = Parameters(args.config) if args.config else Parameters()
+        if args.poscar:
+            params.poscar = args.poscar
+        if args.workers:
+            params.workers = args.workers
+        if args.cache_dir:
+            params.cache_dir = args.cache_dir
+        output = args.output or f"{params.output_filename}_sweep.npz"
+        
+        result = sweep_band_structure(params, t0=args.t0, hopping_decay=args.hopping_decay,
+                                      t0_distance=args.t0_distance)
+        save_sweep(result, output)
+        print(f"Sweep completed! {result['evals'].shape[:3]} parameter grid saved to {output}")
+        
+    elif args.command == 'dos':
+        import numpy as np
+        from .tight_binding_model import create_bloch_hamiltonian
+        from .dos import calculate_dos, save_dos
+        params = Parameters(args.config) if args.config else Parameters()
+        if args.poscar:
+            params.poscar = args.poscar
+        if args.mesh:
+            params.dos_mesh = [int(n) for n in args.mesh.split(",")]
+        if args.method:
+            params.dos_method = args.method
+        if args.smearing is not None:
+            params.dos_smearing = args.smearing
+        if args.workers:
+            params.workers = args.workers
+        if args.cache_dir:
+            params.cache_dir = args.cache_dir
+        output = args.output or f"{params.output_filename}_dos.dat"
+        
+        ham = create_bloch_hamiltonian(params)
+        energies = np.linspace(params.ylim[0], params.ylim[1], params.dos_num_points)
+        result = calculate_dos(ham, params.dos_mesh, energies, params.dos_method, params.dos_smearing, params.workers)
+        save_dos(result, output)
+        print(f"DOS calculation completed! {result['nk']} k-points, results saved to {output}")
+        
+    elif args.command == 'fermi-surface':
+        from .tight_binding_model import create_bloch_hamiltonian
+        from .fermi_surface import fermi_surface, save_fermi_surface, plot_fermi_surface
+        params = Parameters(args.config) if args.config else Parameters()
+        if args.poscar:
+            params.poscar = args.poscar
+        if args.cache_dir:
+            params.cache_dir = args.cache_dir
+        output = args.output or f"{params.output_filename}_fermi_surface"
+        
+        ham = create_bloch_hamiltonian(params)
+        result = fermi_surface(ham, args.energy, args.mesh, args.refine, args.levels)
+        save_fermi_surface(result, f"{output}.npz")
+        plot_fermi_surface(result, f"{output}.{params.output_format}")
+        print(f"Fermi surface completed! {len(result['segments'])} segments from {result['n_evaluated']} k-points, "
+              f"results saved to {output}.npz and {output}.{params.output_format}")
+        
+    elif args.command == 'spin-splitting':
+        import numpy as np
+        from .tight_binding_model import create_bloch_hamiltonian
+        from .splitting import spin_splitting_map
+        params = Parameters(args.config) if args.config else Parameters()
+        if args.poscar:
+            params.poscar = args.poscar
+        if args.cache_dir:
+            params.cache_dir = args.cache_dir
+        bands = [int(b) for b in args.bands.split(",")] if args.bands else None
+        
+        ham = create_bloch_hamiltonian(params)
+        result = spin_splitting_map(ham, [int(n) for n in args.mesh.split(",")], bands, args.levels)
+        print(f"Maximum spin splitting: {result['max_splitting']:.6f} eV (band {result['band']}, "
+              f"k = {np.round(result['k_max'], 6).tolist()})")
+        if 'nodal_pattern' in result:
+            print(f"Nodal pattern: {result['nodal_pattern']} ({result['sign_changes']} sign changes around G)")
         if args.output:
-            params.output_filename = args.output
-            
-        # Set POSCAR file if provided
+            np.savez(args.output, **result)
+            print(f"Results saved to {args.output}")
+        
+    elif args.command == 'ahc':
+        import numpy as np
+        from .tight_binding_model import create_bloch_hamiltonian
+        from .berry import anomalous_hall_conductivity
+        from .sweep import parse_values
+        params = Parameters(args.config) if args.config else Parameters()
         if args.poscar:
-            poscar_filename = args.poscar
-        else:
-            poscar_filename = os.path.join(params.savedir, params.output_filename + ".vasp")
-            
-        # Create and calculate model
-        model = create_pythtb_model(params)
-        calculate_band_structure(model, params)
-        print(f"Calculation completed! Results saved to {params.output_filename}.{params.output_format}")
+            params.poscar = args.poscar
+        if args.cache_dir:
+            params.cache_dir = args.cache_dir
+        direction = {"xy": (0, 1), "yz": (1, 2), "zx": (2, 0)}[args.direction]
+        
+        ham = create_bloch_hamiltonian(params)
+        result = anomalous_hall_conductivity(ham, [int(n) for n in args.mesh.split(",")],
+                                             parse_values(args.fermi_energy), args.temperature, direction,
+                                             args.levels, args.zoom, args.refine_fraction)
+        spin = ham.spin_diagonal
+        print(f"{'E_F (eV)':>10} {'sigma_' + args.direction:>14}" + (f" {'up':>14} {'down':>14}" if spin else "")
+              + f"  [{result['unit']}]")
+        for n, mu in enumerate(result["fermi_energy"]):
+            print(f"{mu:>10.4f} {result['sigma'][n]:>14.6g}"
+                  + (f" {result['sigma_up'][n]:>14.6g} {result['sigma_down'][n]:>14.6g}" if spin else ""))
+        print(f"AHC completed! {result['n_evaluated']} k-points evaluated")
+        if args.output:
+            np.savez(args.output, **result)
+            print(f"Results saved to {args.output}")
+        
+    elif args.command == 'slab':
+        import numpy as np
+        from .slab import create_slab_hamiltonian, slab_k_path, surface_weights
+        params = Parameters(args.config) if args.config else Parameters()
+        if args.poscar:
+            params.poscar = args.poscar
+        if args.cache_dir:
+            params.cache_dir = args.cache_dir
+        finite = [int(d) for d in args.finite.split(",")]
+        repeats = [int(n) for n in args.repeats.split(",")] if args.repeats else [1] * params.dimr
+        for d in finite:
+            repeats[d] = args.layers
+        output = args.output or f"{params.output_filename}_slab.npz"
+        
+        ham, cells = create_slab_hamiltonian(params, repeats, finite)
+        kpath, klabel = slab_k_path(params, ham)
+        k_vec, k_dist, k_node = ham.k_path(kpath, args.nk)
+        evals, weights = surface_weights(ham, cells[:, finite[0]], k_vec, args.surface_layers, args.nev, args.sigma)
+        np.savez(output, k_vec=k_vec, k_dist=k_dist, k_node=k_node, klabel=np.asarray(klabel),
+                 evals=evals, surface_weights=weights, repeats=np.asarray(repeats), finite=np.asarray(finite))
+        print(f"Slab completed! {ham.norb} orbitals, {len(ham.hop_i)} hoppings, {evals.shape[0]} bands on "
+              f"{len(k_vec)} k-points, results saved to {output}")
+        
+    elif args.command == 'batch':
+        from .batch import run_batch, save_summary, print_summary
+        # 使用元素在每个结构中分别检查
+        params = Parameters(args.config, check_poscar=False) if args.config else Parameters()
+        if args.no_plot:
+            params.is_plot_bands = False
+        if args.data:
+            params.band_data_format = args.data
+        options = {"fermi_energy": args.fermi_energy, "split_mesh": args.split_mesh, "dos": args.dos}
+        
+        rows = run_batch(args.structures, params, args.output_dir, args.workers, options)
+        summary = args.summary or os.path.join(args.output_dir, "batch_summary.csv")
+        save_summary(rows, summary)
+        print_summary(rows)
+        failed = sum(row["status"] != "ok" for row in rows)
+        print(f"Batch completed! {len(rows) - failed} of {len(rows)} structures succeeded, summary saved to {summary}")
         
     elif args.command == 'distance':
+        from .check_distance import calculate_distances
         # Calculate distances between atoms
-        distances = calculate_distances(args.poscar, args.element1, args.element2)
-        print(f"\nFound {len(distances)} distances between {args.element1} and {args.element2} atoms")
+        shells = calculate_distances(args.poscar, args.element1, args.element2, cutoff=args.cutoff)
+        print(f"\nFound {len(shells)} distance shells ({sum(s['count'] for s in shells)} pairs) "
+              f"between {args.element1} and {args.element2} atoms")
         
     else:
         parser.print_help()
@@ -0,0 +1,214 @@
+"""
+态密度：在Monkhorst-Pack网格上分块对角化，每块的本征值直接累加到态密度中，内存占用与网格密度无关
+
+monkhorst_pack(mesh, start, stop) 按扁平索引生成Monkhorst-Pack网格中的一段k点，不需要生成整个网格
+
+DOSAccumulator(energies, method, smearing, spin) 高斯展宽或直方图的态密度累加器，可按sigma_z分出自旋向上和向下的分量
+
+calculate_dos(ham, mesh, energies, method, smearing, workers) 计算总态密度和自旋分辨态密度
+
+save_dos(result, filename) 把态密度保存为文本文件
+
+
+"""
+
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .parallel import limit_blas_threads, limit_worker_threads
+
+# 高斯展宽的截断半宽（以smearing为单位）
+GAUSSIAN_CUTOFF = 5.0
+
+# 每块k点的哈密顿量（和本征矢量）的最大元素数，决定了计算态密度时的内存上限
+CHUNK_ELEMENTS = 1 << 20
+
+
+def monkhorst_pack(mesh, start=0, stop=None):
+    """
+    生成Monkhorst-Pack网格中扁平索引为 [start, stop) 的k点
+
+    第n个分量为 (2n - N + 1) / (2N)，n = 0, ..., N-1，与VASP的Monkhorst-Pack网格相同。
+
+    参数:
+        mesh (list): 每个周期方向的网格数，长度为dimk
+        start (int): 起始扁平索引
+        stop (int): 终止扁平索引，默认为网格点总数
+
+    返回:
+        numpy.ndarray: k点的分数坐标，形状为 (stop - start, dimk)
+    """
+    mesh = np.asarray(mesh, dtype=int)
+    stop = int(np.prod(mesh)) if stop is None else stop
+    n = np.stack(np.unravel_index(np.arange(start, stop), mesh), axis=-1)
+    return (2 * n - mesh + 1) / (2.0 * mesh)
+
+
+class DOSAccumulator:
+    """
+    态密度累加器：本征值按线性插值分配到均匀能量网格上（直方图方法则分配到最近的格点），
+    高斯展宽在最后对网格做一次卷积，因此每块k点的开销只与本征值个数成正比
+    """
+
+    def __init__(self, energies, method="gaussian", smearing=0.05, spin=False):
+        """
+        参数:
+            energies (numpy.ndarray): 均匀的能量网格
+            method (str): "gaussian"（高斯展宽）或 "histogram"（直方图）
+            smearing (float): 高斯展宽的标准差（eV）
+            spin (bool): 是否同时累加自旋向上的分量
+        """
+        if method not in ("gaussian", "histogram"):
+            raise ValueError(f"DOS method 应为 gaussian 或 histogram，但得到 {method}")
+        self.energies = np.asarray(energies, dtype=float)
+        if len(self.energies) < 2:
+            raise ValueError("能量网格至少需要两个点")
+        self.method = method
+        self.smearing = float(smearing)
+        self.step = self.energies[1] - self.energies[0]
+        # 高斯展宽时在网格两端留出余量，使窗口外的态的尾巴也能计入
+        self.pad = int(np.ceil(GAUSSIAN_CUTOFF * self.smearing / self.step)) if method == "gaussian" else 0
+        size = len(self.energies) + 2 * self.pad
+        self.total = np.zeros(size)
+        self.up = np.zeros(size) if spin else None
+        self.nk = 0
+
+    def add(self, evals, weights_up=None):
+        """
+        累加一块k点的本征值
+
+        参数:
+            evals (numpy.ndarray): 本征值，形状为 (nband, nk_chunk)
+            weights_up (numpy.ndarray): 每个本征态自旋向上的权重，形状与evals相同
+        """
+        evals = np.asarray(evals)
+        self.nk += evals.shape[1]
+        x = (evals.ravel() - self.energies[0]) / self.step + self.pad
+        size = len(self.total)
+        if self.method == "histogram":
+            index = np.rint(x).astype(np.int64)
+            keep = (index >= 0) & (index < size)
+            index, frac = index[keep], None
+        else:
+            index = np.floor(x).astype(np.int64)
+            keep = (index >= 0) & (index < size - 1)
+            index, frac = index[keep], (x - np.floor(x))[keep]
+        self._deposit(self.total, index, frac, None)
+        if self.up is not None and weights_up is not None:
+            self._deposit(self.up, index, frac, np.asarray(weights_up).ravel()[keep])
+
+    @staticmethod
+    def _deposit(target, index, frac, weights):
+        size = len(target)
+        if frac is None:
+            target += np.bincount(index, weights=weights, minlength=size)
+            return
+        w = 1.0 if weights is None else weights
+        target += np.bincount(index, weights=w * (1.0 - frac), minlength=size)
+        target += np.bincount(index + 1, weights=w * frac, minlength=size)
+
+    def merge(self, other):
+        """合并另一个累加器（例如工作进程返回的部分结果）"""
+        self.total += other.total
+        if self.up is not None:
+            self.up += other.up
+        self.nk += other.nk
+
+    def _finalize(self, counts):
+        """归一化为每个原胞每eV的态数，必要时做高斯卷积并去掉两端余量"""
+        dos = counts / (max(self.nk, 1) * self.step)
+        if self.method == "gaussian" and self.smearing > 0:
+            offsets = np.arange(-self.pad, self.pad + 1) * self.step
+            kernel = np.exp(-0.5 * (offsets / self.smearing) ** 2)
+            dos = np.convolve(dos, kernel / kernel.sum(), mode="same")
+        return dos[self.pad:len(dos) - self.pad]
+
+    def result(self):
+        """
+        返回:
+            dict: energies, dos；累加了自旋分量时还包含dos_up和dos_down
+        """
+        result = {"energies": self.energies, "dos": self._finalize(self.total), "nk": self.nk}
+        if self.up is not None:
+            result["dos_up"] = self._finalize(self.up)
+            result["dos_down"] = result["dos"] - result["dos_up"]
+        return result
+
+
+def _accumulate(ham, mesh, start, stop, energies, method, smearing, chunk_size):
+    """对扁平索引 [start, stop) 的k点分块对角化并累加，返回累加器"""
+    spin = ham.nspin == 2
+    acc = DOSAccumulator(energies, method, smearing, spin=spin)
+    for lo in range(start, stop, chunk_size):
+        k_chunk = monkhorst_pack(mesh, lo, min(lo + chunk_size, stop))
+        if ham.spin_diagonal:
+            # 共线模型按自旋块求解，每个态完全属于一个自旋
+            up, down = (block.solve_all(k_chunk) for block in ham.spin_blocks())
+            acc.add(np.concatenate([up, down]), np.concatenate([np.ones_like(up), np.zeros_like(down)]))
+        elif spin:
+            evals, evecs = ham.solve_all(k_chunk, eig_vectors=True)
+            acc.add(evals, np.sum(np.abs(evecs[..., 0]) ** 2, axis=-1))
+        else:
+            acc.add(ham.solve_all(k_chunk))
+    return acc
+
+
+def calculate_dos(ham, mesh, energies, method="gaussian", smearing=0.05, workers=1, chunk_size=None):
+    """
+    在Monkhorst-Pack网格上计算态密度，网格按块生成、对角化并立即累加，内存占用与网格密度无关
+
+    nspin=2时按本征矢量在sigma_z基下的权重分出自旋向上和向下的态密度。
+
+    参数:
+        ham (BlochHamiltonian): 数组形式的紧束缚模型
+        mesh (list or int): 每个周期方向的网格数，多于dimk的分量被忽略，整数表示各方向相同
+        energies (numpy.ndarray): 均匀的能量网格
+        method (str): "gaussian" 或 "histogram"
+        smearing (float): 高斯展宽的标准差（eV）
+        workers (int): 进程数，每个进程累加自己的部分态密度，最后求和
+        chunk_size (int): 每块的k点数，默认使每块的哈密顿量约占CHUNK_ELEMENTS个复数
+
+    返回:
+        dict: energies, dos, nk，nspin=2时还包含dos_up和dos_down（单位：态/eV/原胞）
+    """
+    mesh = [int(n) for n in np.atleast_1d(mesh)]
+    if len(mesh) == 1:
+        mesh = mesh * ham.dimk
+    mesh = mesh[:ham.dimk]
+    if len(mesh) < ham.dimk or any(n < 1 for n in mesh):
+        raise ValueError(f"k点网格必须为正整数，但得到 {mesh}")
+    nk = int(np.prod(mesh))
+    if chunk_size is None:
+        chunk_size = max(1, CHUNK_ELEMENTS // ham.nstate ** 2)
+    workers = 1 if workers is None else min(int(workers), -(-nk // chunk_size))
+
+    if workers <= 1:
+        return _accumulate(ham, mesh, 0, nk, energies, method, smearing, chunk_size).result()
+
+    bounds = np.linspace(0, nk, workers + 1).astype(int)
+    acc = DOSAccumulator(energies, method, smearing, spin=ham.nspin == 2)
+    with limit_blas_threads(1), ProcessPoolExecutor(
+            max_workers=workers, mp_context=get_context("spawn"), initializer=limit_worker_threads) as pool:
+        futures = [pool.submit(_accumulate, ham, mesh, int(lo), int(hi), energies, method, smearing, chunk_size)
+                   for lo, hi in zip(bounds[:-1], bounds[1:])]
+        for future in futures:
+            acc.merge(future.result())
+    return acc.result()
+
+
+def save_dos(result, filename):
+    """
+    把态密度保存为文本文件，各列为 能量、总态密度，以及自旋向上和向下的态密度（如果有）
+
+    参数:
+        result (dict): calculate_dos的返回值
+        filename (str): 输出文件名
+    """
+    columns = [result["energies"], result["dos"]]
+    header = "energy(eV) dos"
+    if "dos_up" in result:
+        columns += [result["dos_up"], result["dos_down"]]
+        header += " dos_up dos_down"
+    np.savetxt(filename, np.column_stack(columns), header=f"{header}  (nk = {result['nk']})")
@@ -0,0 +1,223 @@
+"""
+二维k网格上的费米面（等能线）：批量计算所有能带的能量，用向量化的marching squares提取等能线
+
+band_grid(ham, k_points, spin_resolved) 分块计算一批k点上每个自旋通道的能带
+
+marching_squares(values, x, y) 对一批二维网格同时提取零等值线段
+
+fermi_surface(ham, energy, mesh, refine, levels, k_range) 由粗到细提取等能线，只细分等能线穿过的格子
+
+save_fermi_surface(result, filename) 把等能线段保存为.npz文件
+
+plot_fermi_surface(result, filename) 绘制等能线，自旋向上为红色，自旋向下为蓝色
+
+
+"""
+
+import numpy as np
+
+# 自旋通道的标记：-1 表示哈密顿量在自旋上不是分块对角的，所有能带一起求解
+SPIN_UP, SPIN_DOWN, SPIN_MIXED = 0, 1, -1
+
+
+def band_grid(ham, k_points, spin_resolved=True):
+    """
+    分块计算一批k点上的能带；模型在自旋上分块对角时分别对角化两个自旋块
+
+    参数:
+        ham (BlochHamiltonian): 数组形式的紧束缚模型
+        k_points (numpy.ndarray): k点的分数坐标，形状为 (nk, dimk)
+        spin_resolved (bool): 是否按自旋通道分开求解
+
+    返回:
+        tuple: (energies, spins)
+            - energies: 形状为 (n_channel, nk, nband) 的能量
+            - spins: 每个通道的自旋标记，SPIN_UP/SPIN_DOWN，或者不分自旋时为SPIN_MIXED
+    """
+    if spin_resolved and ham.spin_diagonal:
+        blocks, spins = ham.spin_blocks(), [SPIN_UP, SPIN_DOWN]
+    else:
+        blocks, spins = [ham], [SPIN_MIXED]
+    energies = np.stack([block.solve_all(k_points).T for block in blocks])
+    return energies, spins
+
+
+def marching_squares(values, x, y):
+    """
+    对一批二维网格同时提取 values = 0 的等值线段
+
+    鞍点格子（四个角正负交替）按格子中心的平均值决定连接方式。
+
+    参数:
+        values (numpy.ndarray): 网格上的函数值，形状为 (batch, ny, nx)
+        x (numpy.ndarray): 每个网格的x坐标，形状为 (batch, nx)
+        y (numpy.ndarray): 每个网格的y坐标，形状为 (batch, ny)
+
+    返回:
+        tuple: (segments, batch_index)
+            - segments: 线段端点，形状为 (nseg, 2, 2)
+            - batch_index: 每条线段所在网格的索引，形状为 (nseg,)
+    """
+    values = np.asarray(values, dtype=float)
+    v00, v10 = values[:, :-1, :-1], values[:, :-1, 1:]
+    v01, v11 = values[:, 1:, :-1], values[:, 1:, 1:]
+    above = [v > 0 for v in (v00, v10, v11, v01)]
+    case = above[0] * 1 + above[1] * 2 + above[2] * 4 + above[3] * 8
+    cells = np.nonzero((case != 0) & (case != 15))
+    if len(cells[0]) == 0:
+        return np.zeros((0, 2, 2)), np.zeros(0, dtype=int)
+    b, iy, ix = cells
+    a00, a10, a11, a01 = (v[cells] for v in (v00, v10, v11, v01))
+    x0, x1 = x[b, ix], x[b, ix + 1]
+    y0, y1 = y[b, iy], y[b, iy + 1]
+
+    def cross(va, vb):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.clip(np.nan_to_num(va / (va - vb), nan=0.5), 0.0, 1.0)
+
+    # 四条边上的交点：下 (00→10)、右 (10→11)、上 (01→11)、左 (00→01)
+    t = cross(a00, a10)
+    bottom = np.stack([x0 + t * (x1 - x0), y0], axis=-1)
+    t = cross(a10, a11)
+    right = np.stack([x1, y0 + t * (y1 - y0)], axis=-1)
+    t = cross(a01, a11)
+    top = np.stack([x0 + t * (x1 - x0), y1], axis=-1)
+    t = cross(a00, a01)
+    left = np.stack([x0, y0 + t * (y1 - y0)], axis=-1)
+    points = np.stack([bottom, right, top, left], axis=1)
+    c = case[cells]
+    s00, s10, s11, s01 = (c & 1) > 0, (c & 2) > 0, (c & 4) > 0, (c & 8) > 0
+    crossed = np.stack([s00 != s10, s10 != s11, s01 != s11, s00 != s01], axis=1)
+
+    # 只有两条边被穿过的格子：一条线段
+    single = crossed.sum(axis=1) == 2
+    edges = np.argsort(~crossed[single], axis=1, kind="stable")[:, :2]
+    rows = np.flatnonzero(single)
+    segments = [points[rows[:, None], edges]]
+    batch_index = [b[rows]]
+
+    # 鞍点格子：中心与00角同号时，00和11两角相连，切掉10角和01角；否则切掉00角和11角
+    saddle = np.flatnonzero(~single)
+    if len(saddle):
+        center = 0.25 * (a00 + a10 + a11 + a01)[saddle] > 0
+        joined = center == s00[saddle]
+        first = np.where(joined[:, None], [0, 1], [3, 0])
+        second = np.where(joined[:, None], [2, 3], [1, 2])
+        for pair in (first, second):
+            segments.append(points[saddle[:, None], pair])
+            batch_index.append(b[saddle])
+    return np.concatenate(segments), np.concatenate(batch_index)
+
+
+def _cell_grids(origins, size, n):
+    """每个格子上 (n+1)×(n+1) 个格点的坐标，返回 (x, y, k_points)"""
+    steps = np.linspace(0.0, 1.0, n + 1)
+    x = origins[:, 0, None] + size[0] * steps
+    y = origins[:, 1, None] + size[1] * steps
+    k_points = np.stack(np.broadcast_arrays(x[:, None, :], y[:, :, None]), axis=-1).reshape(-1, 2)
+    return x, y, k_points
+
+
+def fermi_surface(ham, energy=0.0, mesh=64, refine=4, levels=0, k_range=((-0.5, 0.5), (-0.5, 0.5)),
+                  spin_resolved=True):
+    """
+    提取能量为energy的等能线（费米面）
+
+    先在 mesh×mesh 的粗网格上计算所有能带，然后进行levels轮细化：每轮只把等能线穿过的格子
+    分成 refine×refine 个小格子重新计算，因此计算量与等能线长度而不是网格面积成正比。
+    模型在自旋上分块对角时，两个自旋通道分别求解并标记。
+
+    参数:
+        ham (BlochHamiltonian): dimk=2 的紧束缚模型
+        energy (float): 等能线的能量（eV）
+        mesh (int): 粗网格每个方向的格子数
+        refine (int): 每轮细化时每个方向的细分数
+        levels (int): 细化轮数
+        k_range (tuple): 两个周期方向的分数坐标范围
+        spin_resolved (bool): 是否按自旋通道分开求解
+
+    返回:
+        dict: 包含
+            - segments: 等能线段的端点（分数坐标），形状为 (nseg, 2, 2)
+            - band: 每条线段所属的能带（在自旋通道内的编号）
+            - spin: 每条线段的自旋标记，0为向上，1为向下，-1为不分自旋
+            - energy, n_evaluated: 能量和计算过能带的k点数
+    """
+    if ham.dimk != 2:
+        raise ValueError(f"费米面计算需要 dimk = 2，但模型的 dimk = {ham.dimk}")
+    k_range = np.asarray(k_range, dtype=float)
+    origins = k_range[:, 0][None, :]
+    size = k_range[:, 1] - k_range[:, 0]
+    n = int(mesh)
+    n_evaluated = 0
+
+    for level in range(int(levels) + 1):
+        x, y, k_points = _cell_grids(origins, size, n)
+        energies, spins = band_grid(ham, k_points, spin_resolved)
+        n_evaluated += len(k_points)
+        n_cell, n_channel, n_band = len(origins), len(spins), energies.shape[-1]
+        # 形状 (n_cell, n_channel, n_band, ny, nx)
+        values = energies.reshape(n_channel, n_cell, n + 1, n + 1, n_band).transpose(1, 0, 4, 2, 3) - energy
+        if level == levels:
+            break
+        # 找出任意能带的等能线穿过的小格子，作为下一轮的格子
+        corners = np.stack([values[..., :-1, :-1], values[..., :-1, 1:], values[..., 1:, :-1], values[..., 1:, 1:]])
+        crossed = ((corners > 0).any(axis=0) & (corners <= 0).any(axis=0)).any(axis=(1, 2))
+        cell, iy, ix = np.nonzero(crossed)
+        if len(cell) == 0:
+            # 没有等能线，当前网格上的marching squares不会产生线段
+            break
+        origins = origins[cell] + np.stack([ix, iy], axis=-1) * (size / n)
+        size = size / n
+        n = int(refine)
+
+    values = values.reshape(-1, n + 1, n + 1)
+    batch = np.arange(len(values)) // (n_channel * n_band)
+    segments, index = marching_squares(values, x[batch], y[batch])
+    channel = (index // n_band) % n_channel
+    return {
+        "segments": segments,
+        "band": index % n_band,
+        "spin": np.asarray(spins)[channel] if len(index) else np.zeros(0, dtype=int),
+        "energy": float(energy),
+        "n_evaluated": n_evaluated,
+    }
+
+
+def save_fermi_surface(result, filename):
+    """
+    把fermi_surface的结果保存为.npz文件
+
+    参数:
+        result (dict): fermi_surface的返回值
+        filename (str): 输出文件名
+    """
+    np.savez(filename, **result)
+
+
+def plot_fermi_surface(result, filename):
+    """
+    绘制等能线，自旋向上为红色，自旋向下为蓝色，不分自旋时为黑色；与plot_bands一样直接使用Agg画布，不依赖pyplot和显示后端
+
+    参数:
+        result (dict): fermi_surface的返回值
+        filename (str): 图片文件名
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.collections import LineCollection
+
+    colors = {SPIN_UP: "r", SPIN_DOWN: "b", SPIN_MIXED: "k"}
+    fig = Figure(figsize=(6, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    for spin, color in colors.items():
+        mask = result["spin"] == spin
+        if mask.any():
+            ax.add_collection(LineCollection(result["segments"][mask], colors=color, linewidths=1.0))
+    ax.autoscale()
+    ax.set_aspect("equal")
+    ax.set_xlabel("k1 (reduced)")
+    ax.set_ylabel("k2 (reduced)")
+    ax.set_title(f"E = {result['energy']} eV")
+    fig.savefig(filename)
@@ -0,0 +1,526 @@
+"""
+以数组形式保存紧束缚模型，并对一批k点一次性构造和对角化Bloch哈密顿量
+
+BlochHamiltonian(lattice, orb, onsite, hop_i, hop_j, hop_R, hop_t, dimk, nspin) 数组形式的紧束缚模型
+
+BlochHamiltonian.hamiltonian(k_list) 用一次相位矩阵乘积构造一批k点的哈密顿量 H[k]
+
+BlochHamiltonian.velocity(k_list) 解析计算一批k点上的 ∂H/∂k（笛卡尔分量），用于Berry曲率
+
+BlochHamiltonian.solve_all(k_list, eig_vectors) 批量对角化，返回值格式与pythtb的solve_all一致
+
+BlochHamiltonian.k_path(kpath, nk) 生成k点路径，与pythtb的k_path一致
+
+BlochHamiltonian.sparse_hamiltonian(k) 构造单个k点的CSR稀疏哈密顿量，内存随跃迁数增长
+
+BlochHamiltonian.solve_sparse(k_list, nev, sigma) 对每个k点只求最接近目标能量的nev个本征对
+
+BlochHamiltonian.spin_blocks() 自旋分块对角的模型拆成自旋向上和向下两个nspin=1的模型
+
+BlochHamiltonian.solve_spin(k_list, eig_vectors) 分别对角化两个自旋块，本征值带有自旋标记
+
+BlochHamiltonian.solve_spin_channels(k_list, eig_vectors) 分别返回两个自旋块的本征值（和本征矢量），不合并
+
+merge_spin_blocks(evals, evecs, nev, sigma) 把两个自旋块的结果合并为按能量排序的能带
+
+
+"""
+
+import copy
+
+import numpy as np
+from .sparse import to_csr, eigsh_nearest
+
+# 单个分块中哈密顿量数组的最大元素数，用于限制内存占用
+CHUNK_ELEMENTS = 1 << 24
+
+
+class BlochHamiltonian:
+    """
+    数组形式的紧束缚模型，约定与pythtb相同：
+
+        H_ij(k) = onsite_i δ_ij + Σ t exp(2πi k·(R + τ_j - τ_i)) + h.c.
+
+    自旋为2时基矢的排列为 (轨道, 自旋)，与pythtb一致。跃迁与自旋无关且在位能只有自旋对角元时
+    （共线磁性模型），spin_diagonal为True，哈密顿量按自旋分成两个norb×norb的块分别对角化。
+    """
+
+    def __init__(self, lattice, orb, onsite, hop_i, hop_j, hop_R, hop_t, dimk, nspin=1, per=None):
+        """
+        参数:
+            lattice (numpy.ndarray): 晶格矩阵，形状为 (dimr, dimr)
+            orb (numpy.ndarray): 轨道的分数坐标，形状为 (norb, dimr)
+            onsite (numpy.ndarray): 在位能，nspin=1时形状为 (norb,)，nspin=2时为 (norb, 2, 2)
+            hop_i (numpy.ndarray): 跃迁起始轨道索引，形状为 (n_hop,)
+            hop_j (numpy.ndarray): 跃迁终止轨道索引，形状为 (n_hop,)
+            hop_R (numpy.ndarray): 跃迁格矢量，形状为 (n_hop, dimr)
+            hop_t (numpy.ndarray): 跃迁强度，形状为 (n_hop,)，nspin=2时也可以是 (n_hop, 2, 2)
+            dimk (int): k空间维度
+            nspin (int): 自旋分量数，1或2
+            per (list): 周期方向的索引，默认为前dimk个方向
+        """
+        self.lattice = np.asarray(lattice, dtype=float)
+        self.orb = np.asarray(orb, dtype=float).reshape(-1, self.lattice.shape[0])
+        self.dimk = int(dimk)
+        self.nspin = int(nspin)
+        self.per = list(range(self.dimk)) if per is None else list(per)
+        self.norb = len(self.orb)
+        self.nstate = self.norb * self.nspin
+
+        onsite = np.asarray(onsite)
+        if self.nspin == 2 and onsite.ndim == 1:
+            onsite = onsite[:, None, None] * np.eye(2)
+        self.onsite = onsite.astype(complex)
+
+        # 整数数组直接引用，不复制（例如HoppingTable中的列）
+        self.hop_i = _as_int_array(hop_i)
+        self.hop_j = _as_int_array(hop_j)
+        self.hop_R = _as_int_array(hop_R).reshape(len(self.hop_i), -1)
+        hop_t = np.asarray(hop_t)
+        if hop_t.ndim == 3 and np.allclose(hop_t, hop_t[:, :1, :1] * np.eye(2)):
+            # 与自旋无关的跃迁只保存一个数，按标量处理
+            hop_t = hop_t[:, 0, 0]
+        self.hop_t = hop_t
+        self.spin_diagonal = self.nspin == 2 and hop_t.ndim == 1 and \
+            np.allclose(self.onsite[:, 0, 1], 0) and np.allclose(self.onsite[:, 1, 0], 0)
+        self._prepare()
+
+    @classmethod
+    def from_hopping_table(cls, table, lattice, orb, onsite, dimk, nspin=1):
+        """
+        由跃迁表构造BlochHamiltonian，跃迁数组直接引用跃迁表中的列
+
+        参数:
+            table (HoppingTable): 去重后的跃迁表
+            lattice, orb, onsite, dimk, nspin: 同__init__
+
+        返回:
+            BlochHamiltonian: 数组形式的模型
+        """
+        return cls(lattice, orb, onsite, table.i, table.j, table.R, table.t, dimk, nspin)
+
+    @classmethod
+    def from_pythtb(cls, model):
+        """
+        从pythtb模型中提取在位能和跃迁，构造BlochHamiltonian
+
+        参数:
+            model (pythtb.tb_model): 紧束缚模型
+
+        返回:
+            BlochHamiltonian: 数组形式的模型
+        """
+        hoppings = model._hoppings
+        n_hop = len(hoppings)
+        hop_i = np.array([h[1] for h in hoppings], dtype=int)
+        hop_j = np.array([h[2] for h in hoppings], dtype=int)
+        hop_R = np.array([h[3] for h in hoppings], dtype=int).reshape(n_hop, model._dim_r) if n_hop else \
+            np.zeros((0, model._dim_r), dtype=int)
+        if model._nspin == 2:
+            hop_t = np.array([h[0] for h in hoppings], dtype=complex).reshape(n_hop, 2, 2)
+        else:
+            hop_t = np.array([h[0] for h in hoppings], dtype=complex)
+        return cls(model._lat, model._orb, np.array(model._site_energies), hop_i, hop_j, hop_R, hop_t,
+                   model._dim_k, model._nspin, per=model._per)
+
+    def with_hopping_strengths(self, hop_t):
+        """
+        返回只替换跃迁强度的新模型，复用轨道、格矢量和排序等预处理结果
+
+        参数:
+            hop_t (numpy.ndarray): 新的跃迁强度，形状与hop_t相同
+
+        返回:
+            BlochHamiltonian: 新模型
+        """
+        hop_t = np.asarray(hop_t)
+        if hop_t.shape != self.hop_t.shape:
+            raise ValueError(f"hop_t must have shape {self.hop_t.shape}, but got {hop_t.shape}")
+        new = copy.copy(self)
+        new.hop_t = hop_t
+        new._t = hop_t[self._order].astype(complex)
+        return new
+
+    def to_pythtb(self):
+        """
+        转换为pythtb模型，作为参考实现使用
+
+        返回:
+            pythtb.tb_model: 紧束缚模型
+        """
+        try:
+            from pythtb import tb_model
+        except ImportError:
+            raise ImportError("请安装pythtb库: pip install pythtb（建议新建虚拟环境）")
+        model = tb_model(self.dimk, self.lattice.shape[0], self.lattice, self.orb, per=self.per, nspin=self.nspin)
+        for ind in range(self.norb):
+            model.set_onsite(self.onsite[ind] if self.nspin == 2 else self.onsite[ind].real, ind)
+        for t, i, j, R in zip(self.hop_t, self.hop_i, self.hop_j, self.hop_R):
+            model.set_hop(t, int(i), int(j), [int(r) for r in R], allow_conjugate_pair=True)
+        return model
+
+    def _prepare(self):
+        """按 (i, j) 对跃迁排序，预先计算相位所需的位移和求和分段"""
+        order = np.lexsort((self.hop_j, self.hop_i))
+        self._order = order
+        pair_id = self.hop_i[order].astype(np.int64) * self.norb + self.hop_j[order]
+        self._pair_start = np.flatnonzero(np.r_[True, pair_id[1:] != pair_id[:-1]]) if len(order) else \
+            np.zeros(0, dtype=int)
+        self._hop_i = self.hop_i[order]
+        self._hop_j = self.hop_j[order]
+        self._pair_i = self._hop_i[self._pair_start]
+        self._pair_j = self._hop_j[self._pair_start]
+        # 轨道间位移 R + τ_j - τ_i，只保留周期方向
+        rv = self.orb[self.hop_j] - self.orb[self.hop_i] + self.hop_R
+        self._rv = rv[order][:, self.per]
+        self._t = self.hop_t[order].astype(complex)
+
+    def _k_array(self, k_list):
+        """把k点统一为 (nk, dimk) 的数组"""
+        k_list = np.asarray(k_list, dtype=float)
+        if self.dimk == 1 and k_list.ndim == 1:
+            k_list = k_list[:, None]
+        return k_list.reshape(-1, self.dimk)
+
+    def hamiltonian(self, k_list):
+        """
+        构造一批k点的哈密顿量
+
+        参数:
+            k_list (numpy.ndarray): k点的分数坐标，形状为 (nk, dimk)
+
+        返回:
+            numpy.ndarray: 哈密顿量，形状为 (nk, nstate, nstate)
+        """
+        k_list = self._k_array(k_list)
+        nk, norb = len(k_list), self.norb
+
+        if len(self._t):
+            # 一次矩阵乘积得到所有 (k, 跃迁) 的相位
+            ham = self._hopping_matrix(np.exp(2j * np.pi * (k_list @ self._rv.T)), self._t)
+        else:
+            ham = np.zeros((nk, norb, self.nspin, norb, self.nspin), dtype=complex)
+
+        orbitals = np.arange(norb)
+        if self.nspin == 2:
+            ham[:, orbitals, :, orbitals, :] += self.onsite[:, None, :, :]
+        else:
+            ham[:, orbitals, 0, orbitals, 0] += self.onsite
+        return ham.reshape(nk, self.nstate, self.nstate)
+
+    def _hopping_matrix(self, phase, t):
+        """
+        由相位和（排序后的）跃迁系数构造 Σ t exp(iφ) + h.c.
+
+        参数:
+            phase (numpy.ndarray): 每个 (k, 跃迁) 的相位因子，形状为 (nk, n_hop)
+            t (numpy.ndarray): 跃迁系数，形状为 (n_hop,) 或 (n_hop, 2, 2)
+
+        返回:
+            numpy.ndarray: 形状为 (nk, norb, nspin, norb, nspin)
+        """
+        nk, norb = len(phase), self.norb
+        matrix = np.zeros((nk, norb, self.nspin, norb, self.nspin), dtype=complex)
+        if t.ndim == 1:
+            amp = np.add.reduceat(phase * t, self._pair_start, axis=1)
+            block = np.zeros((nk, norb, norb), dtype=complex)
+            block[:, self._pair_i, self._pair_j] = amp
+            block += block.conj().transpose(0, 2, 1)
+            for s in range(self.nspin):
+                matrix[:, :, s, :, s] = block
+        else:
+            amp = np.add.reduceat(phase[:, :, None, None] * t, self._pair_start, axis=1)
+            block = np.zeros((nk, norb, 2, norb, 2), dtype=complex)
+            block[:, self._pair_i, :, self._pair_j, :] = amp.transpose(1, 0, 2, 3)
+            matrix += block + block.conj().transpose(0, 3, 4, 1, 2)
+        return matrix
+
+    def velocity(self, k_list):
+        """
+        解析计算一批k点上哈密顿量对笛卡尔k分量的导数，与hamiltonian使用同一组跃迁和相位：
+
+            ∂H/∂k_α = Σ i r_α t exp(2πi k·(R + τ_j - τ_i)) + h.c.
+
+        r为 R + τ_j - τ_i 在周期方向上的笛卡尔坐标（单位与lattice相同），在位能与k无关。
+
+        参数:
+            k_list (numpy.ndarray): k点的分数坐标，形状为 (nk, dimk)
+
+        返回:
+            numpy.ndarray: 形状为 (nk, dimr, nstate, nstate)，第二维为笛卡尔方向
+        """
+        k_list = self._k_array(k_list)
+        nk, dimr = len(k_list), self.lattice.shape[0]
+        vel = np.zeros((nk, dimr, self.nstate, self.nstate), dtype=complex)
+        if not len(self._t):
+            return vel
+        phase = np.exp(2j * np.pi * (k_list @ self._rv.T))
+        r_cart = self._rv @ self.lattice[self.per]
+        shape = (-1,) + (1,) * (self._t.ndim - 1)
+        for alpha in range(dimr):
+            if np.any(r_cart[:, alpha]):
+                t = 1j * r_cart[:, alpha].reshape(shape) * self._t
+                vel[:, alpha] = self._hopping_matrix(phase, t).reshape(nk, self.nstate, self.nstate)
+        return vel
+
+    def solve_all(self, k_list, eig_vectors=False):
+        """
+        分块批量对角化一组k点的哈密顿量
+
+        参数:
+            k_list (numpy.ndarray): k点的分数坐标，形状为 (nk, dimk)
+            eig_vectors (bool): 是否返回本征矢量
+
+        返回:
+            numpy.ndarray: 本征值，形状为 (nstate, nk)
+            eig_vectors为True时返回 (本征值, 本征矢量)，本征矢量形状为
+            (nstate, nk, norb) 或 (nstate, nk, norb, 2)，与pythtb一致
+        """
+        if self.spin_diagonal:
+            # 两个norb×norb的块比一个2norb×2norb的矩阵快约4倍
+            result = self.solve_spin(k_list, eig_vectors=eig_vectors)
+            return (result[0], result[2]) if eig_vectors else result[0]
+
+        k_list = self._k_array(k_list)
+        nk = len(k_list)
+        evals = np.zeros((self.nstate, nk))
+        evecs = np.zeros((self.nstate, nk, self.nstate), dtype=complex) if eig_vectors else None
+
+        chunk = max(1, CHUNK_ELEMENTS // max(1, self.nstate * self.nstate + len(self._t)))
+        for start in range(0, nk, chunk):
+            stop = min(start + chunk, nk)
+            ham = self.hamiltonian(k_list[start:stop])
+            if eig_vectors:
+                vals, vecs = np.linalg.eigh(ham)
+                evecs[:, start:stop, :] = vecs.transpose(2, 0, 1)
+            else:
+                vals = np.linalg.eigvalsh(ham)
+            evals[:, start:stop] = vals.T
+
+        if not eig_vectors:
+            return evals
+        if self.nspin == 2:
+            evecs = evecs.reshape(self.nstate, nk, self.norb, 2)
+        return evals, evecs
+
+    def sparse_hamiltonian(self, k):
+        """
+        构造单个k点的CSR稀疏哈密顿量，非零元素个数与跃迁数成正比
+
+        参数:
+            k (numpy.ndarray): k点的分数坐标，形状为 (dimk,)
+
+        返回:
+            scipy.sparse.csr_matrix 或 CSRMatrix: 形状为 (nstate, nstate)
+        """
+        k = self._k_array(k)[0]
+        ns = self.nspin
+        amp = self._t * np.exp(2j * np.pi * (self._rv @ k)).reshape((-1,) + (1,) * (self._t.ndim - 1))
+        spins = np.arange(ns)
+        orbitals = np.arange(self.norb)
+
+        if self._t.ndim == 1:
+            # 与自旋无关的跃迁: 每个自旋分量各一份
+            row = (self._hop_i[:, None] * ns + spins).ravel()
+            col = (self._hop_j[:, None] * ns + spins).ravel()
+            data = np.repeat(amp, ns)
+        else:
+            row = (self._hop_i[:, None, None] * 2 + spins[:, None]).repeat(2, axis=2).ravel()
+            col = (self._hop_j[:, None, None] * 2 + spins[None, :]).repeat(2, axis=1).ravel()
+            data = amp.ravel()
+
+        if ns == 2:
+            onsite_row = (orbitals[:, None, None] * 2 + spins[:, None]).repeat(2, axis=2).ravel()
+            onsite_col = (orbitals[:, None, None] * 2 + spins[None, :]).repeat(2, axis=1).ravel()
+        else:
+            onsite_row = onsite_col = orbitals
+        onsite = self.onsite.ravel()
+        keep = onsite != 0
+
+        rows = np.concatenate([row, col, onsite_row[keep]])
+        cols = np.concatenate([col, row, onsite_col[keep]])
+        values = np.concatenate([data, data.conj(), onsite[keep]])
+        return to_csr(values, rows, cols, (self.nstate, self.nstate))
+
+    def solve_sparse(self, k_list, nev, sigma=0.0, eig_vectors=False):
+        """
+        对每个k点构造稀疏哈密顿量，只求最接近sigma的nev个本征对
+
+        参数:
+            k_list (numpy.ndarray): k点的分数坐标，形状为 (nk, dimk)
+            nev (int): 每个k点求解的本征对个数
+            sigma (float): 目标能量（如费米能级）
+            eig_vectors (bool): 是否返回本征矢量
+
+        返回:
+            numpy.ndarray: 本征值，形状为 (nev, nk)
+            eig_vectors为True时返回 (本征值, 本征矢量)，本征矢量形状与solve_all一致
+        """
+        if self.spin_diagonal:
+            result = self.solve_spin(k_list, eig_vectors=eig_vectors, nev=nev, sigma=sigma)
+            return (result[0], result[2]) if eig_vectors else result[0]
+
+        k_list = self._k_array(k_list)
+        nk = len(k_list)
+        nev = min(nev, self.nstate)
+        evals = np.zeros((nev, nk))
+        evecs = np.zeros((nev, nk, self.nstate), dtype=complex) if eig_vectors else None
+        for ik, k in enumerate(k_list):
+            result = eigsh_nearest(self.sparse_hamiltonian(k), nev, sigma, eig_vectors=eig_vectors)
+            if eig_vectors:
+                evals[:, ik], evecs[:, ik, :] = result[0], result[1].T
+            else:
+                evals[:, ik] = result
+
+        if not eig_vectors:
+            return evals
+        if self.nspin == 2:
+            evecs = evecs.reshape(nev, nk, self.norb, 2)
+        return evals, evecs
+
+    def spin_blocks(self):
+        """
+        把自旋分块对角的模型拆成两个nspin=1的模型，共用跃迁和预处理结果
+
+        返回:
+            list: [自旋向上的模型, 自旋向下的模型]
+        """
+        if not self.spin_diagonal:
+            raise ValueError("只有自旋分块对角的模型（跃迁与自旋无关，在位能只有sigma_z分量）才能按自旋拆分")
+        blocks = []
+        for s in range(2):
+            block = copy.copy(self)
+            block.nspin, block.nstate, block.spin_diagonal = 1, self.norb, False
+            block.onsite = self.onsite[:, s, s].copy()
+            blocks.append(block)
+        return blocks
+
+    def solve_spin(self, k_list, eig_vectors=False, nev=None, sigma=0.0):
+        """
+        分别对角化两个自旋块，合并后的本征值带有自旋标记
+
+        参数:
+            k_list (numpy.ndarray): k点的分数坐标，形状为 (nk, dimk)
+            eig_vectors (bool): 是否返回本征矢量
+            nev (int): 不为None时用solve_sparse在每个块中只求sigma附近的本征对，合并后保留nev个
+            sigma (float): 稀疏求解的目标能量
+
+        返回:
+            tuple: (本征值, 自旋标记) 或 (本征值, 自旋标记, 本征矢量)
+                自旋标记形状与本征值相同，+1为向上，-1为向下；本征矢量形状与solve_all一致
+        """
+        if nev is not None:
+            results = [block.solve_sparse(k_list, nev, sigma, eig_vectors) for block in self.spin_blocks()]
+        else:
+            results = self.solve_spin_channels(k_list, eig_vectors)
+        if eig_vectors:
+            return merge_spin_blocks([r[0] for r in results], [r[1] for r in results], nev, sigma)
+        return merge_spin_blocks(results, None, nev, sigma)
+
+    def solve_spin_channels(self, k_list, eig_vectors=False):
+        """
+        分别对角化自旋向上和向下两个块，两个块的跃迁部分相同，每块k点只构造一次
+
+        参数:
+            k_list (numpy.ndarray): k点的分数坐标，形状为 (nk, dimk)
+            eig_vectors (bool): 是否返回本征矢量
+
+        返回:
+            list: [向上, 向下]，每项为形状 (norb, nk) 的本征值，
+            eig_vectors为True时为 (本征值, 形状为 (norb, nk, norb) 的本征矢量)
+        """
+        up, down = self.spin_blocks()
+        k_list = self._k_array(k_list)
+        nk, norb = len(k_list), self.norb
+        evals = np.zeros((2, norb, nk))
+        evecs = np.zeros((2, norb, nk, norb), dtype=complex) if eig_vectors else None
+        orbitals = np.arange(norb)
+        chunk = max(1, CHUNK_ELEMENTS // max(1, norb * norb + len(self._t)))
+        for start in range(0, nk, chunk):
+            stop = min(start + chunk, nk)
+            ham = up.hamiltonian(k_list[start:stop])
+            for s in range(2):
+                if s == 1:
+                    ham[:, orbitals, orbitals] += down.onsite - up.onsite
+                if eig_vectors:
+                    vals, vecs = np.linalg.eigh(ham)
+                    evecs[s, :, start:stop] = vecs.transpose(2, 0, 1)
+                else:
+                    vals = np.linalg.eigvalsh(ham)
+                evals[s, :, start:stop] = vals.T
+        if eig_vectors:
+            return [(evals[s], evecs[s]) for s in range(2)]
+        return [evals[0], evals[1]]
+
+    def k_path(self, kpath, nk):
+        """
+        在节点之间均匀插值生成k点路径，与pythtb的k_path结果一致（不打印报告）
+
+        参数:
+            kpath (list): k路径节点的分数坐标
+            nk (int): k点总数
+
+        返回:
+            tuple: (k_vec, k_dist, k_node)
+        """
+        k_list = np.array(kpath, dtype=float).reshape(-1, self.dimk)
+        n_nodes = len(k_list)
+        if nk < n_nodes:
+            raise ValueError("Must have more points in the path than number of nodes.")
+
+        lat_per = self.lattice[self.per]
+        k_metric = np.linalg.inv(lat_per @ lat_per.T)
+        dk = np.diff(k_list, axis=0)
+        k_node = np.r_[0.0, np.cumsum(np.sqrt(np.einsum("ni,ij,nj->n", dk, k_metric, dk)))]
+
+        node_index = [0] + [int(round(k_node[n] / k_node[-1] * (nk - 1))) for n in range(1, n_nodes - 1)] + [nk - 1]
+
+        k_dist = np.zeros(nk)
+        k_vec = np.zeros((nk, self.dimk))
+        k_vec[0] = k_list[0]
+        for n in range(1, n_nodes):
+            n_i, n_f = node_index[n - 1], node_index[n]
+            frac = (np.arange(n_i, n_f + 1) - n_i) / float(n_f - n_i)
+            k_dist[n_i:n_f + 1] = k_node[n - 1] + frac * (k_node[n] - k_node[n - 1])
+            k_vec[n_i:n_f + 1] = k_list[n - 1] + frac[:, None] * (k_list[n] - k_list[n - 1])
+        return k_vec, k_dist, k_node
+
+
+def merge_spin_blocks(evals, evecs=None, nev=None, sigma=0.0):
+    """
+    把自旋向上和向下两个块的本征值（和本征矢量）合并为按能量排序的能带
+
+    参数:
+        evals (list): 两个块的本征值，形状均为 (nband_block, nk)
+        evecs (list): 两个块的本征矢量，形状均为 (nband_block, nk, norb)，为None时不合并本征矢量
+        nev (int): 不为None时每个k点只保留最接近sigma的nev个态
+        sigma (float): 目标能量
+
+    返回:
+        tuple: (本征值, 自旋标记) 或 (本征值, 自旋标记, 本征矢量)，本征矢量形状为 (nband, nk, norb, 2)
+    """
+    values = np.concatenate(evals, axis=0)
+    spin = np.concatenate([np.ones(evals[0].shape), -np.ones(evals[1].shape)], axis=0)
+    if nev is None:
+        order = np.argsort(values, axis=0, kind="stable")
+    else:
+        nearest = np.argsort(np.abs(values - sigma), axis=0, kind="stable")[:min(nev, len(values))]
+        order = np.take_along_axis(nearest, np.argsort(np.take_along_axis(values, nearest, axis=0), axis=0), axis=0)
+    values = np.take_along_axis(values, order, axis=0)
+    spin = np.take_along_axis(spin, order, axis=0)
+    if evecs is None:
+        return values, spin
+
+    n_up, nk, norb = evecs[0].shape
+    vectors = np.zeros((n_up + len(evecs[1]), nk, norb, 2), dtype=complex)
+    vectors[:n_up, :, :, 0] = evecs[0]
+    vectors[n_up:, :, :, 1] = evecs[1]
+    return values, spin, np.take_along_axis(vectors, order[:, :, None, None], axis=0)
+
+
+def _as_int_array(values):
+    """返回整数数组，已是整数类型时不复制"""
+    values = np.asarray(values)
+    if values.dtype.kind in "iu":
+        return values
+    return values.astype(int)
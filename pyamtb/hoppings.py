@@ -0,0 +1,173 @@
+"""
+跃迁表：用连续的NumPy结构化数组保存所有跃迁 (i, j, R, t, d)
+
+HoppingTable.from_arrays(i, j, R, t, d) 由数组构造跃迁表
+
+HoppingTable.from_couplings(couplings) 由calculate_all_couplings返回的字典列表构造跃迁表
+
+HoppingTable.deduplicate() 用np.unique在标准化的键上去除共轭重复的跃迁
+
+HoppingTable.set_hops(model) 把跃迁写入pythtb模型
+
+
+"""
+
+import numpy as np
+
+# 跃迁表的数据类型：原子索引、格矢量、跃迁强度和距离
+HOPPING_DTYPE = np.dtype([
+    ("i", np.int32),
+    ("j", np.int32),
+    ("R", np.int32, (3,)),
+    ("t", np.float64),
+    ("d", np.float64),
+])
+
+
+class HoppingTable:
+    """
+    以结构化数组保存的跃迁表，每一行为一个跃迁 t * c_i^† c_j(R)
+
+    i, j, R, t, d 属性均为底层数组的视图，可以直接传给BlochHamiltonian而不复制。
+    """
+
+    __slots__ = ("data",)
+
+    def __init__(self, data=None):
+        """
+        参数:
+            data (numpy.ndarray): dtype为HOPPING_DTYPE的结构化数组，为None时创建空表
+        """
+        self.data = np.zeros(0, dtype=HOPPING_DTYPE) if data is None else np.asarray(data, dtype=HOPPING_DTYPE)
+
+    @classmethod
+    def from_arrays(cls, i, j, R, t, d=None):
+        """
+        由各列数组构造跃迁表
+
+        参数:
+            i, j (numpy.ndarray): 原子索引，形状为 (n_hop,)
+            R (numpy.ndarray): 格矢量，形状为 (n_hop, 3)
+            t (numpy.ndarray): 跃迁强度，形状为 (n_hop,)
+            d (numpy.ndarray): 跃迁距离，形状为 (n_hop,)，默认为0
+
+        返回:
+            HoppingTable: 跃迁表
+        """
+        data = np.zeros(len(i), dtype=HOPPING_DTYPE)
+        data["i"], data["j"], data["t"] = i, j, t
+        data["R"] = np.asarray(R).reshape(len(i), 3)
+        if d is not None:
+            data["d"] = d
+        return cls(data)
+
+    @classmethod
+    def from_couplings(cls, couplings):
+        """
+        由calculate_all_couplings返回的字典列表构造跃迁表
+
+        参数:
+            couplings (list): 跃迁信息列表
+
+        返回:
+            HoppingTable: 跃迁表
+        """
+        counts = [len(hop["coupling_values"]) for hop in couplings]
+        return cls.from_arrays(
+            np.repeat([hop["atom1_index"] for hop in couplings], counts),
+            np.repeat([hop["atom2_index"] for hop in couplings], counts),
+            np.array([R for hop in couplings for R in hop["R_vectors"]], dtype=int).reshape(-1, 3),
+            np.array([t for hop in couplings for t in hop["coupling_values"]], dtype=float),
+            np.array([d for hop in couplings for d in hop["distance_values"]], dtype=float))
+
+    def to_couplings(self, elements=None):
+        """
+        转换为字典列表，每个字典只包含一个跃迁，格式与remove_duplicate_hoppings的返回值相同
+
+        参数:
+            elements (list): 写入每个字典的元素列表
+
+        返回:
+            list: 跃迁信息列表
+        """
+        return [{
+            "atom1_index": int(row["i"]),
+            "atom2_index": int(row["j"]),
+            "elements": elements,
+            "coupling_values": [row["t"]],
+            "distance_values": [row["d"]],
+            "R_vectors": [[int(r) for r in row["R"]]],
+        } for row in self.data]
+
+    @property
+    def i(self):
+        return self.data["i"]
+
+    @property
+    def j(self):
+        return self.data["j"]
+
+    @property
+    def R(self):
+        return self.data["R"]
+
+    @property
+    def t(self):
+        return self.data["t"]
+
+    @property
+    def d(self):
+        return self.data["d"]
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, index):
+        return HoppingTable(self.data[index])
+
+    def __repr__(self):
+        return f"HoppingTable({len(self)} hoppings)"
+
+    def canonical_keys(self):
+        """
+        计算每个跃迁的标准化键，(i, j, R) 与其共轭 (j, i, -R) 的键相同
+
+        i < j 时键为 (i, j, R)；i > j 时为 (j, i, -R)；i == j 时取 R 与 -R 中第一个非零分量为正的一个。
+
+        返回:
+            numpy.ndarray: 形状为 (n_hop, 5) 的整数数组
+        """
+        i, j, R = self.i.astype(np.int64), self.j.astype(np.int64), self.R.astype(np.int64)
+        flip = i > j
+        # i == j 时按第一个非零分量的符号翻转
+        nonzero = R != 0
+        first = np.argmax(nonzero, axis=1)
+        lead = R[np.arange(len(R)), first]
+        flip |= (i == j) & (lead < 0)
+        sign = np.where(flip, -1, 1)[:, None]
+        return np.column_stack([np.minimum(i, j), np.maximum(i, j), sign * R])
+
+    def deduplicate(self):
+        """
+        去除共轭重复的跃迁，保留每组中第一次出现的跃迁，顺序不变
+
+        返回:
+            HoppingTable: 去重后的跃迁表
+        """
+        if len(self) == 0:
+            return HoppingTable(self.data.copy())
+        _, first = np.unique(self.canonical_keys(), axis=0, return_index=True)
+        return HoppingTable(self.data[np.sort(first)])
+
+    def set_hops(self, model, verbose=False):
+        """
+        把跃迁写入pythtb模型
+
+        参数:
+            model (pythtb.tb_model): 紧束缚模型
+            verbose (bool): 是否打印对应的set_hop语句
+        """
+        for t, i, j, R, d in zip(self.t.tolist(), self.i.tolist(), self.j.tolist(), self.R.tolist(), self.d.tolist()):
+            model.set_hop(t, i, j, R, allow_conjugate_pair=True)
+            if verbose:
+                print(f"model.set_hop({t}, {i}, {j}, [{R[0]}, {R[1]}, {R[2]}]) # distance: {d}")
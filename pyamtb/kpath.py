@@ -0,0 +1,122 @@
+"""
+自适应k路径：从粗的均匀路径开始，只在能带弯曲、近简并或本征矢量顺序改变的区间内二分加点
+
+path_points(kpath, k_node, k_dist) 由路径上的距离计算k点的分数坐标
+
+refine_flags(k_dist, evals, evecs, k_node, tolerance, energy_threshold, overlap_threshold) 找出需要二分的区间
+
+adaptive_k_path(solve, kpath, k_vec, k_dist, k_node, tolerance, resolution, energy_threshold) 自适应加点并求解能带
+
+
+"""
+
+import numpy as np
+
+
+def path_points(kpath, k_node, k_dist):
+    """
+    由路径上的距离计算k点的分数坐标，每段路径在k空间中是直线，距离与k线性相关
+
+    参数:
+        kpath (list): 路径节点的分数坐标，形状为 (n_node, dimk)
+        k_node (numpy.ndarray): 节点在路径上的距离
+        k_dist (numpy.ndarray): 需要计算的k点在路径上的距离
+
+    返回:
+        numpy.ndarray: k点的分数坐标，形状为 (nk, dimk)
+    """
+    kpath = np.asarray(kpath, dtype=float).reshape(len(k_node), -1)
+    return np.stack([np.interp(k_dist, k_node, kpath[:, d]) for d in range(kpath.shape[1])], axis=-1)
+
+
+def refine_flags(k_dist, evals, evecs, k_node, tolerance=1e-3, energy_threshold=1e-5, overlap_threshold=0.5):
+    """
+    找出需要二分的相邻k点区间
+
+    满足下列任一条件的区间会被标记：
+        - 弯曲：相邻三个点中间点偏离两端连线超过tolerance（节点处路径转折，不检查）
+        - 近简并：一端有能带间隔小于energy_threshold而另一端没有，说明区间内可能有交叉
+        - 顺序改变：某条能带在区间两端的本征矢量（在tolerance内的近简并子空间上）重叠小于overlap_threshold
+
+    参数:
+        k_dist (numpy.ndarray): k点在路径上的距离，形状为 (nk,)
+        evals (numpy.ndarray): 本征值，形状为 (nband, nk)
+        evecs (numpy.ndarray): 本征矢量，形状为 (nband, nk, ...)，为None时不检查顺序改变
+        k_node (numpy.ndarray): 节点在路径上的距离
+        tolerance (float): 能量容差（eV）
+        energy_threshold (float): 判断能带简并的能量阈值
+        overlap_threshold (float): 本征矢量重叠的阈值
+
+    返回:
+        numpy.ndarray: 布尔数组，形状为 (nk - 1,)
+    """
+    nk = len(k_dist)
+    flags = np.zeros(nk - 1, dtype=bool)
+    if nk < 2:
+        return flags
+
+    # 弯曲：中间点到两端连线的能量偏差
+    if nk > 2:
+        left, right = k_dist[1:-1] - k_dist[:-2], k_dist[2:] - k_dist[1:-1]
+        span = np.where(left + right > 0, left + right, 1.0)
+        chord = (evals[:, :-2] * right + evals[:, 2:] * left) / span
+        bent = np.abs(evals[:, 1:-1] - chord).max(axis=0) > tolerance
+        bent &= ~np.isin(k_dist[1:-1], k_node)
+        flags[:-1] |= bent
+        flags[1:] |= bent
+
+    # 近简并：只在一端简并的区间
+    if evals.shape[0] > 1:
+        gap = np.diff(np.sort(evals, axis=0), axis=0).min(axis=0)
+        near = gap < energy_threshold
+        flags |= near[:-1] != near[1:]
+
+    # 顺序改变：能带n在k点p的本征矢量投影到k点p+1上与它近简并的子空间
+    if evecs is not None:
+        vecs = evecs.reshape(evecs.shape[0], nk, -1)
+        overlap = np.abs(np.einsum('nki,mki->knm', vecs[:, :-1].conj(), vecs[:, 1:])) ** 2
+        window = np.abs(evals[None, :, 1:] - evals[:, None, 1:]) < tolerance
+        weight = np.einsum('knm,nmk->kn', overlap, window)
+        flags |= (weight < overlap_threshold).any(axis=1)
+    return flags
+
+
+def adaptive_k_path(solve, kpath, k_vec, k_dist, k_node, tolerance=1e-3, resolution=1e-4,
+                    energy_threshold=1e-5, overlap_threshold=0.5, max_iter=50):
+    """
+    自适应k路径：从粗的均匀路径开始，反复把refine_flags标记的区间二分，
+    直到没有需要加点的区间或区间长度达到目标分辨率，每轮只对新加的点求解
+
+    参数:
+        solve (callable): solve(k_points) 返回 (本征值, 本征矢量)，与solve_all(eig_vectors=True)相同
+        kpath (list): 路径节点的分数坐标
+        k_vec, k_dist, k_node: 粗的初始路径，k_path的返回值，k_node中的节点必须在k_dist中
+        tolerance (float): 能量容差（eV），见refine_flags
+        resolution (float): 最小区间长度，以路径总长度为单位
+        energy_threshold (float): 判断能带简并的能量阈值
+        overlap_threshold (float): 本征矢量重叠的阈值
+        max_iter (int): 最大加点轮数
+
+    返回:
+        tuple: (k_vec, k_dist, evals, evecs)，k点按路径距离排序
+    """
+    k_node = np.asarray(k_node, dtype=float)
+    k_dist = np.asarray(k_dist, dtype=float)
+    k_vec = np.asarray(k_vec, dtype=float).reshape(len(k_dist), -1)
+    min_step = resolution * (k_dist[-1] - k_dist[0])
+    evals, evecs = solve(k_vec)
+
+    for _ in range(max_iter):
+        flags = refine_flags(k_dist, evals, evecs, k_node, tolerance, energy_threshold, overlap_threshold)
+        flags &= np.diff(k_dist) > 2 * min_step
+        if not flags.any():
+            break
+        new_dist = 0.5 * (k_dist[:-1] + k_dist[1:])[flags]
+        new_vec = path_points(kpath, k_node, new_dist)
+        new_evals, new_evecs = solve(new_vec)
+        order = np.argsort(np.concatenate([k_dist, new_dist]), kind="stable")
+        k_dist = np.concatenate([k_dist, new_dist])[order]
+        k_vec = np.concatenate([k_vec, new_vec])[order]
+        evals = np.concatenate([evals, new_evals], axis=1)[:, order]
+        evecs = np.concatenate([evecs, new_evecs], axis=1)[:, order]
+    return k_vec, k_dist, evals, evecs
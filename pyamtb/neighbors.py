@@ -0,0 +1,277 @@
+"""
+近邻搜索：一次性以数组运算求出所有 (i, j, R) 原子对的位移与距离
+
+lattice_translations(dimk, max_neighbors) 生成与dimk周期性一致的格矢量列表
+
+find_neighbors(coords, lattice, R_vectors, mindist, maxdistance) 广播计算所有原子对在所有格矢量下的距离，并按距离范围筛选
+
+image_range(lattice, maxdistance, dimk, coords) 根据晶格几何和截断距离计算每个方向需要的格矢量范围
+
+cell_list_neighbors(coords, lattice, mindist, maxdistance, dimk) 链表格子（cell list）近邻搜索，原子数线性复杂度
+
+neighbor_pairs(coords, lattice, dimk, mindist, maxdistance, max_neighbors) 根据max_neighbors选择固定格矢量范围或cell list搜索
+
+
+"""
+
+import numpy as np
+
+# 单个分块中位移数组的最大元素数，用于限制内存占用
+CHUNK_ELEMENTS = 1 << 22
+
+
+def lattice_translations(dimk, max_neighbors):
+    """
+    生成相邻格点的格矢量，顺序与逐个循环 i, j, k 的结果一致
+
+    参数:
+        dimk (int): k空间维度，只在前dimk个方向上平移
+        max_neighbors (int): 每个方向上的最大平移数
+
+    返回:
+        numpy.ndarray: 格矢量数组，形状为 (n_R, 3)，整数类型
+    """
+    if dimk not in (1, 2, 3):
+        raise ValueError(f"dimk must be 1, 2, or 3, but got {dimk}")
+    steps = np.arange(-max_neighbors, max_neighbors + 1)
+    zero = np.zeros(1, dtype=int)
+    axes = [steps if d < dimk else zero for d in range(3)]
+    grid = np.meshgrid(*axes, indexing="ij")
+    return np.stack([g.ravel() for g in grid], axis=1).astype(int)
+
+
+def find_neighbors(coords, lattice, R_vectors, mindist, maxdistance, upper=True):
+    """
+    广播计算所有原子对 (i, j) 在所有格矢量 R 下的距离 |coords[j] + R - coords[i]|
+
+    参数:
+        coords (numpy.ndarray): 原子分数坐标，形状为 (n_atoms, 3)
+        lattice (numpy.ndarray): 晶格矩阵，形状为 (3, 3)
+        R_vectors (numpy.ndarray): 格矢量数组，形状为 (n_R, 3)
+        mindist (float): 最小距离，小于该距离的原子对被舍弃
+        maxdistance (float): 最大距离，大于该距离的原子对被舍弃
+        upper (bool): 为True时只保留 i <= j 的原子对
+
+    返回:
+        tuple: (atom1, atom2, R, distance)
+            - atom1, atom2: 原子索引数组，形状为 (n_pairs,)
+            - R: 格矢量数组，形状为 (n_pairs, 3)
+            - distance: 距离数组，形状为 (n_pairs,)
+        结果按 (i, j, R在R_vectors中的顺序) 排列
+    """
+    coords = np.asarray(coords, dtype=float).reshape(-1, 3)
+    lattice = np.asarray(lattice, dtype=float)
+    R_vectors = np.asarray(R_vectors, dtype=int).reshape(-1, 3)
+    n_atoms, n_R = len(coords), len(R_vectors)
+
+    atom1, atom2, R_index, distance = [], [], [], []
+    if n_atoms == 0 or n_R == 0:
+        return _pack_neighbors(atom1, atom2, R_index, distance, R_vectors)
+
+    # (n_atoms, n_R, 3): 每个原子平移到所有相邻格点后的分数坐标
+    shifted = coords[:, None, :] + R_vectors[None, :, :]
+    j_index = np.arange(n_atoms)
+
+    rows = max(1, CHUNK_ELEMENTS // (3 * n_atoms * n_R))
+    for start in range(0, n_atoms, rows):
+        stop = min(start + rows, n_atoms)
+        # (rows, n_atoms, n_R, 3)
+        diff = shifted[None, :, :, :] - coords[start:stop, None, None, :]
+        cart_diff = diff @ lattice
+        dist = np.sqrt(np.einsum("...k,...k->...", cart_diff, cart_diff))
+
+        mask = (dist <= maxdistance) & (dist >= mindist)
+        if upper:
+            mask &= (j_index[None, :] >= np.arange(start, stop)[:, None])[:, :, None]
+
+        ii, jj, rr = np.nonzero(mask)
+        atom1.append(ii + start)
+        atom2.append(jj)
+        R_index.append(rr)
+        distance.append(dist[ii, jj, rr])
+
+    return _pack_neighbors(atom1, atom2, R_index, distance, R_vectors)
+
+
+def image_range(lattice, maxdistance, dimk, coords=None):
+    """
+    计算覆盖截断距离所需的格矢量范围，只在前dimk个周期方向上平移
+
+    截断球在第a个方向上的分数坐标跨度为 maxdistance * |b_a|，其中 b_a 为
+    inv(lattice) 的第a列（倒格矢除以2π），再加上原子分数坐标本身的跨度。
+
+    参数:
+        lattice (numpy.ndarray): 晶格矩阵，形状为 (3, 3)
+        maxdistance (float): 截断距离
+        dimk (int): k空间维度
+        coords (numpy.ndarray): 原子分数坐标，为None时假设坐标跨度为1
+
+    返回:
+        numpy.ndarray: 每个方向的最大平移数，形状为 (3,)，非周期方向为0
+    """
+    if dimk not in (1, 2, 3):
+        raise ValueError(f"dimk must be 1, 2, or 3, but got {dimk}")
+    reach = maxdistance * _reciprocal_norms(lattice)
+    if coords is None or len(coords) == 0:
+        spread = np.ones(3)
+    else:
+        coords = np.asarray(coords, dtype=float).reshape(-1, 3)
+        spread = coords.max(axis=0) - coords.min(axis=0)
+    n_images = np.ceil(reach + spread - 1e-12).astype(int)
+    n_images[dimk:] = 0
+    return n_images
+
+
+def image_translations(lattice, maxdistance, dimk, coords=None):
+    """
+    生成覆盖截断距离所需的全部格矢量，顺序与lattice_translations一致
+
+    返回:
+        numpy.ndarray: 格矢量数组，形状为 (n_R, 3)
+    """
+    n_images = image_range(lattice, maxdistance, dimk, coords)
+    axes = [np.arange(-n, n + 1) for n in n_images]
+    grid = np.meshgrid(*axes, indexing="ij")
+    return np.stack([g.ravel() for g in grid], axis=1).astype(int)
+
+
+def cell_list_neighbors(coords, lattice, mindist, maxdistance, dimk, upper=True):
+    """
+    用链表格子（cell list）搜索截断距离内的所有原子对，格矢量范围由晶格几何自动确定
+
+    周期方向上把晶胞划分为宽度不小于截断距离的格子，每个原子只需与相邻格子
+    （必要时跨越晶胞边界并记录对应的格矢量）中的原子比较；非周期方向上不做平移。
+    计算量随原子数近似线性增长。
+
+    参数:
+        coords (numpy.ndarray): 原子分数坐标，形状为 (n_atoms, 3)
+        lattice (numpy.ndarray): 晶格矩阵，形状为 (3, 3)
+        mindist (float): 最小距离
+        maxdistance (float): 最大距离
+        dimk (int): k空间维度，前dimk个方向为周期方向
+        upper (bool): 为True时只保留 i <= j 的原子对
+
+    返回:
+        tuple: (atom1, atom2, R, distance)，与find_neighbors的返回值相同，
+        按 (i, j, R) 的字典序排列
+    """
+    if dimk not in (1, 2, 3):
+        raise ValueError(f"dimk must be 1, 2, or 3, but got {dimk}")
+    coords = np.asarray(coords, dtype=float).reshape(-1, 3)
+    lattice = np.asarray(lattice, dtype=float)
+    n_atoms = len(coords)
+    empty = ([], [], [], [], np.empty((0, 3), dtype=int))
+    if n_atoms == 0:
+        return _pack_neighbors(*empty[:4], empty[4])
+
+    periodic = np.arange(3) < dimk
+    reach = maxdistance * _reciprocal_norms(lattice)
+
+    # 周期方向先把原子折回晶胞内，记录折回的格矢量
+    shift = np.where(periodic, np.floor(coords), 0).astype(int)
+    frac = coords - shift
+    origin = np.where(periodic, 0.0, frac.min(axis=0))
+
+    # 每个方向的格子数：周期方向格子宽度 1/n >= reach，非周期方向格子宽度为reach
+    n_cells = np.ones(3, dtype=int)
+    for a in range(3):
+        if reach[a] <= 0:
+            continue
+        if periodic[a]:
+            n_cells[a] = max(1, int(np.floor(1.0 / reach[a])))
+        else:
+            n_cells[a] = int(np.floor((frac[:, a].max() - origin[a]) / reach[a])) + 1
+    # 格子数不超过原子数的量级，避免真空层等导致大量空格子
+    while np.prod(n_cells) > 4 * n_atoms + 8:
+        n_cells[np.argmax(n_cells)] = max(1, n_cells[np.argmax(n_cells)] // 2)
+    span = frac.max(axis=0) - origin
+    width = np.where(periodic, 1.0 / n_cells,
+                     np.maximum(np.maximum(reach, 1e-12), (span + 1e-9) / n_cells))
+
+    cell = np.floor((frac - origin) / width).astype(int)
+    cell = np.clip(cell, 0, n_cells - 1)
+    cell_id = np.ravel_multi_index(cell.T, n_cells)
+    order = np.argsort(cell_id, kind="stable")
+    counts = np.bincount(cell_id, minlength=int(np.prod(n_cells)))
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    # 相邻格子的偏移范围：周期方向上截断球可能跨越多个格子
+    reach_cells = np.where(periodic, np.ceil(reach * n_cells - 1e-12), 1).astype(int)
+    reach_cells = np.maximum(reach_cells, 1)
+    offsets = np.stack([g.ravel() for g in np.meshgrid(
+        *[np.arange(-m, m + 1) for m in reach_cells], indexing="ij")], axis=1)
+
+    cart = frac @ lattice
+    atom_index = np.arange(n_atoms)
+    atom1, atom2, R_list, distance = [], [], [], []
+    for offset in offsets:
+        target = cell + offset
+        image = np.where(periodic, np.floor_divide(target, n_cells), 0)
+        valid = np.all(periodic | ((target >= 0) & (target < n_cells)), axis=1)
+        target = np.where(periodic, np.mod(target, n_cells), np.clip(target, 0, n_cells - 1))
+        target_id = np.ravel_multi_index(target.T, n_cells)
+
+        n_found = np.where(valid, counts[target_id], 0)
+        total = int(n_found.sum())
+        if total == 0:
+            continue
+        ii = np.repeat(atom_index, n_found)
+        first = np.repeat(np.cumsum(n_found) - n_found, n_found)
+        jj = order[np.repeat(starts[target_id], n_found) + np.arange(total) - first]
+        R_image = image[ii]
+
+        cart_diff = cart[jj] + R_image @ lattice - cart[ii]
+        dist = np.sqrt(np.einsum("ij,ij->i", cart_diff, cart_diff))
+        mask = (dist <= maxdistance) & (dist >= mindist)
+        if upper:
+            mask &= jj >= ii
+        ii, jj = ii[mask], jj[mask]
+        atom1.append(ii)
+        atom2.append(jj)
+        # 换算回原始（未折回）坐标下的格矢量
+        R_list.append(R_image[mask] + shift[ii] - shift[jj])
+        distance.append(dist[mask])
+
+    if not atom1:
+        return _pack_neighbors(*empty[:4], empty[4])
+    atom1, atom2 = np.concatenate(atom1), np.concatenate(atom2)
+    R_vectors, distance = np.concatenate(R_list), np.concatenate(distance)
+    order = np.lexsort((R_vectors[:, 2], R_vectors[:, 1], R_vectors[:, 0], atom2, atom1))
+    return atom1[order], atom2[order], R_vectors[order], distance[order]
+
+
+def neighbor_pairs(coords, lattice, dimk, mindist, maxdistance, max_neighbors=None, upper=True):
+    """
+    搜索截断距离内的原子对
+
+    参数:
+        max_neighbors (int): 为None时使用cell list自动确定格矢量范围，
+            否则在 [-max_neighbors, max_neighbors] 的固定格矢量范围内搜索
+        其余参数同find_neighbors
+
+    返回:
+        tuple: (atom1, atom2, R, distance)
+    """
+    if max_neighbors is None:
+        return cell_list_neighbors(coords, lattice, mindist, maxdistance, dimk, upper=upper)
+    required = image_range(lattice, maxdistance, dimk, coords)
+    if np.any(required > max_neighbors):
+        print(f"警告: max_neighbors={max_neighbors} 小于覆盖 max_distance={maxdistance} "
+              f"所需的格矢量范围 {required.tolist()}，部分跃迁可能被忽略")
+    R_vectors = lattice_translations(dimk, max_neighbors)
+    return find_neighbors(coords, lattice, R_vectors, mindist, maxdistance, upper=upper)
+
+
+def _reciprocal_norms(lattice):
+    """inv(lattice) 各列的模，即各方向晶面间距的倒数"""
+    return np.linalg.norm(np.linalg.inv(np.asarray(lattice, dtype=float)), axis=0)
+
+
+def _pack_neighbors(atom1, atom2, R_index, distance, R_vectors):
+    """将分块结果拼接为数组"""
+    if not atom1:
+        return (np.empty(0, dtype=int), np.empty(0, dtype=int),
+                np.empty((0, 3), dtype=int), np.empty(0, dtype=float))
+    R_index = np.concatenate(R_index)
+    return (np.concatenate(atom1), np.concatenate(atom2),
+            R_vectors[R_index], np.concatenate(distance))
@@ -0,0 +1,158 @@
+"""
+多进程并行对角化：把k点分块交给进程池，结果直接写入共享内存
+
+solve_parallel(ham, k_list, workers, eig_vectors) 并行求解，返回值与BlochHamiltonian.solve_all一致
+
+limit_blas_threads(n) 临时设置BLAS线程数的环境变量，避免进程池中线程过度订阅
+
+limit_worker_threads() 工作进程初始化函数：用threadpoolctl把BLAS线程数限制为1
+
+
+"""
+
+import os
+from contextlib import contextmanager
+from multiprocessing import get_context, shared_memory
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# 控制常见BLAS/OpenMP实现线程数的环境变量
+BLAS_THREAD_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+# 工作进程中的模型和共享内存，由_init_worker设置
+_worker = {}
+
+
+@contextmanager
+def limit_blas_threads(n_threads=1):
+    """
+    在上下文中把BLAS线程数环境变量设为n_threads，退出时恢复
+
+    以spawn方式启动的子进程会在导入numpy之前继承这些环境变量。
+    """
+    saved = {name: os.environ.get(name) for name in BLAS_THREAD_VARS}
+    for name in BLAS_THREAD_VARS:
+        os.environ[name] = str(n_threads)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def limit_worker_threads():
+    """
+    工作进程初始化：BLAS库已经加载时环境变量不再起作用，安装了threadpoolctl时再把线程数限制为1。
+    可以直接作为ProcessPoolExecutor的initializer，也可以在其他初始化函数中调用
+    """
+    try:
+        from threadpoolctl import threadpool_limits
+        _worker["limits"] = threadpool_limits(1)
+    except ImportError:
+        pass
+
+
+def _init_worker(ham, evals_spec, evecs_spec, sparse_nev, sigma):
+    """工作进程初始化：保存模型，连接共享内存，并限制BLAS线程数"""
+    limit_worker_threads()
+    _worker["ham"] = ham
+    _worker["sparse_nev"] = sparse_nev
+    _worker["sigma"] = sigma
+    _worker["evals"] = _attach(*evals_spec)
+    _worker["evecs"] = _attach(*evecs_spec) if evecs_spec is not None else None
+
+
+def _attach(name, shape, dtype):
+    """连接到已有的共享内存块，返回 (SharedMemory, ndarray)"""
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _solve_chunk(start, stop, k_chunk):
+    """在工作进程中求解一块k点，结果写入共享内存的 [start, stop) 部分"""
+    ham = _worker["ham"]
+    eig_vectors = _worker["evecs"] is not None
+    if _worker["sparse_nev"] is None:
+        result = ham.solve_all(k_chunk, eig_vectors=eig_vectors)
+    else:
+        result = ham.solve_sparse(k_chunk, _worker["sparse_nev"], _worker["sigma"], eig_vectors=eig_vectors)
+    evals_view = _worker["evals"][1]
+    if eig_vectors:
+        evals_view[:, start:stop] = result[0]
+        evecs_view = _worker["evecs"][1]
+        evecs_view[:, start:stop] = result[1]
+    else:
+        evals_view[:, start:stop] = result
+    return stop - start
+
+
+def _create_shared(shape, dtype):
+    """创建共享内存块，返回 (SharedMemory, ndarray)"""
+    size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def solve_parallel(ham, k_list, workers, eig_vectors=False, chunk_size=None, sparse_nev=None, sigma=0.0):
+    """
+    用进程池并行对角化所有k点，工作进程把本征值（和本征矢量）直接写入共享内存
+
+    参数:
+        ham (BlochHamiltonian): 数组形式的紧束缚模型
+        k_list (numpy.ndarray): k点的分数坐标，形状为 (nk, dimk)
+        workers (int): 进程数，小于等于1时在当前进程中串行求解
+        eig_vectors (bool): 是否返回本征矢量
+        chunk_size (int): 每个任务的k点数，默认把k点平均分成 4*workers 块
+        sparse_nev (int): 不为None时使用solve_sparse只求sigma附近的sparse_nev条能带
+        sigma (float): 稀疏求解的目标能量
+
+    返回:
+        与BlochHamiltonian.solve_all（或solve_sparse）相同
+    """
+    k_list = ham._k_array(k_list)
+    nk = len(k_list)
+    if workers is None or workers <= 1 or nk < 2:
+        if sparse_nev is None:
+            return ham.solve_all(k_list, eig_vectors=eig_vectors)
+        return ham.solve_sparse(k_list, sparse_nev, sigma, eig_vectors=eig_vectors)
+
+    workers = min(int(workers), nk)
+    nbands = ham.nstate if sparse_nev is None else min(sparse_nev, ham.nstate)
+    evecs_shape = (nbands, nk) + ((ham.norb, 2) if ham.nspin == 2 else (ham.norb,))
+    if chunk_size is None:
+        chunk_size = max(1, -(-nk // (4 * workers)))
+
+    evals_shm, evals = _create_shared((nbands, nk), np.float64)
+    evecs_shm, evecs = _create_shared(evecs_shape, np.complex128) if eig_vectors else (None, None)
+    try:
+        evals_spec = (evals_shm.name, evals.shape, evals.dtype)
+        evecs_spec = (evecs_shm.name, evecs.shape, evecs.dtype) if eig_vectors else None
+        with limit_blas_threads(1), ProcessPoolExecutor(
+                max_workers=workers, mp_context=get_context("spawn"), initializer=_init_worker,
+                initargs=(ham, evals_spec, evecs_spec, sparse_nev, sigma)) as pool:
+            futures = [pool.submit(_solve_chunk, start, min(start + chunk_size, nk),
+                                   k_list[start:start + chunk_size])
+                       for start in range(0, nk, chunk_size)]
+            for future in futures:
+                future.result()
+        evals = evals.copy()
+        evecs = evecs.copy() if eig_vectors else None
+    finally:
+        for shm in (evals_shm, evecs_shm):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+    if eig_vectors:
+        return evals, evecs
+    return evals
@@ -9,18 +9,19 @@ from .read_datas import read_parameters
 import os
 
 class Parameters:
-    def __init__(self, config_file: Optional[str] = None):
+    def __init__(self, config_file: Optional[str] = None, check_poscar: bool = True):
         """
         Initialize parameters from configuration file.
         
         Args:
             config_file (str, optional): Path to the configuration file. If None, uses default parameters.
+            check_poscar (bool): Check use_elements against poscar_filename. Batch runs check each structure instead.
         """
         if config_file is None:
             # 使用默认配置
             self._initialize_default_parameters()
         else:
-            self.tbparas = read_parameters(config_file)
+            self.tbparas = read_parameters(config_file, check_poscar)
             self._initialize_parameters()
 
     def _initialize_default_parameters(self):
@@ -48,12 +49,29 @@ class Parameters:
         self.klabel = ["G", "X", "M", "Y", "G", "M"]
         self.num_k_points = 100
         self.max_neighbors = 1
+        self.neighbor_search = "cell_list"
         self.is_print_tb_model_hop = True
         self.is_check_flat_bands = True
         self.is_print_tb_model = True
         self.is_black_degenerate_bands = True
         self.ylim = [-1, 1]
         self.energy_threshold = 1e-5
+        self.solver = "numpy"
+        self.sparse_num_bands = 10
+        self.sparse_target_energy = None
+        self.workers = 1
+        self.cache_dir = ""
+        self.cache_max_mb = 512
+        self.store_dir = ""
+        self.adaptive_kpath = False
+        self.adaptive_tolerance = 1e-3
+        self.adaptive_resolution = 1e-4
+        self.dos_mesh = [40, 40, 40]
+        self.dos_method = "gaussian"
+        self.dos_smearing = 0.02
+        self.dos_num_points = 1000
+        self.is_plot_bands = True
+        self.band_data_format = ""
 
     def _initialize_parameters(self):
         """Initialize all parameters from the configuration file."""
@@ -100,6 +118,7 @@ class Parameters:
         
         # Neighbor parameters
         self.max_neighbors = int(self.tbparas["max_neighbors"])
+        self.neighbor_search = self.tbparas["neighbor_search"]
 
         # other parameters
         self.is_print_tb_model_hop = self.tbparas["is_print_tb_model_hop"]
@@ -107,6 +126,26 @@ class Parameters:
         self.is_print_tb_model = self.tbparas["is_print_tb_model"]
         self.is_black_degenerate_bands = self.tbparas["is_black_degenerate_bands"]
         self.energy_threshold = self.tbparas["energy_threshold"]
+        self.solver = self.tbparas["solver"]
+        self.sparse_num_bands = int(self.tbparas["sparse_num_bands"])
+        self.sparse_target_energy = self.tbparas["sparse_target_energy"]
+        self.workers = int(self.tbparas["workers"])
+        self.cache_dir = self.tbparas["cache_dir"]
+        self.cache_max_mb = self.tbparas["cache_max_mb"]
+        self.store_dir = self.tbparas["store_dir"]
+        self.adaptive_kpath = self.tbparas["adaptive_kpath"]
+        self.adaptive_tolerance = self.tbparas["adaptive_tolerance"]
+        self.adaptive_resolution = self.tbparas["adaptive_resolution"]
+
+        # DOS parameters
+        self.dos_mesh = [int(n) for n in self.tbparas["dos_mesh"]]
+        self.dos_method = self.tbparas["dos_method"]
+        self.dos_smearing = self.tbparas["dos_smearing"]
+        self.dos_num_points = int(self.tbparas["dos_num_points"])
+
+        # Band output
+        self.is_plot_bands = self.tbparas["is_plot_bands"]
+        self.band_data_format = self.tbparas["band_data_format"]
 
     def get_maglist(self) -> List[float]:
         """
@@ -118,5 +157,26 @@ class Parameters:
         return [self.magnetic_moment if c == '+' else -self.magnetic_moment if c == '-' else 0 
                 for c in self.magnetic_order]
 
-# Create a global instance with default parameters
-params = Parameters() 
\ No newline at end of file
+# 默认参数实例，第一次使用时才创建，导入模块没有副作用
+_default_parameters = None
+
+
+def default_parameters() -> Parameters:
+    """
+    返回全局默认参数实例，第一次调用时创建。函数的params参数为None时使用该实例。
+
+    Returns:
+        Parameters: 默认参数实例
+    """
+    global _default_parameters
+    if _default_parameters is None:
+        _default_parameters = Parameters()
+    return _default_parameters
+
+
+def __getattr__(name):
+    # 兼容旧代码中的 pyamtb.parameters.params
+    if name == "params":
+        return default_parameters()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+ 
\ No newline at end of file
@@ -0,0 +1,167 @@
+"""
+能带的输出：与计算分开，数据可以只保存为.npz/CSV，绘图时所有能带作为一个LineCollection绘制，使用Agg后端，不需要图形界面
+
+band_lines(k_dist, evals, labels) 把能带转换为折线，在线段标签（颜色）改变处断开
+
+save_band_data(filename, k_dist, evals, k_node, klabel, spin) 按扩展名把能带保存为.npz或CSV文件
+
+load_band_data(filename) 读取save_band_data保存的.npz文件
+
+plot_bands(filename, k_dist, evals, k_node, klabel, spin, degenerate) 绘制能带，可按自旋投影着色，简并且自旋相反的能带为黑色
+
+
+"""
+
+import numpy as np
+
+# 数据文件支持的格式
+DATA_FORMATS = ("npz", "csv")
+
+# 按自旋投影着色时颜色的分级数，相邻线段落在同一级时合并为一条折线
+SPIN_COLOR_LEVELS = 33
+
+
+def band_lines(k_dist, evals, labels=None):
+    """
+    把能带转换为折线。labels为None时每条能带一条折线；否则在相邻线段的标签改变处断开，
+    同一条折线内所有线段的标签相同，可以用一种颜色绘制
+
+    参数:
+        k_dist (numpy.ndarray): k点在路径上的距离，形状为 (nk,)
+        evals (numpy.ndarray): 本征值，形状为 (nband, nk)
+        labels (numpy.ndarray): 相邻k点之间每条线段的整数标签，形状为 (nband, nk-1)
+
+    返回:
+        tuple: (lines, line_labels)
+            - lines: 折线顶点数组的列表，每个形状为 (npoint, 2)
+            - line_labels: 每条折线的标签，labels为None时为None
+    """
+    points = np.stack(np.broadcast_arrays(np.asarray(k_dist, dtype=float), np.asarray(evals, dtype=float)), axis=-1)
+    if labels is None:
+        return list(points), None
+    labels = np.asarray(labels)
+    start = np.ones(labels.shape, dtype=bool)
+    start[:, 1:] = labels[:, 1:] != labels[:, :-1]
+    band, first = np.nonzero(start)
+    # 每条折线到下一条折线的起点为止，能带的最后一条折线到能带末尾为止
+    last = np.full(len(first), labels.shape[1])
+    same_band = band[1:] == band[:-1]
+    last[:-1][same_band] = first[1:][same_band]
+    lines = [points[b, f:l + 1] for b, f, l in zip(band, first, last)]
+    return lines, labels[band, first]
+
+
+def save_band_data(filename, k_dist, evals, k_node, klabel, spin=None):
+    """
+    保存能带数据，格式由扩展名决定
+
+    .npz文件包含 k_dist, evals, k_node, klabel（以及spin）；
+    CSV文件每行一个k点，各列为 k_dist 和每条能带的能量（有spin时再加每条能带的自旋投影），
+    节点位置和标签写在开头的注释行中。
+
+    参数:
+        filename (str): 输出文件名，扩展名为.npz或.csv
+        k_dist (numpy.ndarray): k点在路径上的距离
+        evals (numpy.ndarray): 本征值，形状为 (nband, nk)
+        k_node (numpy.ndarray): 路径节点的距离
+        klabel (list): 路径节点的标签
+        spin (numpy.ndarray): 每个态的自旋投影 <σz>，形状与evals相同，可为None
+    """
+    fmt = filename.rsplit(".", 1)[-1].lower()
+    if fmt not in DATA_FORMATS:
+        raise ValueError(f"能带数据文件的扩展名应为 .npz 或 .csv，但得到 {filename}")
+    evals = np.asarray(evals)
+    data = {"k_dist": np.asarray(k_dist), "evals": evals, "k_node": np.asarray(k_node),
+            "klabel": np.asarray(klabel, dtype=str)}
+    if spin is not None:
+        data["spin"] = np.asarray(spin)
+
+    if fmt == "npz":
+        np.savez(filename, **data)
+        return
+    columns = [data["k_dist"][:, None], evals.T]
+    names = ["k_dist"] + [f"E{n}" for n in range(evals.shape[0])]
+    if spin is not None:
+        columns.append(data["spin"].T)
+        names += [f"spin{n}" for n in range(evals.shape[0])]
+    header = (f"k_node: {' '.join(f'{k:.8f}' for k in data['k_node'])}\n"
+              f"klabel: {' '.join(data['klabel'])}\n" + ",".join(names))
+    np.savetxt(filename, np.hstack(columns), delimiter=",", header=header)
+
+
+def load_band_data(filename):
+    """
+    读取save_band_data保存的.npz文件
+
+    参数:
+        filename (str): .npz文件名
+
+    返回:
+        dict: k_dist, evals, k_node, klabel，以及spin（如果有）
+    """
+    with np.load(filename) as data:
+        result = {key: data[key] for key in data.files}
+    result["klabel"] = result["klabel"].tolist()
+    return result
+
+
+def plot_bands(filename, k_dist, evals, k_node, klabel, spin=None, degenerate=None, ylim=None):
+    """
+    绘制能带并保存图片
+
+    所有能带作为一个LineCollection绘制；直接使用Agg画布，不依赖pyplot和显示后端。
+    没有spin时每条能带是一条蓝色折线；有spin时按每段两端自旋投影的平均值从蓝（向下）到红（向上）分级着色，
+    两端都是degenerate的线段（简并且自旋相反的能带对）为黑色，能带只在颜色改变处断开。
+
+    参数:
+        filename (str): 图片文件名，格式由扩展名决定
+        k_dist (numpy.ndarray): k点在路径上的距离
+        evals (numpy.ndarray): 本征值，形状为 (nband, nk)
+        k_node (numpy.ndarray): 路径节点的距离
+        klabel (list): 路径节点的标签
+        spin (numpy.ndarray): 每个态的自旋投影 <σz>，形状与evals相同，可为None
+        degenerate (numpy.ndarray): 布尔数组，形状与evals相同，可为None
+        ylim (list): 能量范围，为None时自动确定
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.collections import LineCollection
+    from matplotlib.cm import ScalarMappable
+    from matplotlib.colors import Normalize
+    import matplotlib
+
+    evals = np.asarray(evals)
+    fig = Figure(figsize=(10, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    if spin is None:
+        lines, _ = band_lines(k_dist, evals)
+        ax.add_collection(LineCollection(lines, colors="b", linewidths=1.0))
+    else:
+        spin = np.clip(np.asarray(spin, dtype=float), -1.0, 1.0)
+        labels = np.rint((0.5 * (spin[:, :-1] + spin[:, 1:]) + 1.0) * 0.5 * (SPIN_COLOR_LEVELS - 1)).astype(int)
+        if degenerate is not None:
+            degenerate = np.asarray(degenerate, dtype=bool)
+            labels[degenerate[:, :-1] & degenerate[:, 1:]] = -1
+        lines, line_labels = band_lines(k_dist, evals, labels)
+        cmap = matplotlib.colormaps["bwr"]
+        colors = cmap(line_labels / (SPIN_COLOR_LEVELS - 1))
+        colors[line_labels < 0] = (0.0, 0.0, 0.0, 1.0)
+        ax.add_collection(LineCollection(lines, colors=colors, linewidths=1.0))
+        fig.colorbar(ScalarMappable(Normalize(-1.0, 1.0), cmap), ax=ax, label=r"$\langle\sigma_z\rangle$")
+
+    ax.set_xlim(k_dist[0], k_dist[-1])
+    if ylim is not None:
+        ax.set_ylim(ylim)
+    else:
+        ax.autoscale(axis="y")
+
+    # 路径节点的刻度和竖线
+    ax.set_xticks(k_node)
+    ax.set_xticklabels(klabel)
+    for node in k_node:
+        ax.axvline(x=node, linewidth=0.5, color="k")
+    ax.set_xlabel("k-path")
+    ax.set_ylabel("Energy (eV)")
+    fig.savefig(filename)
@@ -0,0 +1,281 @@
+"""
+阶段计时和性能分析：在建模和能带计算的各个阶段外包一层span，记录墙钟时间、tracemalloc峰值内存和规模计数
+（跃迁数、轨道数、k点数），结果可以保存为JSON报告；也可以对指定阶段用cProfile分析并保存统计文件。
+没有激活的Profiler时span什么也不做，开销可以忽略
+
+Profiler(memory, cprofile_stage) 收集span的记录，生成报告
+
+span(name, **counts) 当前Profiler中的一个阶段，返回的字典可以在阶段内补充计数
+
+profiled(name) 把整个函数记为一个阶段的装饰器
+
+profiling(profiler) 在with块内激活Profiler
+
+print_report(report) 打印报告中的阶段表
+
+cprofile_filename(base, stage) cProfile统计文件名
+
+
+"""
+
+import json
+import os
+import platform
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from datetime import datetime, timezone
+
+# 当前激活的Profiler，由profiling设置
+_active = None
+
+
+class Profiler:
+    """
+    收集span的记录。同名（同一路径）的span多次进入时合并：时间累加，峰值内存取最大，计数取最后一次的值。
+
+    span的路径由外层span的名称用"/"连接而成，例如 "calculate_band_structure/diagonalize"。
+    峰值内存是span内tracemalloc记录的最大内存减去进入span时的内存，只包含当前进程的分配，
+    workers > 1 时工作进程中的内存不计入。
+    """
+
+    def __init__(self, memory=True, cprofile_stage=None):
+        """
+        参数:
+            memory (bool): 是否用tracemalloc记录峰值内存（会使Python代码变慢）
+            cprofile_stage (str): 用cProfile分析的阶段，可以是span的名称或完整路径
+        """
+        self.memory = memory
+        self.cprofile_stage = cprofile_stage
+        self.cprofile = None
+        self.records = {}
+        self._stack = []
+        self._start = None
+        self._end = None
+        self._started_tracemalloc = False
+
+    def start(self):
+        """开始计时，需要时启动tracemalloc"""
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._start = time.perf_counter()
+
+    def stop(self):
+        """停止计时，关闭由start启动的tracemalloc"""
+        self._end = time.perf_counter()
+        if self._started_tracemalloc:
+            self._update_peaks()
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _update_peaks(self):
+        """把上次重置以来的峰值记入所有未结束的span，然后重置峰值"""
+        if not tracemalloc.is_tracing():
+            return 0
+        current, peak = tracemalloc.get_traced_memory()
+        for frame in self._stack:
+            frame["max"] = max(frame["max"], peak)
+        tracemalloc.reset_peak()
+        return current
+
+    @contextmanager
+    def span(self, name, **counts):
+        """
+        记录一个阶段
+
+        参数:
+            name (str): 阶段名称
+            **counts: 规模计数，例如 hoppings=120
+
+        返回:
+            dict: 计数字典，可以在with块内补充或修改
+        """
+        path = "/".join([frame["path"] for frame in self._stack[-1:]] + [name])
+        memory = self.memory and tracemalloc.is_tracing()
+        current = self._update_peaks() if memory else 0
+        frame = {"path": path, "max": current, "current": current}
+        # 在进入时建立记录，报告中的阶段按首次进入的顺序排列，外层在前
+        record = self.records.setdefault(path, {"name": path, "calls": 0, "wall": 0.0, "peak_memory": 0})
+        self._stack.append(frame)
+
+        profile = None
+        if self.cprofile_stage in (name, path) and not any(f.get("cprofile") for f in self._stack[:-1]):
+            import cProfile
+            if self.cprofile is None:
+                self.cprofile = cProfile.Profile()
+            profile = frame["cprofile"] = self.cprofile
+            profile.enable()
+        start = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            wall = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+            if memory:
+                self._update_peaks()
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1]["max"] = max(self._stack[-1]["max"], frame["max"])
+
+            record["calls"] += 1
+            record["wall"] += wall
+            if memory:
+                record["peak_memory"] = max(record["peak_memory"], frame["max"] - frame["current"])
+            record.update(counts)
+
+    def hot_stage(self):
+        """最耗时的最内层阶段（没有子阶段的span）的路径，没有记录时为None"""
+        leaves = [path for path in self.records if not any(other.startswith(path + "/") for other in self.records)]
+        return max(leaves, key=lambda path: self.records[path]["wall"], default=None)
+
+    def report(self, **meta):
+        """
+        生成报告
+
+        参数:
+            **meta: 写入报告meta部分的附加信息，例如命令和参数文件
+
+        返回:
+            dict: meta（时间、Python版本等）、total_wall、hot_stage和spans（按首次进入的顺序）
+        """
+        end = self._end if self._end is not None else time.perf_counter()
+        return {
+            "meta": {
+                "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "memory": self.memory,
+                **meta,
+            },
+            "total_wall": end - self._start if self._start is not None else 0.0,
+            "hot_stage": self.hot_stage(),
+            "spans": list(self.records.values()),
+        }
+
+    def save(self, filename, **meta):
+        """
+        把报告保存为JSON文件
+
+        参数:
+            filename (str): 输出文件名
+            **meta: 见report
+        """
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(self.report(**meta), f, indent=2, default=_json_default)
+
+    def dump_cprofile(self, filename):
+        """
+        保存cProfile统计（可以用pstats或snakeviz查看）
+
+        参数:
+            filename (str): 输出文件名
+
+        返回:
+            bool: 指定的阶段没有运行过时为False，不写文件
+        """
+        if self.cprofile is None:
+            return False
+        self.cprofile.dump_stats(filename)
+        return True
+
+
+def _json_default(value):
+    """计数中的NumPy整数和浮点数转换为Python类型"""
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"无法写入JSON: {type(value).__name__}")
+
+
+@contextmanager
+def _inactive_span(counts):
+    yield counts
+
+
+def span(name, **counts):
+    """
+    当前Profiler中的一个阶段；没有激活的Profiler时什么也不做
+
+    用法:
+        with span("set_hop", hoppings=len(table)) as counts:
+            ...
+            counts["orbitals"] = norb
+
+    参数:
+        name (str): 阶段名称
+        **counts: 规模计数
+
+    返回:
+        上下文管理器，with得到计数字典
+    """
+    if _active is None:
+        return _inactive_span(counts)
+    return _active.span(name, **counts)
+
+
+def profiled(name=None):
+    """
+    装饰器：每次调用函数时记为一个阶段，函数内的span成为它的子阶段
+
+    参数:
+        name (str): 阶段名称，默认为函数名
+    """
+    def decorator(func):
+        stage = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active is None:
+                return func(*args, **kwargs)
+            with _active.span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def profiling(profiler=None):
+    """
+    在with块内激活Profiler，块结束时停止计时
+
+    参数:
+        profiler (Profiler): 要激活的Profiler，为None时新建一个
+
+    返回:
+        上下文管理器，with得到Profiler
+    """
+    global _active
+    profiler = Profiler() if profiler is None else profiler
+    previous, _active = _active, profiler
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _active = previous
+
+
+def print_report(report):
+    """
+    打印报告中的阶段表：路径（按层级缩进）、调用次数、时间、占总时间的比例、峰值内存和计数
+
+    参数:
+        report (dict): Profiler.report的返回值
+    """
+    total = report["total_wall"] or 1.0
+    fixed = {"name", "calls", "wall", "peak_memory"}
+    print(f"{'stage':<40} {'calls':>5} {'wall (s)':>10} {'%':>6} {'peak (MiB)':>11}  counts")
+    for record in report["spans"]:
+        depth = record["name"].count("/")
+        name = "  " * depth + record["name"].rsplit("/", 1)[-1]
+        counts = " ".join(f"{key}={value}" for key, value in record.items() if key not in fixed)
+        print(f"{name:<40} {record['calls']:>5} {record['wall']:>10.4f} {100 * record['wall'] / total:>6.1f} "
+              f"{record['peak_memory'] / 2 ** 20:>11.2f}  {counts}")
+    print(f"Total: {report['total_wall']:.4f} s, hot stage: {report['hot_stage']}")
+
+
+def cprofile_filename(base, stage):
+    """cProfile统计文件名：<base去掉扩展名>_<stage中的/替换为_>.prof"""
+    return f"{os.path.splitext(base)[0]}_{stage.replace('/', '_')}.prof"
@@ -2,10 +2,13 @@ import tomlkit
 import os
 from typing import Optional
 import numpy as np
+from .structure import load_structure, select_atoms
 
 def read_poscar(filename="POSCAR", selected_elements: Optional[list]=None, to_direct: bool=True, use_scale: bool=True):
     """
     读取VASP格式的POSCAR文件，并将结构信息存储在字典中返回
+
+    文件由structure.load_structure解析并缓存，同一文件在参数检查和建模时只解析一次。
     
     参数:
         filename (str): POSCAR文件路径，默认为"POSCAR"
@@ -21,104 +24,53 @@ def read_poscar(filename="POSCAR", selected_elements: Optional[list]=None, to_di
             - atom_counts: 各元素原子数量列表
             - total_atoms: 总原子数
             - is_direct: 是否为分数坐标 (布尔值)
-            - coords: 原子坐标数组 (nx3 numpy数组)
+            - coordinates: 原子坐标数组 (nx3 numpy数组)
             - atom_symbols: 每个原子的元素符号列表
     """
-    try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            if not lines:
-                raise ValueError(f"文件 {filename} 为空")
+    poscar_data = _structure_data(load_structure(filename), selected_elements, to_direct, use_scale)
+    poscar_data["lattice"] = poscar_data["lattice"][0]
+    poscar_data["coordinates"] = poscar_data["coordinates"][0]
+    return poscar_data
 
-        # 解析基本信息
-        comment = lines[0].strip()
-        scale = float(lines[1].strip()) if use_scale else 1
-        lattice = np.array([list(map(float, line.split())) for line in lines[2:5]]) * scale
-        scale = 1
-        elements = lines[5].split()
-        atom_counts = list(map(int, lines[6].split()))
-        total_atoms = sum(atom_counts)
-        
-        # 判断坐标类型
-        coord_type = lines[7].strip()
-        if coord_type.lower().startswith('d'):
-            is_direct = True
-        elif coord_type.lower().startswith('c') or coord_type.lower().startswith('k'):
-            is_direct = False
-        else:
-            raise ValueError(f"未知的坐标类型: {coord_type}")
+def read_xdatcar(filename="XDATCAR", selected_elements: Optional[list]=None, to_direct: bool=True, use_scale: bool=True):
+    """
+    读取XDATCAR格式的多帧结构（晶胞不变或变晶胞），参数与read_poscar相同
 
-        # 读取原子坐标
-        coords = np.array([list(map(float, line.split()[:3])) for line in lines[8:8+total_atoms]])
+    返回:
+        dict: 与read_poscar相同的键，但lattice的形状为 (nframe, 3, 3)，coordinates的形状为 (nframe, n, 3)
+    """
+    return _structure_data(load_structure(filename), selected_elements, to_direct, use_scale)
 
-        # 如果是笛卡尔坐标，转换为分数坐标
-        if not is_direct and to_direct:
-            change_to_direct = True
-            inv_lattice = np.linalg.inv(lattice)
-            coords = np.dot(coords, inv_lattice)
-        # 如果是分数坐标，转换为笛卡尔坐标
-        elif is_direct and not to_direct:
-            change_to_direct = False
-            coords = np.dot(coords, lattice)
-            is_direct = False
-        else:
-            change_to_direct = "Do not change"
+def _structure_data(structure, selected_elements, to_direct, use_scale):
+    """由load_structure的原始数据生成read_poscar格式的字典（所有帧），数组都是新的副本"""
+    scale = structure["scale"] if use_scale else np.ones_like(structure["scale"])
+    lattice = structure["lattice"] * scale[:, None, None]
+    mask, atom_symbols, elements, atom_counts = select_atoms(
+        structure["elements"], structure["atom_counts"], selected_elements)
+    coords = structure["coordinates"][:, mask]
 
-        # 生成每个原子的元素符号列表
-        atom_symbols = []
-        for symbol, count in zip(elements, atom_counts):
-            atom_symbols.extend([symbol] * count)
-        
-        # 如果指定了选定元素，则只保留这些元素对应的原子
-        if selected_elements is not None:
-            selected_indices = []
-            selected_atom_symbols = []
-            selected_coords = []
-            
-            for i, symbol in enumerate(atom_symbols):
-                if symbol in selected_elements:
-                    selected_indices.append(i)
-                    selected_atom_symbols.append(symbol)
-                    selected_coords.append(coords[i])
-            
-            # 更新原子信息
-            atom_symbols = selected_atom_symbols
-            coords = np.array(selected_coords) if selected_coords else np.empty((0, 3))
-            total_atoms = len(selected_indices)
-            
-            # 更新元素计数
-            new_elements = []
-            new_atom_counts = []
-            for element in selected_elements:
-                if element in elements:
-                    count = atom_symbols.count(element)
-                    if count > 0:
-                        new_elements.append(element)
-                        new_atom_counts.append(count)
-            
-            elements = new_elements
-            atom_counts = new_atom_counts
+    # 笛卡尔坐标同样乘以比例因子；按需要在分数坐标和笛卡尔坐标之间转换
+    is_direct = structure["is_direct"]
+    if not is_direct:
+        coords = coords * scale[:, None, None]
+    if not is_direct and to_direct:
+        coords = coords @ np.linalg.inv(lattice)
+        is_direct = True
+    elif is_direct and not to_direct:
+        coords = coords @ lattice
+        is_direct = False
 
-        # 构建结果字典
-        poscar_data = {
-            "comment": comment,
-            "scale": scale,
-            "lattice": lattice,
-            "elements": elements,
-            "atom_counts": atom_counts,
-            "total_atoms": total_atoms,
-            "is_direct": is_direct,
-            "coordinates": coords,
-            "atom_symbols": atom_symbols
-        }
-        # print(poscar_data)
-        return poscar_data
-    except Exception as e:
-        print(f"读取POSCAR文件时出错: {str(e)}")
-        print(f"文件内容:")
-        with open(filename, 'r', encoding='utf-8') as f:
-            print(f.read())
-        raise
+    return {
+        "comment": structure["comment"],
+        "scale": 1,
+        "lattice": lattice,
+        "elements": elements,
+        "atom_counts": atom_counts,
+        "total_atoms": len(atom_symbols),
+        "is_direct": is_direct,
+        "coordinates": np.array(coords, dtype=float),
+        "atom_symbols": atom_symbols
+    }
 
 
 # 计算字符串的字符频率向量
@@ -168,12 +120,13 @@ def find_similar_strings(target: str, string_list: list) -> list:
     return similar_strings
 
 
-def read_parameters(filename="tbparas.toml"):
+def read_parameters(filename="tbparas.toml", check_poscar=True):
     """
     从toml文件中读取参数
     
     参数:
         filename (str): toml文件路径
+        check_poscar (bool): 是否检查use_elements中的元素都在poscar_filename中
         
     返回:
         dict: 包含参数的字典
@@ -209,11 +162,28 @@ def read_parameters(filename="tbparas.toml"):
         "klabel": ["G", "X", "M", "Y", "G", "M"],
         "nkpt": 100,
         "max_neighbors": 1,
+        "neighbor_search": "cell_list",
         "is_print_tb_model_hop": True,
         "is_check_flat_bands": True,
         "is_print_tb_model": True,
         "is_black_degenerate_bands": True,
-        "energy_threshold": 1e-5
+        "energy_threshold": 1e-5,
+        "solver": "numpy",
+        "sparse_num_bands": 10,
+        "sparse_target_energy": None,
+        "workers": 1,
+        "cache_dir": "",
+        "cache_max_mb": 512,
+        "store_dir": "",
+        "adaptive_kpath": False,
+        "adaptive_tolerance": 1e-3,
+        "adaptive_resolution": 1e-4,
+        "dos_mesh": [40, 40, 40],
+        "dos_method": "gaussian",
+        "dos_smearing": 0.02,
+        "dos_num_points": 1000,
+        "is_plot_bands": True,
+        "band_data_format": ""
     }
     
     # 用文件中的值更新默认值
@@ -237,10 +207,22 @@ def read_parameters(filename="tbparas.toml"):
     default_params["dimr"] = int(default_params["dimr"])
     default_params["nkpt"] = int(default_params["nkpt"])
     default_params["max_neighbors"] = int(default_params["max_neighbors"])
+    default_params["sparse_num_bands"] = int(default_params["sparse_num_bands"])
+    default_params["workers"] = int(default_params["workers"])
+    default_params["dos_num_points"] = int(default_params["dos_num_points"])
+    if default_params["solver"] not in ("numpy", "sparse", "pythtb"):
+        raise ValueError(f"{filename} 的 solver 参数有误，应为 numpy, sparse 或 pythtb")
+    if default_params["neighbor_search"] not in ("cell_list", "max_neighbors"):
+        raise ValueError(f"{filename} 的 neighbor_search 参数有误，应为 cell_list 或 max_neighbors")
+    if default_params["dos_method"] not in ("gaussian", "histogram"):
+        raise ValueError(f"{filename} 的 dos_method 参数有误，应为 gaussian 或 histogram")
+    if default_params["band_data_format"] not in ("", "npz", "csv"):
+        raise ValueError(f"{filename} 的 band_data_format 参数有误，应为空、npz 或 csv")
 
-    poscar=read_poscar(default_params["poscar_filename"])
-    for ele in default_params["use_elements"]:
-        if ele not in poscar["elements"]:
-            raise ValueError(f"{filename} 的 use_elements 参数有误，元素{ele}不在POSCAR中")
+    if check_poscar:
+        poscar=read_poscar(default_params["poscar_filename"])
+        for ele in default_params["use_elements"]:
+            if ele not in poscar["elements"]:
+                raise ValueError(f"{filename} 的 use_elements 参数有误，元素{ele}不在POSCAR中")
 
     return default_params
@@ -0,0 +1,210 @@
+"""
+超胞与有限厚度的薄膜（slab）、纳米带（ribbon）模型：由周期模型的跃迁数组通过平铺和索引运算直接生成，不经过pythtb。
+结果仍是BlochHamiltonian，可以用sparse_hamiltonian/solve_sparse做大规模对角化；每个轨道所在的晶胞坐标单独返回，
+沿有限方向的坐标就是层编号，用于计算层分辨的权重
+
+supercell_cells(repeats, outer) 超胞中所有晶胞的整数坐标，outer中的方向在最外层
+
+build_slab(ham, repeats, finite) 由周期模型生成超胞，finite中的方向为开边界，返回 (模型, 每个轨道的晶胞坐标)
+
+layer_weights(evecs, layers, nlayer) 本征态在每一层上的权重
+
+surface_weights(ham, layers, k_list, n_surface, nev, sigma) 分块求解能带，只保留两侧表面上的权重
+
+slab_k_path(params, ham) 薄膜模型的默认k路径节点和标签
+
+create_slab_hamiltonian(params, repeats, finite) 由参数直接生成薄膜或纳米带模型
+
+
+"""
+
+import numpy as np
+
+from .hamiltonian import BlochHamiltonian, CHUNK_ELEMENTS
+
+
+def supercell_cells(repeats, outer=()):
+    """
+    超胞中所有晶胞的整数坐标。outer中的方向变化最慢，其余方向按编号顺序，最后一个方向变化最快
+
+    参数:
+        repeats (numpy.ndarray): 每个方向的晶胞数，形状为 (dimr,)
+        outer (list): 放在最外层的方向
+
+    返回:
+        tuple: (cells, strides)
+            - cells: 晶胞坐标，形状为 (ncell, dimr)，第n行是编号为n的晶胞
+            - strides: 由晶胞坐标计算编号的步长，编号 = cells @ strides
+    """
+    repeats = np.asarray(repeats, dtype=int)
+    order = list(outer) + [d for d in range(len(repeats)) if d not in outer]
+    strides = np.zeros(len(repeats), dtype=np.int64)
+    step = 1
+    for d in reversed(order):
+        strides[d] = step
+        step *= repeats[d]
+    grid = np.meshgrid(*[np.arange(repeats[d]) for d in order], indexing="ij")
+    cells = np.zeros((step, len(repeats)), dtype=np.int64)
+    for axis, d in enumerate(order):
+        cells[:, d] = grid[axis].ravel()
+    return cells, strides
+
+
+def build_slab(ham, repeats, finite=()):
+    """
+    由周期模型生成超胞；finite中的方向为开边界，得到薄膜（一个有限方向）或纳米带（两个有限方向）
+
+    编号为n的晶胞中的轨道i在新模型中的编号为 n * norb + i，有限方向上的晶胞变化最慢，同一层的轨道编号相邻。
+    每个跃迁 (i, j, R) 在每个晶胞n上平铺一次，终点晶胞为 (n + R) mod repeats，新的格矢量为 (n + R) // repeats；
+    有限方向上新格矢量不为零的跃迁（跨过表面的跃迁）被去掉。
+
+    参数:
+        ham (BlochHamiltonian): 周期模型，跃迁中不含共轭重复
+        repeats (list): 每个方向的晶胞数（薄膜的层数），长度为dimr，非周期方向必须为1
+        finite (list): 设为开边界的方向，必须是ham的周期方向
+
+    返回:
+        tuple: (model, cells)
+            - model: BlochHamiltonian，周期方向去掉了finite，dimk相应减少
+            - cells: 每个轨道所在晶胞的整数坐标，形状为 (norb, dimr)，cells[:, d] 是沿方向d的层编号
+    """
+    dimr = ham.lattice.shape[0]
+    repeats = np.asarray(repeats, dtype=int).reshape(-1)
+    if len(repeats) != dimr:
+        raise ValueError(f"repeats 的长度应为 {dimr}，但得到 {len(repeats)}")
+    if (repeats < 1).any():
+        raise ValueError(f"repeats 必须为正整数，但得到 {repeats.tolist()}")
+    finite = sorted({int(d) for d in finite})
+    for d in finite:
+        if d not in ham.per:
+            raise ValueError(f"方向 {d} 不是周期方向，不能设为开边界（周期方向: {ham.per}）")
+    for d in range(dimr):
+        if d not in ham.per and repeats[d] > 1:
+            raise ValueError(f"方向 {d} 不是周期方向，没有跨晶胞的跃迁，不能在这个方向扩胞")
+    per = [d for d in ham.per if d not in finite]
+    if not per:
+        raise ValueError("至少需要保留一个周期方向")
+
+    cells, strides = supercell_cells(repeats, finite)
+    ncell, norb = len(cells), ham.norb
+
+    # 所有 (晶胞, 跃迁) 的组合一次计算
+    target = cells[:, None, :] + ham.hop_R[None, :, :]
+    shift, wrapped = np.divmod(target, repeats)
+    keep = np.all(shift[:, :, finite] == 0, axis=2) if finite else np.ones(shift.shape[:2], dtype=bool)
+    cell_i, hop = np.nonzero(keep)
+    hop_i = cell_i * norb + ham.hop_i[hop]
+    hop_j = (wrapped[cell_i, hop] @ strides) * norb + ham.hop_j[hop]
+    hop_R = shift[cell_i, hop]
+    hop_t = ham.hop_t[hop]
+
+    orb = ((cells[:, None, :] + ham.orb[None, :, :]) / repeats).reshape(-1, dimr)
+    onsite = np.broadcast_to(ham.onsite, (ncell,) + ham.onsite.shape).reshape((-1,) + ham.onsite.shape[1:])
+    lattice = ham.lattice * repeats[:, None]
+    model = BlochHamiltonian(lattice, orb, onsite, hop_i, hop_j, hop_R, hop_t, len(per), ham.nspin, per=per)
+    return model, np.repeat(cells, norb, axis=0)
+
+
+def layer_weights(evecs, layers, nlayer=None):
+    """
+    本征态在每一层上的权重 Σ_{i∈层} |ψ_i|²（自旋分量求和）
+
+    参数:
+        evecs (numpy.ndarray): solve_all/solve_sparse返回的本征矢量，形状为 (nstate, nk, norb) 或 (nstate, nk, norb, 2)
+        layers (numpy.ndarray): 每个轨道的层编号，形状为 (norb,)，例如 build_slab 返回的 cells[:, d]
+        nlayer (int): 层数，默认为 layers.max() + 1
+
+    返回:
+        numpy.ndarray: 形状为 (nstate, nk, nlayer)，对每个态按层求和为1
+    """
+    evecs = np.asarray(evecs)
+    density = np.abs(evecs) ** 2
+    if density.ndim == 4:
+        density = density.sum(axis=3)
+    layers = np.asarray(layers, dtype=int)
+    nlayer = int(layers.max()) + 1 if nlayer is None else int(nlayer)
+    # 按层排序后对连续的分段求和
+    order = np.argsort(layers, kind="stable")
+    sorted_layers = layers[order]
+    start = np.flatnonzero(np.r_[True, sorted_layers[1:] != sorted_layers[:-1]])
+    weights = np.zeros(density.shape[:2] + (nlayer,))
+    weights[:, :, sorted_layers[start]] = np.add.reduceat(density[:, :, order], start, axis=2)
+    return weights
+
+
+def surface_weights(ham, layers, k_list, n_surface=2, nev=None, sigma=0.0):
+    """
+    分块求解一组k点上的能带，每块的本征矢量只用于计算两侧表面的权重，不整体保存，内存与k点数成正比
+
+    参数:
+        ham (BlochHamiltonian): build_slab返回的模型
+        layers (numpy.ndarray): 每个轨道的层编号，形状为 (norb,)
+        k_list (numpy.ndarray): k点的分数坐标，形状为 (nk, dimk)
+        n_surface (int): 每一侧计为表面的层数
+        nev (int): 不为None时用solve_sparse只求sigma附近的nev个态
+        sigma (float): 稀疏求解的目标能量
+
+    返回:
+        tuple: (evals, weights)
+            - evals: 本征值，形状为 (nband, nk)
+            - weights: 形状为 (nband, nk, 2)，[..., 0] 为底面（层编号 < n_surface）的权重，[..., 1] 为顶面的权重
+    """
+    layers = np.asarray(layers, dtype=int)
+    nlayer = int(layers.max()) + 1
+    k_list = np.asarray(k_list, dtype=float).reshape(-1, ham.dimk)
+    nk = len(k_list)
+    nband = ham.nstate if nev is None else min(nev, ham.nstate)
+    evals = np.zeros((nband, nk))
+    weights = np.zeros((nband, nk, 2))
+    chunk = max(1, CHUNK_ELEMENTS // (nband * ham.nstate))
+    for start in range(0, nk, chunk):
+        stop = min(start + chunk, nk)
+        if nev is None:
+            vals, vecs = ham.solve_all(k_list[start:stop], eig_vectors=True)
+        else:
+            vals, vecs = ham.solve_sparse(k_list[start:stop], nev, sigma, eig_vectors=True)
+        layer = layer_weights(vecs, layers, nlayer)
+        evals[:, start:stop] = vals
+        weights[:, start:stop, 0] = layer[:, :, :n_surface].sum(axis=2)
+        weights[:, start:stop, 1] = layer[:, :, nlayer - n_surface:].sum(axis=2)
+    return evals, weights
+
+
+def slab_k_path(params, ham):
+    """
+    薄膜模型的默认k路径：只剩一个周期方向时为 -X → G → X；
+    否则把params.kpath投影到剩下的周期方向上，去掉相邻的重复节点
+
+    参数:
+        params (Parameters): 参数实例，kpath对应原来的周期方向（前dimk个方向）
+        ham (BlochHamiltonian): build_slab返回的模型
+
+    返回:
+        tuple: (kpath, klabel)
+    """
+    if ham.dimk == 1:
+        return [[-0.5], [0.0], [0.5]], ["-X", "G", "X"]
+    columns = [list(range(params.dimk)).index(d) for d in ham.per]
+    nodes = np.asarray(params.kpath, dtype=float).reshape(len(params.kpath), -1)[:, columns]
+    kpath, klabel = [nodes[0].tolist()], [params.klabel[0]]
+    for node, label in zip(nodes[1:], params.klabel[1:]):
+        if not np.allclose(node, kpath[-1]):
+            kpath.append(node.tolist())
+            klabel.append(label)
+    return kpath, klabel
+
+
+def create_slab_hamiltonian(params, repeats, finite=()):
+    """
+    由参数生成周期模型（见create_bloch_hamiltonian），再生成超胞、薄膜或纳米带模型
+
+    参数:
+        params (Parameters): 参数实例
+        repeats (list): 每个方向的晶胞数，见build_slab
+        finite (list): 开边界的方向
+
+    返回:
+        tuple: build_slab的返回值 (model, cells)
+    """
+    from .tight_binding_model import create_bloch_hamiltonian
+    return build_slab(create_bloch_hamiltonian(params), repeats, finite)
@@ -0,0 +1,245 @@
+"""
+稀疏哈密顿量：CSR存储与只求目标能量附近若干本征对的求解器
+
+CSRMatrix(data, indices, indptr, shape) 纯NumPy的CSR矩阵，在没有scipy时使用
+
+to_csr(data, row, col, shape) 由COO三元组构造CSR矩阵，重复元素相加；有scipy时返回scipy.sparse.csr_matrix
+
+eigsh_nearest(matrix, nev, sigma, eig_vectors) 求最接近sigma的nev个本征对，优先使用scipy的shift-invert ARPACK，否则使用Lanczos
+
+lanczos_nearest(matvec, n, nev, sigma) 谱折叠的厚重启Lanczos迭代，内存只与子空间维数成正比
+
+
+"""
+
+import numpy as np
+
+
+def _scipy_sparse():
+    """返回 (scipy.sparse, scipy.sparse.linalg)，未安装scipy时返回 (None, None)"""
+    try:
+        import scipy.sparse
+        import scipy.sparse.linalg
+    except ImportError:
+        return None, None
+    return scipy.sparse, scipy.sparse.linalg
+
+
+class CSRMatrix:
+    """
+    纯NumPy实现的CSR稀疏矩阵，只提供求本征值所需的矩阵-向量乘法
+    """
+
+    __slots__ = ("data", "indices", "indptr", "shape")
+
+    def __init__(self, data, indices, indptr, shape):
+        self.data = np.asarray(data)
+        self.indices = np.asarray(indices, dtype=int)
+        self.indptr = np.asarray(indptr, dtype=int)
+        self.shape = tuple(shape)
+
+    @property
+    def nnz(self):
+        return len(self.data)
+
+    def dot(self, x):
+        """计算矩阵与向量的乘积"""
+        products = self.data * x[self.indices]
+        result = np.zeros(self.shape[0], dtype=np.result_type(self.data, x))
+        nonempty = self.indptr[:-1] < self.indptr[1:]
+        if products.size:
+            result[nonempty] = np.add.reduceat(products, self.indptr[:-1][nonempty])
+        return result
+
+    def __matmul__(self, x):
+        return self.dot(x)
+
+    def toarray(self):
+        """转换为稠密矩阵"""
+        dense = np.zeros(self.shape, dtype=self.data.dtype)
+        rows = np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+        dense[rows, self.indices] = self.data
+        return dense
+
+
+def to_csr(data, row, col, shape):
+    """
+    由COO三元组构造CSR矩阵，重复的 (row, col) 元素相加
+
+    参数:
+        data (numpy.ndarray): 非零元素
+        row (numpy.ndarray): 行索引
+        col (numpy.ndarray): 列索引
+        shape (tuple): 矩阵形状
+
+    返回:
+        scipy.sparse.csr_matrix 或 CSRMatrix
+    """
+    sparse, _ = _scipy_sparse()
+    if sparse is not None:
+        return sparse.csr_matrix((data, (row, col)), shape=shape)
+
+    key = np.asarray(row, dtype=np.int64) * shape[1] + np.asarray(col, dtype=np.int64)
+    order = np.argsort(key, kind="stable")
+    key = key[order]
+    start = np.flatnonzero(np.r_[True, key[1:] != key[:-1]]) if len(key) else np.zeros(0, dtype=int)
+    summed = np.add.reduceat(np.asarray(data)[order], start) if len(key) else np.zeros(0, dtype=complex)
+    unique_rows, unique_cols = np.divmod(key[start], shape[1])
+    indptr = np.r_[0, np.cumsum(np.bincount(unique_rows, minlength=shape[0]))]
+    return CSRMatrix(summed, unique_cols, indptr, shape)
+
+
+def eigsh_nearest(matrix, nev, sigma=0.0, eig_vectors=False, tol=1e-10):
+    """
+    求厄米稀疏矩阵最接近sigma的nev个本征对
+
+    有scipy时使用shift-invert模式的ARPACK (scipy.sparse.linalg.eigsh)，
+    否则使用谱折叠的厚重启Lanczos迭代（见lanczos_nearest），直到所需的本征对收敛。
+    sigma恰好是本征值（例如平带或孤立的零能轨道）时 H - σ 是奇异矩阵，无法分解；此时把sigma
+    偏移 1e-8 * max(1, |σ|) 重试，仍然失败时改用lanczos_nearest。
+
+    参数:
+        matrix: 稀疏矩阵（scipy.sparse矩阵或CSRMatrix）
+        nev (int): 本征对个数
+        sigma (float): 目标能量
+        eig_vectors (bool): 是否返回本征矢量
+        tol (float): Lanczos迭代的收敛阈值
+
+    返回:
+        numpy.ndarray: 按升序排列的本征值，形状为 (nev,)
+        eig_vectors为True时返回 (本征值, 本征矢量)，本征矢量形状为 (n, nev)
+    """
+    n = matrix.shape[0]
+    nev = min(nev, n)
+    sparse, linalg = _scipy_sparse()
+
+    if sparse is not None and nev < n - 1:
+        vals, vecs = _shift_invert(linalg, matrix, nev, sigma, tol)
+    elif sparse is not None or n <= nev + 1:
+        # 矩阵太小，ARPACK无法计算，直接稠密对角化
+        dense = matrix.toarray()
+        vals, vecs = np.linalg.eigh(dense)
+        pick = np.sort(np.argsort(np.abs(vals - sigma), kind="stable")[:nev])
+        vals, vecs = vals[pick], vecs[:, pick]
+    else:
+        vals, vecs = lanczos_nearest(matrix.dot, n, nev, sigma, tol=tol)
+
+    order = np.argsort(vals)
+    vals, vecs = vals[order], vecs[:, order]
+    if eig_vectors:
+        return vals, vecs
+    return vals
+
+
+def _shift_invert(linalg, matrix, nev, sigma, tol):
+    """shift-invert ARPACK；H - σ 无法分解时依次尝试 σ ± δ，都失败时使用lanczos_nearest"""
+    offset = 1e-8 * max(1.0, abs(sigma))
+    for shift in (sigma, sigma + offset, sigma - offset):
+        try:
+            return linalg.eigsh(matrix, k=nev, sigma=shift, which="LM")
+        except RuntimeError:
+            # SuperLU: "Factor is exactly singular"
+            continue
+    return lanczos_nearest(matrix.dot, matrix.shape[0], nev, sigma, tol=tol)
+
+
+def lanczos_nearest(matvec, n, nev, sigma=0.0, tol=1e-10, max_iter=None, max_restarts=500, seed=0):
+    """
+    谱折叠的厚重启Lanczos迭代，返回最接近sigma的nev个本征对
+
+    对折叠算符 (H - σ)² 求最小的本征值，σ附近的内部本征值变为谱的下端。子空间达到max_iter维时保留最好的一半
+    Ritz矢量重启（thick restart），内存为 O(max_iter * n)；连续多次重启残差没有明显下降时子空间维数加倍，
+    最大为n。每次重启时在最好的nev个Ritz矢量张成的子空间内对H做Rayleigh-Ritz（分开折叠后重合的 σ ± d），
+    所有残差 ||Hx - λx|| 都小于 tol * max(1, |λ|) 时收敛。
+
+    参数:
+        matvec (callable): 计算矩阵-向量乘积的函数
+        n (int): 矩阵维数
+        nev (int): 本征对个数
+        sigma (float): 目标能量
+        tol (float): 残差收敛阈值
+        max_iter (int): Krylov子空间的初始最大维数，默认为 max(4 * nev, 40)
+        max_restarts (int): 最大重启次数
+        seed (int): 初始向量的随机数种子
+
+    返回:
+        tuple: (本征值, 本征矢量)，本征矢量形状为 (n, nev)
+
+    异常:
+        RuntimeError: 重启max_restarts次后残差仍大于tol
+    """
+    nev = min(nev, n)
+    size = max(4 * nev, 40) if max_iter is None else max_iter
+    size = min(max(size, nev + 2), n)
+    rng = np.random.default_rng(seed)
+
+    def folded(x):
+        y = matvec(x) - sigma * x
+        return matvec(y) - sigma * y
+
+    def orthogonalize(w, basis):
+        # 两次完全重正交化，保证基矢正交
+        for _ in range(2):
+            w = w - basis.T @ (basis @ w.conj()).conj()
+        return w
+
+    basis = np.zeros((size + 1, n), dtype=complex)
+    T = np.zeros((size, size))
+    q = rng.normal(size=n) + 1j * rng.normal(size=n)
+    basis[0] = q / np.linalg.norm(q)
+    start, best, stalled = 0, np.inf, 0
+
+    for restart in range(max_restarts + 1):
+        for j in range(start, size):
+            w = folded(basis[j])
+            T[j, j] = np.vdot(basis[j], w).real
+            w = orthogonalize(w, basis[:j + 1])
+            beta = np.linalg.norm(w)
+            if beta < 1e-12 * max(1.0, abs(T[j, j])):
+                # 找到不变子空间，换一个与基矢正交的随机方向继续，耦合为零
+                beta = 0.0
+                w = orthogonalize(rng.normal(size=n) + 1j * rng.normal(size=n), basis[:j + 1])
+                basis[j + 1] = w / np.linalg.norm(w) if j + 1 < n else 0
+            else:
+                basis[j + 1] = w / beta
+            if j + 1 < size:
+                T[j, j + 1] = T[j + 1, j] = beta
+
+        theta, S = np.linalg.eigh(T)
+        keep = min(max(nev, size // 2), size - 1)
+        ritz = S[:, :keep].T @ basis[:size]
+
+        # 在最好的nev个Ritz矢量张成的子空间内对H做Rayleigh-Ritz，检查H的残差
+        Y = ritz[:nev].T
+        HY = np.stack([matvec(y) for y in Y.T], axis=1)
+        vals, U = np.linalg.eigh(Y.conj().T @ HY)
+        vecs = Y @ U
+        residual = np.linalg.norm(HY @ U - vecs * vals, axis=0)
+        if np.all(residual < tol * np.maximum(1.0, np.abs(vals))) or size == n:
+            return vals, vecs
+        if restart == max_restarts:
+            break
+
+        # 残差停滞时加倍子空间维数
+        if residual.max() < 0.5 * best:
+            best, stalled = residual.max(), 0
+        else:
+            stalled += 1
+        new_size = min(2 * size, n) if stalled >= 10 else size
+        if new_size != size:
+            best, stalled = np.inf, 0
+
+        # 厚重启：保留keep个Ritz矢量，最后一个基矢作为新的Lanczos矢量，与Ritz矢量的耦合为 β s_last
+        last = basis[size].copy()
+        coupling = beta * S[size - 1, :keep]
+        if new_size != size:
+            size = new_size
+            basis = np.zeros((size + 1, n), dtype=complex)
+        basis[:keep] = ritz
+        basis[keep] = last
+        T = np.zeros((size, size))
+        T[np.arange(keep), np.arange(keep)] = theta[:keep]
+        T[keep, :keep] = T[:keep, keep] = coupling
+        start = keep
+
+    raise RuntimeError(f"Lanczos迭代在{max_restarts}次重启后没有收敛，最大残差为 {residual.max():.3e}（tol = {tol}）")
@@ -0,0 +1,166 @@
+"""
+交错磁体的自旋劈裂：在整个布里渊区上计算 ΔE(k) = E↑(k) - E↓(k)，在局部极大值附近逐级加密网格寻找最大值，
+并由环上ΔE的符号变化判断节点结构（d/g/i波）
+
+spin_splitting(ham, k_points, bands) 批量计算一批k点上所选能带的自旋劈裂
+
+nodal_sign_changes(ham, bands, radius, n_angle) 沿Γ点周围的圆环统计ΔE的符号变化次数
+
+classify_nodal_pattern(sign_changes) 由符号变化次数判断 d/g/i 波
+
+spin_splitting_map(ham, mesh, bands, levels, zoom, n_peaks) 粗网格加局部加密，返回最大劈裂、位置和节点结构
+
+
+"""
+
+import numpy as np
+
+from .dos import monkhorst_pack
+
+# 符号变化次数对应的节点结构：每个节点面在环上贡献两次符号变化
+NODAL_PATTERNS = {0: "s-wave", 4: "d-wave", 8: "g-wave", 12: "i-wave"}
+
+
+def spin_splitting(ham, k_points, bands=None):
+    """
+    批量计算自旋劈裂 ΔE_n(k) = E↑_n(k) - E↓_n(k)，E↑_n和E↓_n分别是两个自旋块中能量第n低的能带
+
+    参数:
+        ham (BlochHamiltonian): 自旋分块对角（共线磁性）的模型
+        k_points (numpy.ndarray): k点的分数坐标，形状为 (nk, dimk)
+        bands (list): 所选能带在每个自旋块中的编号，默认为全部
+
+    返回:
+        numpy.ndarray: 形状为 (nband, nk) 的自旋劈裂
+    """
+    if not ham.spin_diagonal:
+        raise ValueError("自旋劈裂只对共线磁性模型（自旋分块对角，nspin=2）有定义")
+    energies = ham.solve_spin_channels(k_points)
+    bands = slice(None) if bands is None else np.asarray(bands, dtype=int)
+    return energies[0][bands] - energies[1][bands]
+
+
+def nodal_sign_changes(ham, bands=None, radius=0.25, n_angle=360, tolerance=1e-6):
+    """
+    沿Γ点周围的圆环统计自旋劈裂的符号变化次数
+
+    圆环位于前两个周期方向的倒格矢平面内，半径以最短倒格矢长度为单位。
+    使用所选能带中环上|ΔE|最大的一条，小于tolerance的点视为节点并跳过。
+
+    参数:
+        ham (BlochHamiltonian): dimk >= 2 的共线磁性模型
+        bands (list): 所选能带
+        radius (float): 圆环半径，以最短倒格矢长度为单位
+        n_angle (int): 圆环上的采样点数
+        tolerance (float): 判断ΔE为零的阈值（eV）
+
+    返回:
+        int: 符号变化次数
+    """
+    if ham.dimk < 2:
+        raise ValueError("节点结构需要 dimk >= 2")
+    lat = ham.lattice[ham.per]
+    # 周期方向的倒格矢（行），满足 b_i · a_j = 2π δ_ij
+    reciprocal = 2 * np.pi * np.linalg.pinv(lat).T
+    plane, _ = np.linalg.qr(reciprocal[:2].T)
+    length = np.linalg.norm(reciprocal[:2], axis=1).min()
+    angles = np.linspace(0, 2 * np.pi, n_angle, endpoint=False)
+    k_cart = radius * length * (np.cos(angles)[:, None] * plane[:, 0] + np.sin(angles)[:, None] * plane[:, 1])
+    k_frac = k_cart @ lat.T / (2 * np.pi)
+
+    delta = spin_splitting(ham, k_frac, bands)
+    strongest = delta[np.argmax(np.abs(delta).max(axis=1))]
+    signs = np.sign(strongest[np.abs(strongest) > tolerance])
+    if len(signs) < 2:
+        return 0
+    return int(np.count_nonzero(signs != np.roll(signs, 1)))
+
+
+def classify_nodal_pattern(sign_changes):
+    """
+    由圆环上ΔE的符号变化次数判断节点结构
+
+    参数:
+        sign_changes (int): 符号变化次数
+
+    返回:
+        str: "s-wave"（无节点）、"d-wave"、"g-wave"、"i-wave"，其他次数返回 "N sign changes"
+    """
+    return NODAL_PATTERNS.get(int(sign_changes), f"{sign_changes} sign changes")
+
+
+def _local_maxima(values, n_peaks):
+    """周期网格上的局部极大值，按值从大到小返回前n_peaks个的扁平索引"""
+    peak = np.ones(values.shape, dtype=bool)
+    for axis in range(values.ndim):
+        for shift in (1, -1):
+            peak &= values >= np.roll(values, shift, axis=axis)
+    index = np.flatnonzero(peak)
+    return index[np.argsort(values.ravel()[index])[::-1][:n_peaks]]
+
+
+def spin_splitting_map(ham, mesh=24, bands=None, levels=3, zoom=5, n_peaks=4, radius=0.25, tolerance=1e-6):
+    """
+    在整个布里渊区上寻找最大自旋劈裂
+
+    先在Monkhorst-Pack粗网格上批量计算|ΔE|，取前n_peaks个局部极大值，然后进行levels轮加密：
+    每轮在当前最优点周围取 zoom^dimk 个点，范围为上一轮网格间距的两倍，所有候选点一起求解。
+
+    参数:
+        ham (BlochHamiltonian): 共线磁性模型
+        mesh (int or list): 粗网格每个周期方向的点数
+        bands (list): 所选能带在每个自旋块中的编号，默认为全部
+        levels (int): 加密轮数
+        zoom (int): 每轮加密时每个方向的点数
+        n_peaks (int): 加密的局部极大值个数
+        radius (float): 判断节点结构的圆环半径，见nodal_sign_changes
+        tolerance (float): 判断ΔE为零的阈值（eV）
+
+    返回:
+        dict: 包含
+            - max_splitting: 最大的 |ΔE|（eV）
+            - splitting: 该点的 ΔE（带符号）
+            - k_max: 最大值所在的分数坐标
+            - band: 最大值所在的能带
+            - sign_changes, nodal_pattern: 节点结构（dimk >= 2）
+            - mesh, coarse_map: 粗网格和网格上所选能带的最大|ΔE|
+            - n_evaluated: 计算过的k点数
+    """
+    dimk = ham.dimk
+    mesh = [int(n) for n in np.atleast_1d(mesh)]
+    mesh = (mesh * dimk if len(mesh) == 1 else mesh)[:dimk]
+    k_points = monkhorst_pack(mesh)
+    delta = np.abs(spin_splitting(ham, k_points, bands))
+    coarse = delta.max(axis=0).reshape(mesh)
+    n_evaluated = len(k_points)
+
+    centers = k_points[_local_maxima(coarse, n_peaks)]
+    step = 1.0 / np.asarray(mesh, dtype=float)
+    offsets = np.stack(np.meshgrid(*[np.linspace(-1.0, 1.0, zoom)] * dimk, indexing="ij"), axis=-1).reshape(-1, dimk)
+    for _ in range(levels):
+        candidates = (centers[:, None, :] + offsets[None] * step).reshape(-1, dimk)
+        values = np.abs(spin_splitting(ham, candidates, bands)).max(axis=0).reshape(len(centers), -1)
+        n_evaluated += len(candidates)
+        centers = candidates.reshape(len(centers), -1, dimk)[np.arange(len(centers)), values.argmax(axis=1)]
+        step = step * 2.0 / (zoom - 1)
+
+    final = spin_splitting(ham, centers, bands)
+    n_evaluated += len(centers)
+    band, best = np.unravel_index(np.argmax(np.abs(final)), final.shape)
+    k_max = (centers[best] + 0.5) % 1.0 - 0.5
+    band_index = int(band) if bands is None else int(np.asarray(bands)[band])
+
+    result = {
+        "max_splitting": float(np.abs(final[band, best])),
+        "splitting": float(final[band, best]),
+        "k_max": k_max,
+        "band": band_index,
+        "mesh": np.asarray(mesh),
+        "coarse_map": coarse,
+        "n_evaluated": n_evaluated,
+    }
+    if dimk >= 2:
+        sign_changes = nodal_sign_changes(ham, bands, radius, tolerance=tolerance)
+        result["sign_changes"] = sign_changes
+        result["nodal_pattern"] = classify_nodal_pattern(sign_changes)
+    return result
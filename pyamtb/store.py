@@ -0,0 +1,329 @@
+"""
+能带结果存储：本征值和本征矢量按块写入内存映射的.npy文件，另附一个JSON清单，分析时按需读取
+
+BandStore(path, mode) 打开已有的结果目录，evals/evecs/k_points均为内存映射数组
+
+BandStore.create(path, k_points, nbands, evecs_shape, metadata) 创建结果目录和内存映射文件
+
+BandStore.iter_chunks(chunk_size) 按k点分块读取本征值和本征矢量
+
+BandStore.spin_polarization() / degenerate_mask() / flat_bands() 分块计算自旋极化、简并能带和平带
+
+solve_to_store(ham, k_list, path, eig_vectors, workers) 分块对角化，每块求解完立即写入结果目录
+
+parameters_metadata(params) 提取参数中可以写入JSON清单的部分
+
+
+"""
+
+import json
+import os
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .parallel import limit_blas_threads, limit_worker_threads
+
+# 结果目录格式版本
+STORE_VERSION = 1
+
+# 清单和数组的文件名
+MANIFEST_NAME = "manifest.json"
+EVALS_NAME = "evals.npy"
+EVECS_NAME = "evecs.npy"
+KPOINTS_NAME = "k_points.npy"
+DEGENERATE_NAME = "degenerate.npy"
+
+# 分块读写时每块本征矢量的最大元素数
+CHUNK_ELEMENTS = 1 << 22
+
+# 工作进程中的模型和内存映射数组，由_init_worker设置
+_worker = {}
+
+
+def parameters_metadata(params):
+    """
+    提取参数实例中可以写入JSON的属性
+
+    参数:
+        params (Parameters): 参数实例
+
+    返回:
+        dict: 属性名到值的字典，跳过tbparas、以下划线开头和不能序列化的属性
+    """
+    metadata = {}
+    for name, value in vars(params).items():
+        if name.startswith("_") or name == "tbparas":
+            continue
+        if isinstance(value, np.ndarray):
+            value = value.tolist()
+        try:
+            metadata[name] = json.loads(json.dumps(value))
+        except (TypeError, ValueError):
+            continue
+    return metadata
+
+
+class BandStore:
+    """
+    磁盘上的能带结果目录：
+
+        manifest.json   形状、完成状态、k路径和参数
+        k_points.npy    k点的分数坐标 (nk, dimk)
+        evals.npy       本征值 (nband, nk)
+        evecs.npy       本征矢量 (nband, nk, norb[, 2])，可选
+        degenerate.npy  简并且自旋相反的态 (nband, nk)，由degenerate_mask写入
+
+    数组以np.load(mmap_mode=...)打开，只有被访问的部分才会读入内存。
+    """
+
+    def __init__(self, path, mode="r"):
+        """
+        参数:
+            path (str): 结果目录
+            mode (str): 内存映射模式，"r" 只读，"r+" 读写
+        """
+        self.path = path
+        self.mode = mode
+        manifest_path = os.path.join(path, MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            raise FileNotFoundError(f"找不到结果清单: {manifest_path}")
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("version") != STORE_VERSION:
+            raise ValueError(f"结果目录 {path} 的版本 {self.manifest.get('version')} 不受支持")
+        self.k_points = np.load(os.path.join(path, KPOINTS_NAME), mmap_mode="r")
+        self.evals = np.load(os.path.join(path, EVALS_NAME), mmap_mode=mode)
+        self.evecs = np.load(os.path.join(path, EVECS_NAME), mmap_mode=mode) if self.manifest["eig_vectors"] else None
+
+    @classmethod
+    def create(cls, path, k_points, nbands, evecs_shape=None, metadata=None):
+        """
+        创建结果目录，预先分配内存映射文件，清单中标记为未完成
+
+        参数:
+            path (str): 结果目录，不存在时自动创建，已有的结果会被覆盖
+            k_points (numpy.ndarray): k点的分数坐标，形状为 (nk, dimk)
+            nbands (int): 能带数
+            evecs_shape (tuple): 每个本征矢量的形状，(norb,) 或 (norb, 2)，为None时不保存本征矢量
+            metadata (dict): 写入清单的其他信息（k路径、参数等），必须可以写入JSON
+
+        返回:
+            BandStore: 以读写模式打开的结果目录
+        """
+        os.makedirs(path, exist_ok=True)
+        k_points = np.asarray(k_points, dtype=float)
+        if k_points.ndim == 1:
+            k_points = k_points[:, None]
+        nk = len(k_points)
+        for name in (EVALS_NAME, EVECS_NAME, DEGENERATE_NAME):
+            if os.path.exists(os.path.join(path, name)):
+                os.remove(os.path.join(path, name))
+        np.save(os.path.join(path, KPOINTS_NAME), k_points)
+        np.lib.format.open_memmap(os.path.join(path, EVALS_NAME), mode="w+",
+                                  dtype=np.float64, shape=(nbands, nk)).flush()
+        if evecs_shape is not None:
+            np.lib.format.open_memmap(os.path.join(path, EVECS_NAME), mode="w+", dtype=np.complex128,
+                                      shape=(nbands, nk) + tuple(evecs_shape)).flush()
+        manifest = {
+            "version": STORE_VERSION,
+            "nk": nk,
+            "nbands": int(nbands),
+            "eig_vectors": evecs_shape is not None,
+            "evecs_shape": list(evecs_shape) if evecs_shape is not None else None,
+            "complete": False,
+            "metadata": metadata or {},
+        }
+        cls._write_manifest(path, manifest)
+        return cls(path, mode="r+")
+
+    @staticmethod
+    def _write_manifest(path, manifest):
+        tmp_path = os.path.join(path, MANIFEST_NAME + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(path, MANIFEST_NAME))
+
+    @property
+    def nk(self):
+        return self.manifest["nk"]
+
+    @property
+    def nbands(self):
+        return self.manifest["nbands"]
+
+    @property
+    def complete(self):
+        return self.manifest["complete"]
+
+    @property
+    def metadata(self):
+        return self.manifest["metadata"]
+
+    def write(self, start, evals, evecs=None):
+        """
+        写入从第start个k点开始的一块结果
+
+        参数:
+            start (int): 起始k点索引
+            evals (numpy.ndarray): 本征值，形状为 (nband, nk_chunk)
+            evecs (numpy.ndarray): 本征矢量，形状为 (nband, nk_chunk, ...)
+        """
+        stop = start + evals.shape[1]
+        self.evals[:, start:stop] = evals
+        if self.evecs is not None and evecs is not None:
+            self.evecs[:, start:stop] = evecs
+
+    def finalize(self):
+        """把内存映射写回磁盘，并在清单中标记为已完成"""
+        self.evals.flush()
+        if self.evecs is not None:
+            self.evecs.flush()
+        self.manifest["complete"] = True
+        self._write_manifest(self.path, self.manifest)
+
+    def default_chunk_size(self):
+        """每块k点数，使每块本征矢量约占CHUNK_ELEMENTS个元素"""
+        per_k = self.nbands * (int(np.prod(self.evecs.shape[2:])) if self.evecs is not None else 1)
+        return max(1, CHUNK_ELEMENTS // max(per_k, 1))
+
+    def iter_chunks(self, chunk_size=None):
+        """
+        按k点分块读取结果
+
+        参数:
+            chunk_size (int): 每块的k点数，默认由default_chunk_size确定
+
+        返回:
+            生成器，每次给出 (start, stop, evals, evecs)，没有本征矢量时evecs为None
+        """
+        chunk_size = chunk_size or self.default_chunk_size()
+        for start in range(0, self.nk, chunk_size):
+            stop = min(start + chunk_size, self.nk)
+            evecs = np.asarray(self.evecs[:, start:stop]) if self.evecs is not None else None
+            yield start, stop, np.asarray(self.evals[:, start:stop]), evecs
+
+    def spin_polarization(self, chunk_size=None):
+        """
+        分块计算每个本征态的自旋极化，见tight_binding_model.spin_polarization
+
+        返回:
+            tuple: (spin, norm)，形状均为 (nband, nk)
+        """
+        from .tight_binding_model import spin_polarization
+        if self.evecs is None or self.evecs.ndim != 4:
+            raise ValueError("计算自旋极化需要nspin=2的本征矢量")
+        spin = np.zeros((self.nbands, self.nk))
+        norm = np.zeros((self.nbands, self.nk))
+        for start, stop, _, evecs in self.iter_chunks(chunk_size):
+            spin[:, start:stop], norm[:, start:stop] = spin_polarization(evecs)
+        return spin, norm
+
+    def degenerate_mask(self, energy_threshold=1e-3, chunk_size=None):
+        """
+        分块找出能量简并且自旋相反的态，见tight_binding_model.degenerate_spin_pairs，
+        结果同时写入degenerate.npy
+
+        返回:
+            numpy.memmap: 布尔数组，形状为 (nband, nk)
+        """
+        from .tight_binding_model import spin_polarization, degenerate_spin_pairs
+        if self.evecs is None or self.evecs.ndim != 4:
+            raise ValueError("分析简并能带需要nspin=2的本征矢量")
+        mask = np.lib.format.open_memmap(os.path.join(self.path, DEGENERATE_NAME), mode="w+",
+                                         dtype=bool, shape=(self.nbands, self.nk))
+        for start, stop, evals, evecs in self.iter_chunks(chunk_size):
+            spin, norm = spin_polarization(evecs)
+            mask[:, start:stop] = degenerate_spin_pairs(evals, spin, norm, energy_threshold)
+        mask.flush()
+        return mask
+
+    def flat_bands(self, threshold=0.05, min_points=10, band_block=64):
+        """
+        按能带分块检查平带，见tight_binding_model.check_flat_bands
+
+        参数:
+            threshold (float): 判断平带的能量波动阈值
+            min_points (int): 判断平带的最小连续k点数
+            band_block (int): 每次读入的能带数
+
+        返回:
+            list: 与check_flat_bands相同
+        """
+        from .tight_binding_model import check_flat_bands
+        flat_bands = []
+        for lo in range(0, self.nbands, band_block):
+            for flat in check_flat_bands(np.asarray(self.evals[lo:lo + band_block]), threshold, min_points):
+                flat['band_index'] += lo
+                flat_bands.append(flat)
+        return flat_bands
+
+
+def _init_worker(ham, path, sparse_nev, sigma):
+    """工作进程初始化：保存模型，以读写模式打开结果目录"""
+    limit_worker_threads()
+    _worker.update(ham=ham, store=BandStore(path, mode="r+"), sparse_nev=sparse_nev, sigma=sigma)
+
+
+def _solve_chunk(start, k_chunk):
+    """在工作进程中求解一块k点并写入结果目录"""
+    _write_chunk(_worker["store"], _worker["ham"], start, k_chunk, _worker["sparse_nev"], _worker["sigma"])
+    _worker["store"].evals.flush()
+    if _worker["store"].evecs is not None:
+        _worker["store"].evecs.flush()
+    return len(k_chunk)
+
+
+def _write_chunk(store, ham, start, k_chunk, sparse_nev, sigma):
+    """求解一块k点并写入store"""
+    eig_vectors = store.evecs is not None
+    if sparse_nev is None:
+        result = ham.solve_all(k_chunk, eig_vectors=eig_vectors)
+    else:
+        result = ham.solve_sparse(k_chunk, sparse_nev, sigma, eig_vectors=eig_vectors)
+    if eig_vectors:
+        store.write(start, *result)
+    else:
+        store.write(start, result)
+
+
+def solve_to_store(ham, k_list, path, eig_vectors=False, workers=1, chunk_size=None,
+                   sparse_nev=None, sigma=0.0, metadata=None):
+    """
+    分块对角化所有k点，每块求解完立即写入内存映射文件，内存中最多只有一块的本征矢量
+
+    参数:
+        ham (BlochHamiltonian): 数组形式的紧束缚模型
+        k_list (numpy.ndarray): k点的分数坐标
+        path (str): 结果目录
+        eig_vectors (bool): 是否保存本征矢量
+        workers (int): 进程数，工作进程直接写入同一组内存映射文件中互不重叠的部分
+        chunk_size (int): 每块的k点数，默认使每块本征矢量约占CHUNK_ELEMENTS个元素
+        sparse_nev (int): 不为None时使用solve_sparse只求sigma附近的sparse_nev条能带
+        sigma (float): 稀疏求解的目标能量
+        metadata (dict): 写入清单的其他信息
+
+    返回:
+        BandStore: 以只读模式打开的结果目录
+    """
+    k_list = ham._k_array(k_list)
+    nk = len(k_list)
+    nbands = ham.nstate if sparse_nev is None else min(sparse_nev, ham.nstate)
+    evecs_shape = ((ham.norb, 2) if ham.nspin == 2 else (ham.norb,)) if eig_vectors else None
+    store = BandStore.create(path, k_list, nbands, evecs_shape, metadata)
+    chunk_size = chunk_size or store.default_chunk_size()
+
+    if workers is None or workers <= 1 or nk <= chunk_size:
+        for start in range(0, nk, chunk_size):
+            _write_chunk(store, ham, start, k_list[start:start + chunk_size], sparse_nev, sigma)
+    else:
+        with limit_blas_threads(1), ProcessPoolExecutor(
+                max_workers=min(int(workers), -(-nk // chunk_size)), mp_context=get_context("spawn"),
+                initializer=_init_worker, initargs=(ham, path, sparse_nev, sigma)) as pool:
+            futures = [pool.submit(_solve_chunk, start, k_list[start:start + chunk_size])
+                       for start in range(0, nk, chunk_size)]
+            for future in futures:
+                future.result()
+    store.finalize()
+    return BandStore(path)
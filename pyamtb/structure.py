@@ -0,0 +1,220 @@
+"""
+结构文件的读取层：每个文件只解析一次，坐标由NumPy整体解析，结果按 (路径, 修改时间, 大小) 缓存，
+参数检查和建模读取同一个POSCAR时不再重复解析
+
+load_structure(filename) 解析POSCAR或XDATCAR格式的文件，返回所有帧的原始数据，结果被缓存
+
+parse_structure(lines, filename) 从文本行解析POSCAR/XDATCAR，支持Selective dynamics和变晶胞的XDATCAR
+
+select_atoms(elements, atom_counts, selected_elements) 用索引掩码选出指定元素的原子
+
+clear_structure_cache() 清空缓存
+
+
+"""
+
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+# 缓存的文件数上限，超过时丢弃最久未使用的文件
+STRUCTURE_CACHE_SIZE = 16
+
+_cache = OrderedDict()
+
+
+def load_structure(filename):
+    """
+    解析POSCAR或XDATCAR格式的文件，同一个文件（路径、修改时间和大小都相同）只解析一次
+
+    返回的数组是只读的，需要修改时请先复制。
+
+    参数:
+        filename (str): 文件路径
+
+    返回:
+        dict: parse_structure的返回值
+    """
+    stat = os.stat(filename)
+    key = (os.path.abspath(filename), stat.st_mtime_ns, stat.st_size)
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+
+    with open(filename, 'r', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    structure = parse_structure(lines, filename)
+    for value in structure.values():
+        if isinstance(value, np.ndarray):
+            value.setflags(write=False)
+
+    _cache[key] = structure
+    while len(_cache) > STRUCTURE_CACHE_SIZE:
+        _cache.popitem(last=False)
+    return structure
+
+
+def clear_structure_cache():
+    """清空load_structure的缓存"""
+    _cache.clear()
+
+
+def _coordinate_type(line, filename, number):
+    """由坐标类型行判断是否为分数坐标"""
+    kind = line.strip()[:1].lower()
+    if kind == 'd':
+        return True
+    if kind in ('c', 'k'):
+        return False
+    raise ValueError(f"{filename} 第{number + 1}行: 未知的坐标类型: {line.strip()}")
+
+
+def _is_frame_start(lines, line):
+    """第line行是否为一帧的坐标类型行：以D/C/K开头，下一行是坐标"""
+    return (lines[line].strip()[:1].lower() in ('d', 'c', 'k')
+            and line + 1 < len(lines) and len(lines[line + 1].split()) >= 3)
+
+
+def _parse_numbers(lines, filename, first_line, ncols=3):
+    """用numpy.loadtxt整体解析若干行的前ncols列，多余的列（如Selective dynamics标记、元素名）被忽略"""
+    if not lines:
+        return np.empty((0, ncols))
+    try:
+        return np.loadtxt(lines, usecols=range(ncols), comments=('#', '!'), ndmin=2)
+    except ValueError as e:
+        raise ValueError(f"{filename} 第{first_line + 1}行开始的数值块有误: {e}") from None
+
+
+def _parse_header(lines, start, filename):
+    """解析从start开始的文件头（注释、比例因子、晶格、元素、原子数），返回 (header, 下一行的行号)"""
+    if len(lines) < start + 8:
+        raise ValueError(f"{filename} 第{start + 1}行开始的文件头不完整")
+    try:
+        scale = float(lines[start + 1].split()[0])
+    except (ValueError, IndexError):
+        raise ValueError(f"{filename} 第{start + 2}行: 比例因子有误: {lines[start + 1].strip()}") from None
+    lattice = _parse_numbers(lines[start + 2:start + 5], filename, start + 2)
+    elements = lines[start + 5].split()
+    try:
+        atom_counts = [int(n) for n in lines[start + 6].split()]
+    except ValueError:
+        raise ValueError(f"{filename} 第{start + 7}行: 原子数有误: {lines[start + 6].strip()}") from None
+    if len(elements) != len(atom_counts) or any(e.lstrip('-').isdigit() for e in elements):
+        raise ValueError(f"{filename} 第{start + 6}行: 需要VASP 5格式的元素行，且元素数与原子数一致")
+    line = start + 7
+    selective = lines[line].strip()[:1].lower() == 's'
+    if selective:
+        line += 1
+    header = {
+        "comment": lines[start].strip(),
+        "scale": scale,
+        "lattice": lattice,
+        "elements": elements,
+        "atom_counts": atom_counts,
+        "selective": selective,
+    }
+    return header, line
+
+
+def parse_structure(lines, filename="POSCAR"):
+    """
+    从文本行解析POSCAR或XDATCAR格式的结构
+
+    单帧的POSCAR是只有一帧的特例；XDATCAR中每帧以坐标类型行（如"Direct configuration= 1"）开头，
+    变晶胞的XDATCAR在每帧前重复文件头。晶格不乘比例因子，坐标保持文件中的形式。
+
+    参数:
+        lines (list): 文件的文本行
+        filename (str): 文件名，只用于错误信息
+
+    返回:
+        dict: 包含
+            - comment, elements, atom_counts, selective: 第一帧文件头中的信息
+            - scale: 每帧的比例因子，形状为 (nframe,)
+            - lattice: 每帧的晶格（未乘比例因子），形状为 (nframe, 3, 3)
+            - is_direct: 坐标是否为分数坐标
+            - coordinates: 文件中的坐标，形状为 (nframe, natom, 3)
+    """
+    while lines and not lines[-1].strip():
+        lines = lines[:-1]
+    if not lines:
+        raise ValueError(f"文件 {filename} 为空")
+    header, line = _parse_header(lines, 0, filename)
+    natoms = sum(header["atom_counts"])
+    is_direct = _coordinate_type(lines[line], filename, line)
+    body = lines[line:]
+    stride = natoms + 1
+    if len(body) < stride:
+        raise ValueError(f"{filename}: 需要 {natoms} 行原子坐标，但只有 {len(body) - 1} 行")
+
+    if len(body) == stride or not body[stride].strip():
+        # 单帧（POSCAR/CONTCAR），坐标块后空行之后的内容（如速度）被忽略
+        nframe, coord_lines = 1, body[1:stride]
+    elif len(body) % stride == 0 and all(_is_frame_start(body, i) for i in range(0, len(body), stride)):
+        # 晶胞不变的XDATCAR：坐标类型行间隔相同，去掉这些行后一次解析全部坐标
+        nframe = len(body) // stride
+        coord_lines = [text for i, text in enumerate(body) if i % stride]
+    else:
+        nframe = 0
+    if nframe:
+        coords = _parse_numbers(coord_lines, filename, line + 1).reshape(nframe, natoms, 3)
+        scales = np.full(nframe, header["scale"])
+        lattices = np.repeat(header["lattice"][None], nframe, axis=0)
+    else:
+        # 变晶胞的XDATCAR：逐帧读取文件头和坐标块
+        frames, scales, lattices = [], [], []
+        frame_header = header
+        while True:
+            if len(lines) < line + stride:
+                raise ValueError(f"{filename} 第{line + 1}行开始的一帧坐标不完整")
+            if sum(frame_header["atom_counts"]) != natoms:
+                raise ValueError(f"{filename} 第{line + 1}行: 各帧的原子数必须相同")
+            _coordinate_type(lines[line], filename, line)
+            frames.append(_parse_numbers(lines[line + 1:line + stride], filename, line + 1))
+            scales.append(frame_header["scale"])
+            lattices.append(frame_header["lattice"])
+            line += stride
+            if line >= len(lines) or not lines[line].strip():
+                break
+            if not _is_frame_start(lines, line):
+                frame_header, line = _parse_header(lines, line, filename)
+        coords, scales, lattices = np.stack(frames), np.asarray(scales), np.stack(lattices)
+
+    return {
+        "comment": header["comment"],
+        "scale": scales,
+        "lattice": lattices,
+        "elements": header["elements"],
+        "atom_counts": header["atom_counts"],
+        "selective": header["selective"],
+        "is_direct": is_direct,
+        "coordinates": coords,
+    }
+
+
+def select_atoms(elements, atom_counts, selected_elements=None):
+    """
+    生成每个原子的元素符号，并用布尔掩码选出指定元素的原子
+
+    参数:
+        elements (list): 文件中的元素类型
+        atom_counts (list): 各元素的原子数
+        selected_elements (list): 需要的元素，为None时选择全部原子
+
+    返回:
+        tuple: (mask, atom_symbols, elements, atom_counts)
+            - mask: 被选中原子的布尔掩码，形状为 (natom,)
+            - atom_symbols: 被选中原子的元素符号列表
+            - elements, atom_counts: 按selected_elements的顺序排列的元素和原子数，只包含存在的元素
+    """
+    symbols = np.repeat(np.asarray(elements, dtype=object), atom_counts)
+    if selected_elements is None:
+        return np.ones(len(symbols), dtype=bool), symbols.tolist(), list(elements), list(atom_counts)
+    mask = np.isin(symbols, list(selected_elements))
+    counts = {element: 0 for element in selected_elements}
+    for element, count in zip(elements, atom_counts):
+        if element in counts:
+            counts[element] += count
+    kept = [(element, count) for element, count in counts.items() if count > 0]
+    return mask, symbols[mask].tolist(), [e for e, _ in kept], [n for _, n in kept]
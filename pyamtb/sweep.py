@@ -0,0 +1,186 @@
+"""
+跃迁参数扫描：近邻距离表只计算一次，对 t0 / hopping_decay (lambda_) / t0_distance 的网格批量求解能带
+
+parse_values(spec) 解析扫描取值，支持 "start:stop:num" 和逗号分隔的列表
+
+sweep_hopping_strengths(distance, signs, t0, hopping_decay, t0_distance) 对一组参数点一次性计算所有跃迁强度
+
+sweep_band_structure(params, t0, hopping_decay, t0_distance) 对参数网格求解k路径上的能带
+
+save_sweep(result, filename) 把扫描结果保存为一个.npz文件
+
+
+"""
+
+from types import SimpleNamespace
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .read_datas import read_poscar
+from .hoppings import HoppingTable
+from .hamiltonian import BlochHamiltonian
+from .parallel import limit_blas_threads, limit_worker_threads, solve_parallel, _attach, _create_shared
+from .tight_binding_model import (neighbor_list, coupling_signs, hopping_strength, onsite_terms,
+                                  sparse_settings)
+
+# 工作进程中的模型和共享内存，由_init_worker设置
+_worker = {}
+
+
+def parse_values(spec):
+    """
+    解析扫描取值
+
+    参数:
+        spec: "start:stop:num"（包含端点的等间距取值）、逗号分隔的字符串、数字或数字列表
+
+    返回:
+        numpy.ndarray: 一维浮点数组
+    """
+    if isinstance(spec, str):
+        if ":" in spec:
+            parts = spec.split(":")
+            if len(parts) != 3:
+                raise ValueError(f"扫描范围格式应为 start:stop:num，但得到 {spec}")
+            return np.linspace(float(parts[0]), float(parts[1]), int(parts[2]))
+        return np.array([float(value) for value in spec.split(",") if value.strip()])
+    return np.atleast_1d(np.asarray(spec, dtype=float))
+
+
+def sweep_hopping_strengths(distance, signs, t0, hopping_decay, t0_distance):
+    """
+    对一组参数点一次性计算所有跃迁强度，与hopping_strength使用同一个指数衰减模型
+
+    参数:
+        distance (numpy.ndarray): 跃迁距离，形状为 (n_hop,)
+        signs (numpy.ndarray): 耦合符号，形状为 (n_hop,)
+        t0, hopping_decay, t0_distance (numpy.ndarray): 每个参数点的取值，形状均为 (n_point,)
+
+    返回:
+        numpy.ndarray: 跃迁强度，形状为 (n_point, n_hop)
+    """
+    point = SimpleNamespace(t0=np.asarray(t0, dtype=float)[:, None],
+                            lambda_=np.asarray(hopping_decay, dtype=float)[:, None],
+                            t0_distance=np.asarray(t0_distance, dtype=float)[:, None])
+    return signs * hopping_strength(distance, point)
+
+
+def _geometry(params):
+    """计算一次去重后的跃迁几何 (跃迁表, 耦合符号, 距离) 和不含跃迁强度的模型"""
+    poscar_data = read_poscar(params.poscar, selected_elements=params.use_elements)
+    lattice = poscar_data['lattice']/params.a0
+    coords = poscar_data['coordinates']
+    atom1, atom2, R_vectors, distance_values = neighbor_list(poscar_data, params.use_elements, params)
+    signs = coupling_signs(poscar_data["atom_symbols"], atom1, atom2, params)
+    # 以耦合符号作为跃迁强度去重，之后每个参数点只需替换跃迁强度
+    table = HoppingTable.from_arrays(atom1, atom2, R_vectors, signs, distance_values).deduplicate()
+    ham = BlochHamiltonian.from_hopping_table(table, lattice, coords, onsite_terms(params, len(coords)),
+                                              params.dimk, params.nspin)
+    return ham, table.t.copy(), table.d.copy()
+
+
+def _init_worker(ham, signs, distance, k_vec, evals_spec, sparse_nev, sigma):
+    """工作进程初始化：保存模型和k点，连接共享内存，并限制BLAS线程数"""
+    limit_worker_threads()
+    _worker.update(ham=ham, signs=signs, distance=distance, k_vec=k_vec,
+                   sparse_nev=sparse_nev, sigma=sigma, evals=_attach(*evals_spec))
+
+
+def _solve_points(start, grid):
+    """在工作进程中求解一块参数点，结果写入共享内存的 [start, start+len(grid)) 部分"""
+    evals = _worker["evals"][1]
+    _solve_into(evals[start:start + len(grid)], _worker["ham"], _worker["signs"], _worker["distance"],
+                grid, _worker["k_vec"], _worker["sparse_nev"], _worker["sigma"])
+    return len(grid)
+
+
+def _solve_into(out, ham, signs, distance, grid, k_vec, sparse_nev, sigma, workers=1):
+    """对grid中的每个参数点 (t0, hopping_decay, t0_distance) 求解能带，写入out"""
+    hop_t = sweep_hopping_strengths(distance, signs, grid[:, 0], grid[:, 1], grid[:, 2])
+    for n, t in enumerate(hop_t):
+        out[n] = solve_parallel(ham.with_hopping_strengths(t), k_vec, workers,
+                                sparse_nev=sparse_nev, sigma=sigma)
+
+
+def sweep_band_structure(params, t0=None, hopping_decay=None, t0_distance=None, workers=None, chunk_size=None):
+    """
+    对 t0 × hopping_decay × t0_distance 参数网格求解k路径上的能带
+
+    近邻搜索、耦合符号、去重和相位位移只计算一次；每个参数点只重新计算跃迁强度。
+    workers大于1时参数点分块交给进程池，能带直接写入共享内存。
+
+    参数:
+        params (Parameters): 参数实例，提供结构、k路径和求解器设置
+        t0, hopping_decay, t0_distance: 扫描取值（见parse_values），为None时使用params中的值
+        workers (int): 进程数，默认为params.workers
+        chunk_size (int): 每个任务的参数点数，默认把参数点平均分成 4*workers 块
+
+    返回:
+        dict: 包含
+            - evals: 能带，形状为 (n_t0, n_hopping_decay, n_t0_distance, nband, nk)
+            - t0, hopping_decay, t0_distance: 扫描取值
+            - k_vec, k_dist, k_node, klabel: k路径
+    """
+    t0 = parse_values(params.t0 if t0 is None else t0)
+    hopping_decay = parse_values(params.lambda_ if hopping_decay is None else hopping_decay)
+    t0_distance = parse_values(params.t0_distance if t0_distance is None else t0_distance)
+    if np.any(t0_distance <= 0):
+        raise ValueError("t0_distance 必须大于0")
+    workers = params.workers if workers is None else workers
+
+    ham, signs, distance = _geometry(params)
+    k_vec, k_dist, k_node = ham.k_path(params.kpath, params.num_k_points)
+    k_vec = ham._k_array(k_vec)
+    sparse_nev, sigma = sparse_settings(params)
+    nbands = ham.nstate if sparse_nev is None else min(sparse_nev, ham.nstate)
+
+    shape = (len(t0), len(hopping_decay), len(t0_distance))
+    grid = np.stack(np.meshgrid(t0, hopping_decay, t0_distance, indexing="ij"), axis=-1).reshape(-1, 3)
+    n_point = len(grid)
+
+    if workers is None or workers <= 1 or n_point < 2:
+        evals = np.empty((n_point, nbands, len(k_vec)))
+        # 只有一个参数点时在k点上并行
+        _solve_into(evals, ham, signs, distance, grid, k_vec, sparse_nev, sigma, workers=workers)
+    else:
+        workers = min(int(workers), n_point)
+        if chunk_size is None:
+            chunk_size = max(1, -(-n_point // (4 * workers)))
+        evals_shm, evals = _create_shared((n_point, nbands, len(k_vec)), np.float64)
+        try:
+            with limit_blas_threads(1), ProcessPoolExecutor(
+                    max_workers=workers, mp_context=get_context("spawn"), initializer=_init_worker,
+                    initargs=(ham, signs, distance, k_vec, (evals_shm.name, evals.shape, evals.dtype),
+                              sparse_nev, sigma)) as pool:
+                futures = [pool.submit(_solve_points, start, grid[start:start + chunk_size])
+                           for start in range(0, n_point, chunk_size)]
+                for future in futures:
+                    future.result()
+            evals = evals.copy()
+        finally:
+            evals_shm.close()
+            evals_shm.unlink()
+
+    return {
+        "evals": evals.reshape(shape + evals.shape[1:]),
+        "t0": t0,
+        "hopping_decay": hopping_decay,
+        "t0_distance": t0_distance,
+        "k_vec": k_vec,
+        "k_dist": np.asarray(k_dist),
+        "k_node": np.asarray(k_node),
+        "klabel": np.asarray(params.klabel, dtype=str),
+    }
+
+
+def save_sweep(result, filename):
+    """
+    把sweep_band_structure的结果保存为一个.npz文件
+
+    参数:
+        result (dict): sweep_band_structure的返回值
+        filename (str): 输出文件名
+    """
+    np.savez(filename, **result)
@@ -7,21 +7,26 @@ hopping_strength(distance) 计算跃迁强度,随距离指数衰减
 
 create_pythtb_model(poscar_filename) 从POSCAR文件创建紧束缚模型,设置轨道位置和跃迁参数
 
-calculate_band_structure(model) 计算能带结构并绘图
+create_bloch_hamiltonian(params) 从POSCAR文件直接创建数组形式的模型，不经过pythtb
+
+calculate_band_structure(model) 计算能带结构，保存能带数据并绘图（见plotting模块）
 
 
 """
 
-from pythtb import * # import TB model class
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 from .read_datas import read_poscar
-from .parameters import Parameters
-from copy import deepcopy
-
-# 创建全局参数实例
-params = Parameters()
+from .parameters import Parameters, default_parameters
+from .hamiltonian import BlochHamiltonian, merge_spin_blocks
+from .hoppings import HoppingTable
+from .cache import NeighborCache
+from .parallel import solve_parallel
+from .store import BandStore, solve_to_store, parameters_metadata
+from .kpath import adaptive_k_path
+from .plotting import save_band_data, plot_bands
+from .profiling import span, profiled
+from .neighbors import neighbor_pairs, find_neighbors, image_translations, lattice_translations
 
 DEBUG = True
 
@@ -57,22 +62,44 @@ def calculate_distance(coord1, coord2, lattice):
     
     return distance
 
-def hopping_strength(distance):
+def hopping_strength(distance, params=None):
     """
     计算跃迁强度与距离的关系
     
     参数:
-        distance (float): 实际距离（埃）
-        t0_distance (float): 参考距离（埃）
-        t0 (float): 参考距离下的跃迁强度
+        distance (float or numpy.ndarray): 实际距离（埃）
+        params (Parameters): 参数实例，提供t0, t0_distance, lambda_，如果为None则使用default_parameters()
         
     返回:
-        float: 跃迁强度
+        float or numpy.ndarray: 跃迁强度
     """
+    if params is None:
+        params = default_parameters()
     # 使用指数衰减模型: t = t0 * exp(-lambda_*(d-d0)/d0)
     return params.t0 * np.exp(-params.lambda_*(distance - params.t0_distance) / params.t0_distance)
 
-def get_coupling_strength(atom1_index, atom2_index, poscar_data):
+def coupling_signs(atom_symbols, atom1, atom2, params=None):
+    """
+    计算原子对的耦合符号：同种元素且same_atom_negative_coupling为真时为-1，否则为1
+    
+    参数:
+        atom_symbols (list): 每个原子的元素符号
+        atom1 (numpy.ndarray): 第一个原子的索引数组
+        atom2 (numpy.ndarray): 第二个原子的索引数组
+        params (Parameters): 参数实例，如果为None则使用default_parameters()
+        
+    返回:
+        numpy.ndarray: 耦合符号数组
+    """
+    if params is None:
+        params = default_parameters()
+    signs = np.ones(len(atom1))
+    if params.same_atom_negative_coupling:
+        symbols = np.asarray(atom_symbols)
+        signs[symbols[atom1] == symbols[atom2]] = -1
+    return signs
+
+def get_coupling_strength(atom1_index, atom2_index, poscar_data, params=None):
     """
     计算两个原子之间的耦合强度，考虑周期性边界条件和相邻格点上的等价原子
     
@@ -80,69 +107,102 @@ def get_coupling_strength(atom1_index, atom2_index, poscar_data):
         atom1_index (int): 第一个原子的索引
         atom2_index (int): 第二个原子的索引
         poscar_data (dict): POSCAR数据字典
+        params (Parameters): 参数实例，如果为None则使用default_parameters()
         
     返回:
         tuple: (耦合强度数组, 格矢量数组) - 包含中心格点和相邻格点的耦合信息
     """
-    # 获取原子坐标和元素类型
-    coord1 = poscar_data["coordinates"][atom1_index]
-    coord2 = poscar_data["coordinates"][atom2_index]
+    if params is None:
+        params = default_parameters()
 
-    type1 = poscar_data["atom_symbols"][atom1_index]
-    type2 = poscar_data["atom_symbols"][atom2_index]
+    # 生成所有可能的格矢量
+    coords = poscar_data["coordinates"][[atom1_index, atom2_index]]
+    if params.neighbor_search == "max_neighbors":
+        Rlist = lattice_translations(params.dimk, params.max_neighbors)
+    else:
+        Rlist = image_translations(poscar_data["lattice"], params.maxdistance, params.dimk, coords)
+
+    # 一次性计算所有格矢量下的距离，只保留 atom1 -> atom2 的结果
+    atom1, atom2, R_vectors, distance_values = find_neighbors(
+        coords, poscar_data["lattice"], Rlist, params.mindist, params.maxdistance, upper=False)
+    keep = (atom1 == 0) & (atom2 == (0 if atom1_index == atom2_index else 1))
+    R_vectors, distance_values = R_vectors[keep], distance_values[keep]
 
     # 如果两个原子是同一种元素，则耦合强度为正，否则为负（没必要，但是可以）
-    coupling_sign = -1 if ((type1 == type2) and params.same_atom_negative_coupling) else 1
-    
-    # 生成相邻格点的格矢量
-    R_vectors = []
-    coupling_values = []
-    distance_values = []
+    sign = coupling_signs(poscar_data["atom_symbols"], [atom1_index], [atom2_index], params)[0]
+    coupling_values = sign * hopping_strength(distance_values, params)
 
-    # 生成所有可能的格矢量
-    Rlist = []
-    if params.dimk == 3:
-        for i in range(-params.max_neighbors, params.max_neighbors+1):
-            for j in range(-params.max_neighbors, params.max_neighbors+1):
-                for k in range(-params.max_neighbors, params.max_neighbors+1):
-                    Rlist.append(np.array([i, j, k]))
-    elif params.dimk == 2:
-        for i in range(-params.max_neighbors, params.max_neighbors+1):
-            for j in range(-params.max_neighbors, params.max_neighbors+1):
-                Rlist.append(np.array([i, j, 0]))
-    elif params.dimk == 1:
-        Rlist = [[i,0,0] for i in range(-params.max_neighbors, params.max_neighbors+1)]
-    else:
-        raise ValueError(f"dimk must be 1, 2, or 3, but got {params.dimk}")
+    return list(coupling_values), list(R_vectors), list(distance_values)
+
+def search_range(params):
+    """
+    返回近邻搜索使用的格矢量范围：neighbor_search为"max_neighbors"时返回params.max_neighbors，
+    否则返回None，表示由cell list根据max_distance自动确定
+    """
+    if params.neighbor_search == "max_neighbors":
+        return params.max_neighbors
+    return None
+
+def neighbor_list(poscar_data, selected_elements, params=None):
+    """
+    计算所选元素原子之间截断距离内的几何近邻列表；设置了params.cache_dir时优先从磁盘缓存读取
     
-    # 考虑周期性边界条件下的相邻格点
-    for R in Rlist:
-        
-        # 计算考虑周期性的距离（分数坐标）
-        diff = coord2 + R - coord1
-        
-        # 转换为笛卡尔坐标
-        cart_diff = np.dot(diff, poscar_data["lattice"])
+    参数:
+        poscar_data (dict): 通过read_poscar函数读取的结构数据字典
+        selected_elements (list): 需要计算耦合的元素列表
+        params (Parameters): 参数实例，如果为None则使用default_parameters()
         
-        # 计算笛卡尔坐标下的距离
-        distance = np.linalg.norm(cart_diff)
+    返回:
+        tuple: (atom1, atom2, R, distance)，所有 i <= j 原子对，原子索引对应poscar_data中的原子
+    """
+    if params is None:
+        params = default_parameters()
 
-        if (distance > params.maxdistance) or (distance < params.mindist):
-            # 超过最大距离 或者 小于最小距离则跳过，防止出现跃迁到自身的情形
-            # print(f"{coord1} to {coord2} distance: {distance} is out of range, skip")
-            continue
-        
-        # 计算耦合强度
-        coupling = hopping_strength(distance)
-        
-        # 存储结果
-        coupling_values.append(coupling_sign * coupling)
-        distance_values.append(distance)
-        R_vectors.append(R)
+    cache = None
+    if params.cache_dir:
+        cache = NeighborCache(params.cache_dir, params.cache_max_mb * 2**20)
+        key = cache.make_key(poscar_data, selected_elements, params.dimk, params.mindist,
+                             params.maxdistance, search_range(params))
+        cached = cache.load(key)
+        if cached is not None:
+            return cached
+
+    # 获取指定元素类型的原子索引
+    all_atom_indices = np.array([i for i, element in enumerate(poscar_data["atom_symbols"]) if element in selected_elements], dtype=int)
+
+    # 一次性计算所有 i <= j 原子对在截断距离内的距离
+    atom1, atom2, R_vectors, distance_values = neighbor_pairs(
+        poscar_data["coordinates"][all_atom_indices], poscar_data["lattice"], params.dimk,
+        params.mindist, params.maxdistance, max_neighbors=search_range(params))
+    neighbors = (all_atom_indices[atom1], all_atom_indices[atom2], R_vectors, distance_values)
+
+    if cache is not None:
+        cache.store(key, neighbors, len(poscar_data["atom_symbols"]))
+    return neighbors
+
+def calculate_hopping_table(poscar_data, selected_elements, params=None):
+    """
+    计算所选元素原子之间的所有跃迁，结果保存为跃迁表
     
-    return coupling_values, R_vectors, distance_values
+    参数:
+        poscar_data (dict): 通过read_poscar函数读取的结构数据字典
+        selected_elements (list): 需要计算耦合的元素列表，如["Mn", "O"]
+        params (Parameters): 参数实例，如果为None则使用default_parameters()
+        
+    返回:
+        HoppingTable: 所有 i <= j 原子对的跃迁，按 (i, j, R) 排序，尚未去除共轭重复
+    """
+    if params is None:
+        params = default_parameters()
 
-def calculate_all_couplings(poscar_data, selected_elements, t0=1.0, max_neighbors=1, t0_distance=None, max_distance=10):
+    atom1, atom2, R_vectors, distance_values = neighbor_list(poscar_data, selected_elements, params)
+
+    # 对整个数组计算耦合强度
+    coupling_values = coupling_signs(poscar_data["atom_symbols"], atom1, atom2, params) \
+        * hopping_strength(distance_values, params)
+    return HoppingTable.from_arrays(atom1, atom2, R_vectors, coupling_values, distance_values)
+
+def calculate_all_couplings(poscar_data, selected_elements, t0=1.0, max_neighbors=1, t0_distance=None, max_distance=10, params=None):
     """
     计算两种原子类型之间的所有跃迁强度和向量
     
@@ -152,6 +212,7 @@ def calculate_all_couplings(poscar_data, selected_elements, t0=1.0, max_neighbor
         t0 (float): 基准跃迁强度，默认为1.0
         max_neighbors (int): 考虑的最大邻居格点数，默认为1
         t0_distances (dict): 原子对的参考距离字典，格式为{(元素1, 元素2): 距离}
+        params (Parameters): 参数实例，如果为None则使用default_parameters()
         
     返回:
         list: 包含所有耦合信息的列表，每个元素为一个字典，包含:
@@ -162,43 +223,34 @@ def calculate_all_couplings(poscar_data, selected_elements, t0=1.0, max_neighbor
             - coupling_values: 耦合强度数组
             - R_vectors: 格矢量数组
     """
+    if params is None:
+        params = default_parameters()
+
     # 获取指定元素类型的原子索引
-    all_atom_indices = [i for i, element in enumerate(poscar_data["atom_symbols"]) if element in selected_elements]
-    # print(atom_indices1, atom_indices2)
-    
+    all_atom_indices = np.array([i for i, element in enumerate(poscar_data["atom_symbols"]) if element in selected_elements], dtype=int)
+    n_atoms = len(all_atom_indices)
+
+    table = calculate_hopping_table(poscar_data, selected_elements, params)
+    atom1, atom2 = table.i, table.j
+    coupling_values, distance_values, R_vectors = table.t, table.d, table.R.astype(int)
+
+    # 按原子对分组，结果已按 (i, j) 排序
+    pair_ids = np.searchsorted(all_atom_indices, atom1) * n_atoms + np.searchsorted(all_atom_indices, atom2)
+    bounds = np.searchsorted(pair_ids, np.arange(n_atoms * n_atoms + 1))
+
     # 存储所有耦合信息
     all_couplings = []
-
-    n_atoms = len(all_atom_indices)
-    
-    # 计算所有可能的原子对之间的耦合
     for i in range(n_atoms):
         for j in range(i, n_atoms):
-            atom1_index = all_atom_indices[i]
-            atom2_index = all_atom_indices[j]
-            # 跳过相同原子的情况
-            # 这里有很大问题，如果是比较远的跃迁，是可以跃迁到自身的
-            # if atom1_index == atom2_index:
-            #     continue
-                
-            # 计算耦合强度和格矢量
-            coupling_values, R_vectors, distance_values = get_coupling_strength(
-                atom1_index, 
-                atom2_index, 
-                poscar_data
-            )
-            
-            # 存储结果
-            coupling_info = {
-                "atom1_index": atom1_index,
-                "atom2_index": atom2_index,
+            lo, hi = bounds[i * n_atoms + j], bounds[i * n_atoms + j + 1]
+            all_couplings.append({
+                "atom1_index": int(all_atom_indices[i]),
+                "atom2_index": int(all_atom_indices[j]),
                 "elements": selected_elements,
-                "coupling_values": coupling_values,
-                "distance_values": distance_values,
-                "R_vectors": R_vectors
-            }
-            
-            all_couplings.append(coupling_info)
+                "coupling_values": list(coupling_values[lo:hi]),
+                "distance_values": list(distance_values[lo:hi]),
+                "R_vectors": list(R_vectors[lo:hi])
+            })
     
     return all_couplings
 
@@ -217,58 +269,150 @@ def save_hop_to_pythtb(couplings, filename=None):
 
 def remove_duplicate_hoppings(couplings):
     """
-    消除重复的跃迁对，如果两个跃迁的原子对和R矢量相同或仅相差负号，则认为是重复的跃迁
+    消除重复的跃迁对：跃迁 (i, j, R) 与其共轭 (j, i, -R) 是同一个跃迁，只保留第一次出现的
     
     参数:
         couplings (list): 跃迁信息列表
         
     返回:
-        list: 去除重复后的跃迁信息列表
+        list: 去除重复后的跃迁信息列表，每个元素只包含一个跃迁
+    """
+    elements = couplings[0]['elements'] if couplings else None
+    return HoppingTable.from_couplings(couplings).deduplicate().to_couplings(elements)
+
+def onsite_terms(params, norb):
     """
-    unique_hoppings = []
-    seen_hoppings = set()
+    计算每个轨道的在位项，与create_pythtb_model中set_onsite的结果一致
     
-    for hop in couplings:
-        for t, R, d in zip(hop['coupling_values'], hop['R_vectors'], hop['distance_values']):
-            # 创建标准化的跃迁标识符
-            # 确保原子索引较小的在前面
-            if hop['atom1_index'] <= hop['atom2_index']:
-                atom_pair = (hop['atom1_index'], hop['atom2_index'])
-                R_vec = tuple(R)
-            else:
-                atom_pair = (hop['atom2_index'], hop['atom1_index'])
-                R_vec = tuple(-r for r in R)
-                
-            hopping_id = (atom_pair, R_vec)
-            neg_hopping_id = (atom_pair, tuple(-r for r in R_vec))
-            
-            # 如果这个跃迁或其反向跃迁都没见过，则添加
-            if hopping_id not in seen_hoppings and neg_hopping_id not in seen_hoppings:
-                seen_hoppings.add(hopping_id)
-                new_hop = {
-                    "atom1_index": hop['atom1_index'],
-                    "atom2_index": hop['atom2_index'],
-                    "elements": hop['elements'],
-                    "coupling_values": [t],
-                    "distance_values": [d],
-                    "R_vectors": [list(R)]
-                }
-                unique_hoppings.append(new_hop)
-    return unique_hoppings
+    参数:
+        params (Parameters): 参数实例
+        norb (int): 轨道数
+        
+    返回:
+        numpy.ndarray: nspin=2时形状为 (norb, 2, 2)，为 (磁矩 + 在位能) * sigma_z；nspin=1时为 (norb,) 的在位能
+    """
+    if params.nspin == 1:
+        onsite = np.zeros(norb)
+        onsite[:len(params.onsite_energy)] = params.onsite_energy
+        return onsite
+    onsite = np.zeros((norb, 2, 2))
+    maglist = params.get_maglist()
+    for ind in range(len(maglist)):
+        onsite[ind] += maglist[ind]*params.sigma_z
+    for ind in range(len(params.onsite_energy)):
+        onsite[ind] += params.onsite_energy[ind]*params.sigma_z
+    return onsite
+
+@profiled()
+def create_bloch_hamiltonian(params=None):
+    """
+    根据POSCAR文件直接创建数组形式的紧束缚模型，跃迁和在位能与create_pythtb_model相同
+    
+    参数:
+        params (Parameters): 参数实例，如果为None则使用default_parameters()
+
+    返回:
+        BlochHamiltonian: 数组形式的紧束缚模型
+    """
+    if params is None:
+        params = default_parameters()
+
+    with span("read_poscar") as counts:
+        poscar_data = read_poscar(params.poscar, selected_elements=params.use_elements)
+        counts["atoms"] = poscar_data["total_atoms"]
+    lattice = poscar_data['lattice']/params.a0
+    coords = poscar_data['coordinates']
+
+    with span("hopping_table") as counts:
+        table = calculate_hopping_table(poscar_data, params.use_elements, params).deduplicate()
+        counts["hoppings"] = len(table)
+
+    if params.is_print_tb_model_hop:
+        for t, i, j, R, d in zip(table.t, table.i, table.j, table.R, table.d):
+            print(f"model.set_hop({t}, {i}, {j}, [{R[0]}, {R[1]}, {R[2]}]) # distance: {d}")
+
+    with span("assemble", orbitals=len(coords), hoppings=len(table)):
+        return BlochHamiltonian.from_hopping_table(table, lattice, coords, onsite_terms(params, len(coords)),
+                                                   params.dimk, params.nspin)
+
+def band_solver(model, params):
+    """
+    根据params.solver返回用于求解能带的模型，pythtb模型和BlochHamiltonian可以互相转换
+    
+    参数:
+        model (pythtb.tb_model or BlochHamiltonian): 紧束缚模型
+        params (Parameters): 参数实例
+        
+    返回:
+        具有k_path和solve_all方法的模型
+    """
+    if params.solver == "pythtb":
+        return model.to_pythtb() if isinstance(model, BlochHamiltonian) else model
+    return model if isinstance(model, BlochHamiltonian) else BlochHamiltonian.from_pythtb(model)
+
+def sparse_settings(params):
+    """
+    返回稀疏求解的 (sparse_nev, sigma)：solver不是"sparse"时为 (None, 0.0)，
+    未设置sparse_target_energy时目标能量取ylim的中点
+    """
+    if params.solver != "sparse":
+        return None, 0.0
+    sigma = params.sparse_target_energy
+    if sigma is None:
+        sigma = 0.5 * (params.ylim[0] + params.ylim[1])
+    return params.sparse_num_bands, sigma
 
+def solve_bands(solver, k_vec, params, eig_vectors=False):
+    """
+    按params.solver求解k点上的能带
+    
+    参数:
+        solver: band_solver返回的模型
+        k_vec (numpy.ndarray): k点的分数坐标
+        params (Parameters): 参数实例
+        eig_vectors (bool): 是否返回本征矢量
+        
+    返回:
+        与pythtb的solve_all相同；solver为"sparse"时只包含目标能量附近的sparse_num_bands条能带
+    """
+    if params.solver == "pythtb":
+        return solver.solve_all(k_vec, eig_vectors=eig_vectors)
+    sparse_nev, sigma = sparse_settings(params)
+    # workers为1时在当前进程中串行求解
+    return solve_parallel(solver, k_vec, params.workers, eig_vectors=eig_vectors,
+                          sparse_nev=sparse_nev, sigma=sigma)
+
+def solve_spin_bands(solver, k_vec, params):
+    """
+    对自旋分块对角的模型分别求解两个自旋块，本征值带有自旋标记
+
+    参数:
+        solver (BlochHamiltonian): spin_diagonal为True的模型
+        k_vec (numpy.ndarray): k点的分数坐标
+        params (Parameters): 参数实例
+
+    返回:
+        tuple: (evals, spin)，形状均为 (nband, nk)，spin为+1（向上）或-1（向下）
+    """
+    sparse_nev, sigma = sparse_settings(params)
+    evals = [solve_parallel(block, k_vec, params.workers, sparse_nev=sparse_nev, sigma=sigma)
+             for block in solver.spin_blocks()]
+    return merge_spin_blocks(evals, None, sparse_nev, sigma)
+
+@profiled()
 def create_pythtb_model(params=None):
     """
     根据POSCAR文件创建pythtb模型
     
     参数:
         poscar_filename (str): POSCAR文件路径
-        params (Parameters): 参数实例，如果为None则使用全局params
+        params (Parameters): 参数实例，如果为None则使用default_parameters()
 
     返回:
         pythtb.tb_model: 创建的紧束缚模型
     """
     if params is None:
-        params = globals()['params']
+        params = default_parameters()
         
     try:
         from pythtb import tb_model
@@ -277,7 +421,9 @@ def create_pythtb_model(params=None):
     # print(nspin)
     
     # 读取POSCAR文件
-    poscar_data = read_poscar(params.poscar, selected_elements=params.use_elements)
+    with span("read_poscar") as counts:
+        poscar_data = read_poscar(params.poscar, selected_elements=params.use_elements)
+        counts["atoms"] = poscar_data["total_atoms"]
     # print("total_atoms:", len(poscar_data["coords"]))
     
     # 提取晶格向量
@@ -290,90 +436,99 @@ def create_pythtb_model(params=None):
     # 3维模型，1个轨道/原子，晶格向量，原子坐标
     model = tb_model(params.dimk, params.dimr, lattice, coords, nspin=params.nspin)
     
-    # 计算所有指定元素对之间的耦合
-    all_couplings = []
-    all_couplings = calculate_all_couplings(
-        poscar_data, 
-        params.use_elements
-    )
-    # all_couplings.extend(couplings)
-    # print(all_couplings)
-    all_couplings = remove_duplicate_hoppings(all_couplings)
-    # print(all_couplings)
-    
-    # 初始化在位能
-    for ind in range(len(params.onsite_energy)):
-        model.set_onsite(0, ind)
-    # 设置磁性
-    maglist = params.get_maglist()
-    for ind in range(len(maglist)):
-        model.set_onsite(maglist[ind]*params.sigma_z, ind, "add")
-    # 加上在位能
-    for ind in range(len(params.onsite_energy)):
-        model.set_onsite(params.onsite_energy[ind]*params.sigma_z, ind, "add")
+    # 计算所有指定元素对之间的耦合，并去除共轭重复的跃迁
+    with span("hopping_table") as counts:
+        table = calculate_hopping_table(poscar_data, params.use_elements, params).deduplicate()
+        counts["hoppings"] = len(table)
+    
+    with span("set_onsite", orbitals=len(coords)):
+        # 初始化在位能
+        for ind in range(len(params.onsite_energy)):
+            model.set_onsite(0, ind)
+        # 设置磁性
+        maglist = params.get_maglist()
+        for ind in range(len(maglist)):
+            model.set_onsite(maglist[ind]*params.sigma_z, ind, "add")
+        # 加上在位能
+        for ind in range(len(params.onsite_energy)):
+            model.set_onsite(params.onsite_energy[ind]*params.sigma_z, ind, "add")
     
     # 设置跃迁参数
-    for hop in all_couplings:
-        for t, R, d in zip(hop['coupling_values'], hop['R_vectors'], hop['distance_values']):
-            model.set_hop(t, hop['atom1_index'], hop['atom2_index'], [int(R[0]), int(R[1]), int(R[2])], allow_conjugate_pair=True)
-            if params.is_print_tb_model_hop:
-                print(f"model.set_hop({t}, {hop['atom1_index']}, {hop['atom2_index']}, [{R[0]}, {R[1]}, {R[2]}]) # distance: {d}")
+    with span("set_hop", hoppings=len(table)):
+        table.set_hops(model, verbose=params.is_print_tb_model_hop)
 
     if params.is_print_tb_model:
         model.display()
     
     return model
 
-def adjust_degenerate_bands(evals, evecs, model, energy_threshold=1e-3):
+def spin_polarization(evecs):
+    """
+    计算每个本征态的自旋极化 <σz> = (|ψ↑|² - |ψ↓|²) / (|ψ↑|² + |ψ↓|²)
+    
+    参数:
+        evecs (numpy.ndarray): 能带本征矢量，形状为 (n_bands, n_kpoints, n_orbitals, 2)
+        
+    返回:
+        tuple: (spin, norm)
+            - spin: 自旋极化，形状为 (n_bands, n_kpoints)，模为0的态为0
+            - norm: 本征矢量的模方，形状为 (n_bands, n_kpoints)
+    """
+    weight = np.einsum('bkos,bkos->bks', evecs.conj(), evecs).real
+    norm = weight.sum(axis=-1)
+    spin = np.divide(weight[..., 0] - weight[..., 1], norm, out=np.zeros_like(norm), where=norm > 1e-10)
+    return spin, norm
+
+def degenerate_spin_pairs(evals, spin, norm, energy_threshold=1e-3, spin_tolerance=0.002):
+    """
+    找出能量简并且自旋极化相反的能带对
+    
+    参数:
+        evals (numpy.ndarray): 能带本征值，形状为 (n_bands, n_kpoints)
+        spin (numpy.ndarray): 自旋极化，形状为 (n_bands, n_kpoints)
+        norm (numpy.ndarray): 本征矢量的模方，形状为 (n_bands, n_kpoints)
+        energy_threshold (float): 判断能带简并的能量阈值
+        spin_tolerance (float): |<σz>_1 + <σz>_2| 小于该值时认为自旋投影相反
+        
+    返回:
+        numpy.ndarray: 布尔数组，形状为 (n_bands, n_kpoints)，属于这类能带对的态为True
+    """
+    # 在每个k点上按能量排序，简并的能带只会出现在相邻的若干条之间
+    order = np.argsort(evals, axis=0, kind='stable')
+    energy = np.take_along_axis(evals, order, axis=0)
+    spin = np.take_along_axis(spin, order, axis=0)
+    valid = np.take_along_axis(norm, order, axis=0) > 1e-10
+
+    flagged = np.zeros(evals.shape, dtype=bool)
+    for offset in range(1, evals.shape[0]):
+        close = (energy[offset:] - energy[:-offset]) < energy_threshold
+        if not close.any():
+            break
+        pair = close & valid[offset:] & valid[:-offset] \
+            & (np.abs(spin[offset:] + spin[:-offset]) < spin_tolerance)
+        flagged[offset:] |= pair
+        flagged[:-offset] |= pair
+
+    mask = np.zeros(evals.shape, dtype=bool)
+    np.put_along_axis(mask, order, flagged, axis=0)
+    return mask
+
+def adjust_degenerate_bands(evals, evecs, model=None, energy_threshold=1e-3):
     """
     修改简并能带的自旋投影。如果找到简并的能带且自旋投影相反，则将其投影设为0。
     
     参数:
         evals (numpy.ndarray): 能带本征值，形状为 (n_bands, n_kpoints)
         evecs (numpy.ndarray): 能带本征矢量，形状为 (n_bands, n_kpoints, n_orbitals, 2)
-        model (pythtb.tb_model): 紧束缚模型
+        model: 紧束缚模型，保留该参数以兼容旧的调用方式
         energy_threshold (float): 判断能带简并的能量阈值
         
     返回:
-        numpy.ndarray: 修改后的本征矢量
+        tuple: (evals, 修改后的本征矢量)
     """
-    n_bands, n_kpoints = evals.shape
-    modified_evecs = deepcopy(evecs)
-    
-    # 遍历每个k点
-    for k in range(n_kpoints):
-        # 遍历每个能带
-        for band1 in range(n_bands):
-            for band2 in range(band1 + 1, n_bands):
-                # 检查能带是否简并
-                if abs(evals[band1, k] - evals[band2, k]) < energy_threshold:
-                    # 计算两个能带的自旋投影
-                    spin_up1, spin_down1 = 0.0, 0.0
-                    spin_up2, spin_down2 = 0.0, 0.0
-                    
-                    for orb in range(model._norb):
-                        spin_up1 += abs(evecs[band1, k, orb, 0])**2
-                        spin_down1 += abs(evecs[band1, k, orb, 1])**2
-                        spin_up2 += abs(evecs[band2, k, orb, 0])**2
-                        spin_down2 += abs(evecs[band2, k, orb, 1])**2
-                    
-                    total1 = spin_up1 + spin_down1
-                    total2 = spin_up2 + spin_down2
-                    
-                    if total1 > 1e-10 and total2 > 1e-10:
-                        spin_up1 /= total1
-                        spin_down1 /= total1
-                        spin_up2 /= total2
-                        spin_down2 /= total2
-                        
-                        # 检查自旋投影是否相反
-                        if (abs(spin_up1 - spin_down2) < 0.001 and 
-                            abs(spin_down1 - spin_up2) < 0.001):
-                            # 将两个能带的自旋投影都设为0
-                            for orb in range(model._norb):
-                                modified_evecs[band1, k, orb] = 0
-                                modified_evecs[band2, k, orb] = 0
-    
+    spin, norm = spin_polarization(evecs)
+    mask = degenerate_spin_pairs(evals, spin, norm, energy_threshold)
+    modified_evecs = np.where(mask[:, :, None, None], 0, evecs)
     return evals, modified_evecs
 
 def check_flat_bands(evals, threshold=0.05, min_points=10):
@@ -392,85 +547,246 @@ def check_flat_bands(evals, threshold=0.05, min_points=10):
             - std_energy: 平带区域的能量标准差
             - k_range: 平带区域的k点范围 [start_k, end_k]
     """
-    flat_bands = []
+    evals = np.asarray(evals, dtype=float)
     n_bands, n_kpoints = evals.shape
-    
-    # 遍历每个能带
-    for band in range(n_bands):
-        # 寻找连续的平带区域
-        start_k = 0
-        while start_k < n_kpoints:
-            # 找到一段可能的平带区域
-            end_k = start_k + 1
-            while end_k < n_kpoints:
-                # 计算这段区域内能量的标准差
-                band_segment = evals[band, start_k:end_k+1]
-                std_energy = np.std(band_segment)
-                
-                # 如果标准差超过阈值，说明不是平带
-                if std_energy > threshold:
-                    break
-                end_k += 1
-            
-            # 如果找到足够长的平带区域
-            if end_k - start_k >= min_points:
-                band_segment = evals[band, start_k:end_k]
-                flat_bands.append({
-                    'band_index': band,
-                    'avg_energy': np.mean(band_segment),
-                    'std_energy': np.std(band_segment),
-                    'k_range': [start_k, end_k]
-                })
-            
-            # 从当前平带区域结束位置继续搜索
-            start_k = end_k
+    if n_kpoints == 0:
+        return []
+
+    # 累积和计算任意区间 [start, end] 的方差，先减去每条能带的平均值以减小舍入误差
+    shifted = evals - evals.mean(axis=1, keepdims=True)
+    zeros = np.zeros((n_bands, 1))
+    csum = np.concatenate([zeros, np.cumsum(shifted, axis=1)], axis=1)
+    csq = np.concatenate([zeros, np.cumsum(shifted**2, axis=1)], axis=1)
+
+    # 所有能带同时向后扫描：区间标准差超过阈值时，该区间结束，从当前k点重新开始
+    bands = np.arange(n_bands)
+    start = np.zeros(n_bands, dtype=int)
+    segments = []
+    for end_k in range(1, n_kpoints):
+        count = end_k - start + 1
+        mean = (csum[:, end_k+1] - csum[bands, start]) / count
+        var = (csq[:, end_k+1] - csq[bands, start]) / count - mean**2
+        broken = np.sqrt(np.maximum(var, 0)) > threshold
+        if broken.any():
+            segments.extend((band, start[band], end_k) for band in np.flatnonzero(broken))
+            start[broken] = end_k
+    segments.extend((band, start[band], n_kpoints) for band in bands)
+
+    flat_bands = []
+    for band, start_k, end_k in sorted(segments):
+        # 如果找到足够长的平带区域
+        if end_k - start_k >= min_points:
+            band_segment = evals[band, start_k:end_k]
+            flat_bands.append({
+                'band_index': int(band),
+                'avg_energy': np.mean(band_segment),
+                'std_energy': np.std(band_segment),
+                'k_range': [int(start_k), int(end_k)]
+            })
             
     return flat_bands
 
+def _connected_components(mask, periodic=True):
+    """
+    布尔网格上相邻（沿网格方向）的True点组成的连通区域，用并查集（最小编号为根，路径压缩）向量化求解
 
+    参数:
+        mask (numpy.ndarray): 布尔网格
+        periodic (bool): 网格是否在边界上周期相连
+
+    返回:
+        numpy.ndarray: 与mask形状相同，每个True点为所在区域的最小平铺索引，False点为-1
+    """
+    index = np.arange(mask.size).reshape(mask.shape)
+    src, dst = [], []
+    for axis in range(mask.ndim):
+        both = mask & np.roll(mask, -1, axis=axis)
+        if not periodic:
+            edge = [slice(None)] * mask.ndim
+            edge[axis] = -1
+            both[tuple(edge)] = False
+        src.append(index[both])
+        dst.append(np.roll(index, -1, axis=axis)[both])
+    src, dst = np.concatenate(src), np.concatenate(dst)
+
+    parent = np.arange(mask.size)
+    while True:
+        a, b = parent[src], parent[dst]
+        differ = a != b
+        if not differ.any():
+            break
+        # 把较大的根挂到较小的根上，再压缩路径直到每个点都直接指向根
+        np.minimum.at(parent, np.maximum(a[differ], b[differ]), np.minimum(a[differ], b[differ]))
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+    return np.where(mask, parent.reshape(mask.shape), -1)
 
+def find_flat_regions(evals, threshold=0.05, min_points=10, periodic=True, max_iter=20):
+    """
+    在二维或三维k点网格上寻找平带区域：从局部最平的k点出发，把与区域平均能量相差小于阈值的相连k点并入区域，
+    并用新的平均能量重新生长直到区域不变。区域内每个k点都与平均能量相差小于阈值，平台通过光滑的斜坡与色散部分
+    相连时也不会被并入色散部分。k点数不少于min_points、且至少3/4的k点与平均能量相差小于threshold/2的区域认为是平带
+
+    参数:
+        evals (numpy.ndarray): 网格上的能带本征值，形状为 (n_bands, n1, n2) 或 (n_bands, n1, n2, n3)
+        threshold (float): 判断平带的能量波动阈值，默认为0.05 eV
+        min_points (int): 平带区域的最小k点数，默认为10
+        periodic (bool): 网格是否在边界上周期相连（覆盖整个布里渊区时为True）
+        max_iter (int): 每个区域按平均能量重新生长的最大次数
+
+    返回:
+        list: 包含平带信息的字典列表，键与check_flat_bands相同，其中:
+            - k_range: 每个网格方向上区域的范围 [[start, end], ...]
+            - k_indices: 区域内k点的网格索引，形状为 (n_points, ndim)
+    """
+    evals = np.asarray(evals, dtype=float)
+    mesh = evals.shape[1:]
+
+    flat_bands = []
+    for band, energy in enumerate(evals):
+        # 每个k点与相邻k点的最大能量差，越小越适合作为区域的起点
+        variation = np.zeros(mesh)
+        for axis in range(energy.ndim):
+            for step in (1, -1):
+                diff = np.abs(energy - np.roll(energy, step, axis=axis))
+                if not periodic:
+                    edge = [slice(None)] * energy.ndim
+                    edge[axis] = 0 if step == 1 else -1
+                    diff[tuple(edge)] = 0
+                variation = np.maximum(variation, diff)
+
+        # free: 还没有划入平带区域的k点；seeds: 还可以作为起点的k点（不是平带的区域不再作为起点，但可以被其他区域并入）
+        free = np.ones(mesh, dtype=bool)
+        seeds = variation < threshold
+        while seeds.any():
+            candidates = np.where(seeds, variation, np.inf)
+            seed = np.unravel_index(np.argmin(candidates), mesh)
+            center = energy[seed]
+            region = np.zeros(mesh, dtype=bool)
+            region[seed] = True
+            for _ in range(max_iter):
+                labels = _connected_components(free & (np.abs(energy - center) < threshold), periodic)
+                if labels[seed] < 0:
+                    break
+                grown = labels == labels[seed]
+                if np.array_equal(grown, region):
+                    break
+                region = grown
+                center = energy[region].mean()
+            seeds &= ~region
+            if region.sum() < min_points:
+                continue
+            indices = np.argwhere(region)
+            energies = energy[region]
+            # 色散能带上也能长出 |E - 平均| < threshold 的等能带状区域，其能量均匀分布在整个窗口内；
+            # 平台的能量集中在平均值附近，要求大部分k点落在一半的窗口内
+            if np.mean(np.abs(energies - energies.mean()) < threshold / 2) < 0.75:
+                continue
+            free &= ~region
+            flat_bands.append({
+                'band_index': band,
+                'avg_energy': np.mean(energies),
+                'std_energy': np.std(energies),
+                'k_range': [[int(lo), int(hi) + 1] for lo, hi in zip(indices.min(axis=0), indices.max(axis=0))],
+                'k_indices': indices
+            })
+    flat_bands.sort(key=lambda region: (region['band_index'], tuple(region['k_indices'][0])))
+    return flat_bands
+
+@profiled()
 def calculate_band_structure(model, params=None):
     """
-    计算能带结构并绘图
+    计算能带结构，按band_data_format保存能带数据，is_plot_bands为True时绘图
     
     参数:
-        model (pythtb.tb_model): 紧束缚模型
-        params (Parameters): 参数实例，如果为None则使用全局params
+        model (pythtb.tb_model or BlochHamiltonian): 紧束缚模型
+        params (Parameters): 参数实例，如果为None则使用default_parameters()
+
+    返回:
+        dict: k_vec, k_dist, k_node, evals；分析简并能带时还有每个态的自旋投影spin和简并能带对的布尔数组degenerate，否则为None
     """
     if params is None:
-        params = globals()['params']
+        params = default_parameters()
         
     # 计算能带
-    (k_vec, k_dist, k_node) = model.k_path(params.kpath, params.num_k_points)
-    evals = model.solve_all(k_vec)
-    
-    # 调整简并能带
-    if params.is_black_degenerate_bands:
-        evecs = model.solve_all(k_vec, eig_vectors=True)
-        evecs = adjust_degenerate_bands(evals, evecs, model, params.energy_threshold)
-    
-    # 绘图
-    fig, ax = plt.subplots(figsize=(10, 6))
-    
-    # 绘制能带
-    for band in range(evals.shape[0]):
-        ax.plot(k_dist, evals[band], 'b-', linewidth=1.0)
-    
-    # 设置x轴刻度
-    ax.set_xticks(k_node)
-    ax.set_xticklabels(params.klabel)
-    
-    # 添加垂直线
-    for node in k_node:
-        ax.axvline(x=node, linewidth=0.5, color='k')
-    
-    # 设置标签
-    ax.set_xlabel('k-path')
-    ax.set_ylabel('Energy (eV)')
-    
-    # 保存图片
-    plt.savefig(f"{params.output_filename}.{params.output_format}")
-    plt.close()
+    with span("k_path"):
+        solver = band_solver(model, params)
+        (k_vec, k_dist, k_node) = solver.k_path(params.kpath, params.num_k_points)
+    degenerate = params.is_black_degenerate_bands and params.nspin == 2
+    store = None
+    spin = degenerate_mask = None
+    evecs = None
+    with span("diagonalize", solver=params.solver, workers=params.workers) as counts:
+        if params.adaptive_kpath:
+            # 以num_k_points个点的均匀路径为起点，只在能带弯曲、近简并或顺序改变的区间加点
+            k_vec, k_dist, evals, evecs = adaptive_k_path(
+                lambda k: solve_bands(solver, k, params, eig_vectors=True), params.kpath, k_vec, k_dist, k_node,
+                params.adaptive_tolerance, params.adaptive_resolution, params.energy_threshold)
+            if params.store_dir:
+                metadata = {"k_dist": k_dist.tolist(), "k_node": np.asarray(k_node).tolist(),
+                            "klabel": list(params.klabel), "params": parameters_metadata(params)}
+                store = BandStore.create(params.store_dir, k_vec, evals.shape[0],
+                                         evecs.shape[2:] if degenerate else None, metadata)
+                store.write(0, evals, evecs)
+                store.finalize()
+                store = BandStore(params.store_dir)
+        elif params.store_dir:
+            # 结果分块写入内存映射文件，之后的分析按块读取
+            if not isinstance(solver, BlochHamiltonian):
+                solver = BlochHamiltonian.from_pythtb(solver)
+            sparse_nev, sigma = sparse_settings(params)
+            metadata = {"k_dist": np.asarray(k_dist).tolist(), "k_node": np.asarray(k_node).tolist(),
+                        "klabel": list(params.klabel), "params": parameters_metadata(params)}
+            store = solve_to_store(solver, k_vec, params.store_dir, eig_vectors=degenerate, workers=params.workers,
+                                   sparse_nev=sparse_nev, sigma=sigma, metadata=metadata)
+            evals = store.evals
+        # 共线磁性模型按自旋分块求解，本征值直接带有自旋标记，不需要本征矢量
+        elif degenerate and isinstance(solver, BlochHamiltonian) and solver.spin_diagonal:
+            evals, spin = solve_spin_bands(solver, k_vec, params)
+        # 需要分析简并能带时一次求出本征值和本征矢量，只保留自旋投影用于着色
+        elif degenerate:
+            evals, evecs = solve_bands(solver, k_vec, params, eig_vectors=True)
+        else:
+            evals = solve_bands(solver, k_vec, params)
+        counts.update(k_points=len(k_vec), bands=np.shape(evals)[0])
+
+    # 分析简并能带：自旋投影相反的简并能带对在图中为黑色
+    if degenerate:
+        with span("degenerate_bands"):
+            if evecs is not None:
+                spin, norm = spin_polarization(evecs)
+            elif store is not None:
+                spin, _ = store.spin_polarization()
+            if store is not None:
+                degenerate_mask = store.degenerate_mask(params.energy_threshold)
+            elif evecs is not None:
+                degenerate_mask = degenerate_spin_pairs(evals, spin, norm, params.energy_threshold)
+            else:
+                degenerate_mask = degenerate_spin_pairs(evals, spin, np.ones_like(evals), params.energy_threshold)
+    evecs = None
+
+    # 检查平带
+    if params.is_check_flat_bands:
+        with span("flat_bands"):
+            for flat in (store.flat_bands() if store is not None else check_flat_bands(evals)):
+                print(f"平带: 能带 {flat['band_index']}, 平均能量 {flat['avg_energy']:.4f} eV, "
+                      f"标准差 {flat['std_energy']:.4f} eV, k点范围 {flat['k_range']}")
+    
+    # 输出数据和图片，绘图与计算分开，批量计算时可以只保存数据
+    if params.band_data_format:
+        with span("save_data"):
+            save_band_data(f"{params.output_filename}.{params.band_data_format}", k_dist, evals, k_node,
+                           params.klabel, spin)
+    if params.is_plot_bands:
+        with span("plot"):
+            plot_bands(f"{params.output_filename}.{params.output_format}", k_dist, evals, k_node, params.klabel,
+                       spin, degenerate_mask)
+
+    return {"k_vec": k_vec, "k_dist": k_dist, "k_node": k_node, "evals": evals,
+            "spin": spin, "degenerate": degenerate_mask}
 
 def run_band_calculation(poscar_filename):
     """
@@ -482,5 +798,12 @@ def run_band_calculation(poscar_filename):
     model = create_pythtb_model(poscar_filename=poscar_filename)
     calculate_band_structure(model=model)
 
+def __getattr__(name):
+    # 兼容旧代码中的 tight_binding_model.params
+    if name == "params":
+        return default_parameters()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 if __name__ == "__main__":
+    params = default_parameters()
     run_band_calculation(poscar_filename=os.path.join(params.savedir, params.output_filename)) 
\ No newline at end of file
@@ -29,6 +29,9 @@ setup(
         "pythtb>=1.7.2",
     ],
     extras_require={
+        "sparse": [
+            "scipy>=1.5.0",
+        ],
         "dev": [
             "pytest>=6.0",
             "pytest-cov>=2.0",
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from pyamtb.parameters import Parameters
+from pyamtb.hamiltonian import BlochHamiltonian
+
+MN2N_POSCAR = """Mn2N
+5
+1 0 0
+0 1 0
+0 0 5
+Mn N
+2  1
+Direct
+0.5 0 0.5
+0 0.5 0.5
+0 0  0.5
+"""
+
+
+@pytest.fixture
+def mn2n_poscar(tmp_path):
+    """Write the bundled Mn2N structure to a temporary POSCAR file"""
+    path = tmp_path / "Mn2N.vasp"
+    path.write_text(MN2N_POSCAR)
+    return str(path)
+
+
+@pytest.fixture
+def mn2n_params(mn2n_poscar, tmp_path):
+    """Default parameters pointing at the Mn2N structure, with printing disabled"""
+    params = Parameters()
+    params.poscar = mn2n_poscar
+    params.t0_distance = 2.5
+    params.max_neighbors = 2
+    params.onsite_energy = [0.5, 0.5, 0.7]
+    params.is_print_tb_model = False
+    params.is_print_tb_model_hop = False
+    params.output_filename = str(tmp_path / "model")
+    return params
+
+
+@pytest.fixture
+def random_structure():
+    """A small random two-element structure in a skewed cell"""
+    rng = np.random.default_rng(0)
+    n_atoms = 12
+    return {
+        "coordinates": rng.random((n_atoms, 3)),
+        "lattice": np.diag([2.0, 2.5, 3.0]) + 0.3 * rng.random((3, 3)),
+        "atom_symbols": ["Mn", "N"] * (n_atoms // 2),
+    }
+
+
+@pytest.fixture
+def random_model():
+    """
+    Factory for random spinful models: random_model(n_orb, n_hop, seed, spin_dependent).
+    By default hoppings are scalars and the onsite terms are sigma_z, so the model is spin diagonal;
+    with spin_dependent=True hoppings are complex 2x2 blocks and the onsite terms have spin off-diagonal parts.
+    """
+    def make(n_orb=30, n_hop=120, seed=0, spin_dependent=False):
+        rng = np.random.default_rng(seed)
+        if spin_dependent:
+            a = rng.normal(size=(n_orb, 2, 2)) + 1j * rng.normal(size=(n_orb, 2, 2))
+            onsite = a + a.conj().transpose(0, 2, 1)
+            hop_t = rng.normal(size=(n_hop, 2, 2)) + 1j * rng.normal(size=(n_hop, 2, 2))
+        else:
+            onsite = rng.normal(size=n_orb)[:, None, None] * np.diag([1.0, -1.0])
+            hop_t = rng.normal(size=n_hop)
+        return BlochHamiltonian(np.eye(2), rng.random((n_orb, 2)), onsite,
+                                rng.integers(0, n_orb, n_hop), rng.integers(0, n_orb, n_hop),
+                                rng.integers(-1, 2, (n_hop, 2)), hop_t, dimk=2, nspin=2)
+    return make
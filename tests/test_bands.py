@@ -0,0 +1,130 @@
+import numpy as np
+from pyamtb.tight_binding_model import (adjust_degenerate_bands, spin_polarization, degenerate_spin_pairs,
+                                        create_bloch_hamiltonian, calculate_band_structure,
+                                        check_flat_bands, find_flat_regions)
+
+
+def reference_adjust_degenerate_bands(evals, evecs, energy_threshold):
+    """The original per-(k, band pair, orbital) loop"""
+    n_bands, n_kpoints = evals.shape
+    modified = evecs.copy()
+    for k in range(n_kpoints):
+        for b1 in range(n_bands):
+            for b2 in range(b1 + 1, n_bands):
+                if abs(evals[b1, k] - evals[b2, k]) < energy_threshold:
+                    up1, down1 = np.sum(np.abs(evecs[b1, k, :, 0]) ** 2), np.sum(np.abs(evecs[b1, k, :, 1]) ** 2)
+                    up2, down2 = np.sum(np.abs(evecs[b2, k, :, 0]) ** 2), np.sum(np.abs(evecs[b2, k, :, 1]) ** 2)
+                    t1, t2 = up1 + down1, up2 + down2
+                    if t1 > 1e-10 and t2 > 1e-10:
+                        if abs(up1 / t1 - down2 / t2) < 0.001 and abs(down1 / t1 - up2 / t2) < 0.001:
+                            modified[b1, k] = 0
+                            modified[b2, k] = 0
+    return evals, modified
+
+
+def test_spin_polarization_of_pure_states():
+    """Fully up, fully down and zero states"""
+    evecs = np.zeros((3, 1, 2, 2), dtype=complex)
+    evecs[0, 0, :, 0] = [0.6, 0.8]
+    evecs[1, 0, 1, 1] = 1.0j
+    spin, norm = spin_polarization(evecs)
+    assert np.allclose(spin[:, 0], [1, -1, 0])
+    assert np.allclose(norm[:, 0], [1, 1, 0])
+
+
+def test_adjust_degenerate_bands_matches_loop():
+    """The vectorized pass zeroes exactly the states the loop zeroes"""
+    rng = np.random.default_rng(0)
+    n_bands, n_k, n_orb = 6, 40, 3
+    evals = np.sort(rng.normal(size=(n_bands, n_k)), axis=0)
+    evecs = rng.normal(size=(n_bands, n_k, n_orb, 2)) + 0j
+    # spin-split partner bands degenerate at every other k-point
+    evecs[1, :, :, 1] = 0
+    evecs[2, :, :, 0] = 0
+    evals[2, ::2] = evals[1, ::2] + 1e-6
+    evals[2:] = np.sort(evals[2:], axis=0)
+    _, expected = reference_adjust_degenerate_bands(evals, evecs, 1e-4)
+    _, result = adjust_degenerate_bands(evals, evecs, energy_threshold=1e-4)
+    assert np.array_equal(result, expected)
+    assert not np.array_equal(result, evecs)
+
+
+def test_degenerate_spin_pairs_ignores_same_spin():
+    """Degenerate bands with the same spin are left alone"""
+    evals = np.array([[0.0], [0.0]])
+    spin, norm = np.array([[1.0], [1.0]]), np.ones((2, 1))
+    assert not degenerate_spin_pairs(evals, spin, norm, 1e-3).any()
+    assert degenerate_spin_pairs(evals, np.array([[1.0], [-1.0]]), norm, 1e-3).all()
+
+
+def test_calculate_band_structure_with_degenerate_analysis(mn2n_params):
+    """The degenerate-band pass runs on a single eigen solve"""
+    mn2n_params.is_black_degenerate_bands = True
+    mn2n_params.energy_threshold = 1e-2
+    calculate_band_structure(create_bloch_hamiltonian(mn2n_params), mn2n_params)
+
+
+def reference_check_flat_bands(evals, threshold=0.05, min_points=10):
+    """The original quadratic scan"""
+    flat_bands = []
+    n_bands, n_kpoints = evals.shape
+    for band in range(n_bands):
+        start_k = 0
+        while start_k < n_kpoints:
+            end_k = start_k + 1
+            while end_k < n_kpoints:
+                if np.std(evals[band, start_k:end_k+1]) > threshold:
+                    break
+                end_k += 1
+            if end_k - start_k >= min_points:
+                segment = evals[band, start_k:end_k]
+                flat_bands.append({'band_index': band, 'avg_energy': np.mean(segment),
+                                   'std_energy': np.std(segment), 'k_range': [start_k, end_k]})
+            start_k = end_k
+    return flat_bands
+
+
+def test_check_flat_bands_matches_quadratic_scan():
+    """Running sums give the same records as recomputing np.std"""
+    rng = np.random.default_rng(0)
+    evals = np.cumsum(rng.normal(scale=0.02, size=(5, 400)), axis=1)
+    evals[2, 100:250] = 0.3 + rng.normal(scale=0.005, size=150)
+    expected = reference_check_flat_bands(evals)
+    result = check_flat_bands(evals)
+    assert len(result) == len(expected) > 0
+    for got, ref in zip(result, expected):
+        assert got['band_index'] == ref['band_index'] and got['k_range'] == ref['k_range']
+        assert np.isclose(got['avg_energy'], ref['avg_energy']) and np.isclose(got['std_energy'], ref['std_energy'])
+
+
+def test_find_flat_regions_on_2d_mesh():
+    """A flat patch on a dispersive band is found as one connected region"""
+    k1, k2 = np.meshgrid(np.linspace(0, 1, 20, endpoint=False), np.linspace(0, 1, 20, endpoint=False), indexing='ij')
+    dispersive = np.cos(2 * np.pi * k1) + np.cos(2 * np.pi * k2)
+    patch = dispersive.copy()
+    patch[5:10, 3:12] = 2.5
+    regions = find_flat_regions(np.stack([dispersive, patch]), threshold=0.05, min_points=10)
+    assert len(regions) == 1
+    assert regions[0]['band_index'] == 1
+    assert regions[0]['k_range'] == [[5, 10], [3, 12]]
+    assert len(regions[0]['k_indices']) == 45
+
+
+def test_find_flat_regions_wraps_periodic_boundary():
+    """A completely flat band is a single region covering the whole mesh"""
+    evals = np.zeros((1, 6, 6, 4))
+    regions = find_flat_regions(evals, min_points=10)
+    assert len(regions) == 1 and len(regions[0]['k_indices']) == 144
+
+
+def test_find_flat_regions_plateau_joined_by_smooth_ramp():
+    """A plateau that rises smoothly into a dispersive part is not chained into it"""
+    x, _ = np.meshgrid(np.linspace(0, 1, 100, endpoint=False), np.arange(100), indexing='ij')
+    ramp = np.where(x < 0.5, 0.0, 0.5 * np.sin(np.pi * (x - 0.5)))
+    regions = find_flat_regions(ramp[None], threshold=0.05, min_points=10, periodic=False)
+    plateau = [region for region in regions if abs(region['avg_energy']) < 0.05]
+    assert len(plateau) == 1
+    assert plateau[0]['k_range'][0][0] == 0 and plateau[0]['k_range'][0][1] >= 50
+    assert plateau[0]['k_range'][1] == [0, 100]
+    # the steep part of the ramp is not reported as a stack of flat strips
+    assert all(region['avg_energy'] < 0.05 or region['avg_energy'] > 0.4 for region in regions)
@@ -0,0 +1,39 @@
+from pathlib import Path
+import numpy as np
+import pytest
+from pyamtb.batch import band_gap, find_structures, run_batch, save_summary, SUMMARY_COLUMNS
+
+
+def test_band_gap():
+    """Gap between the highest state below and the lowest above the Fermi energy, zero for a crossing band"""
+    evals = np.array([[-2.0, -1.0], [0.5, 1.0]])
+    assert band_gap(evals) == pytest.approx(1.5)
+    assert band_gap(evals, fermi_energy=0.7) == 0.0
+    assert np.isnan(band_gap(evals, fermi_energy=5.0))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_isolates_failures(mn2n_params, mn2n_poscar, tmp_path, workers):
+    """A broken structure is reported in its row while the others finish"""
+    poscar = Path(mn2n_poscar).read_text()
+    structures = tmp_path / "structures"
+    structures.mkdir()
+    (structures / "Mn2N.vasp").write_text(poscar)
+    (structures / "Fe2N.vasp").write_text(poscar.replace("Mn N", "Fe N"))
+    (structures / "POSCAR_broken").write_text("broken\n1\n1 0 0\n")
+    (structures / "notes.txt").write_text("not a structure")
+    assert len(find_structures(str(structures))) == 3
+
+    mn2n_params.is_plot_bands = False
+    mn2n_params.band_data_format = "npz"
+    rows = run_batch(str(structures), mn2n_params, str(tmp_path / "out"), workers=workers,
+                     options={"split_mesh": 8, "split_levels": 1})
+    status = {row["name"]: row["status"] for row in rows}
+    assert status == {"Fe2N": "failed (distance)", "Mn2N": "ok", "POSCAR_broken": "failed (distance)"}
+    ok = rows[[row["name"] for row in rows].index("Mn2N")]
+    assert ok["natoms"] == 3 and ok["max_spin_splitting"] > 0 and ok["band_gap"] >= 0
+    assert (tmp_path / "out" / "Mn2N.npz").exists()
+
+    save_summary(rows, tmp_path / "summary.csv")
+    header = (tmp_path / "summary.csv").read_text().splitlines()[0]
+    assert header.split(",") == SUMMARY_COLUMNS
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from pyamtb.berry import berry_curvature, anomalous_hall_conductivity
+from pyamtb.hamiltonian import BlochHamiltonian
+from pyamtb.tight_binding_model import create_bloch_hamiltonian
+
+
+def haldane_model(mass, t2=0.15, nspin=1):
+    """Haldane model on the honeycomb lattice, topological for |mass| < 3*sqrt(3)*t2"""
+    lattice = [[1.0, 0.0], [0.5, np.sqrt(3) / 2]]
+    c = 1j * t2
+    hoppings = [(0, 1, [0, 0], -1.0), (1, 0, [1, 0], -1.0), (1, 0, [0, 1], -1.0),
+                (0, 0, [1, 0], c), (0, 0, [1, -1], c.conjugate()), (0, 0, [0, 1], c.conjugate()),
+                (1, 1, [1, 0], c.conjugate()), (1, 1, [1, -1], c), (1, 1, [0, 1], c)]
+    i, j, R, t = zip(*hoppings)
+    return BlochHamiltonian(lattice, [[1 / 3, 1 / 3], [2 / 3, 2 / 3]], [mass, -mass], i, j, R, np.array(t), 2, nspin)
+
+
+def test_velocity_matches_finite_difference():
+    """Analytic dH/dk agrees with a central difference, also for spin-dependent hoppings"""
+    rng = np.random.default_rng(0)
+    lattice = np.array([[1.0, 0.0], [0.3, 1.2]])
+    hop_t = rng.normal(size=(4, 2, 2)) + 1j * rng.normal(size=(4, 2, 2))
+    spinful = BlochHamiltonian(lattice, rng.random((3, 2)), rng.normal(size=(3, 2, 2)) * [[1, 0], [0, 1]],
+                               [0, 1, 2, 0], [1, 2, 0, 0], [[0, 0], [1, 0], [0, 1], [1, 1]], hop_t, 2, 2)
+    k = rng.random((5, 2))
+    for ham in (haldane_model(0.1), spinful):
+        to_frac = ham.lattice.T / (2 * np.pi)
+        k_cart = k @ np.linalg.inv(to_frac)
+        for alpha in range(2):
+            step = np.zeros(2)
+            step[alpha] = 1e-6
+            numeric = (ham.hamiltonian((k_cart + step) @ to_frac) - ham.hamiltonian((k_cart - step) @ to_frac)) / 2e-6
+            assert np.allclose(ham.velocity(k)[:, alpha], numeric, atol=1e-6)
+
+
+def test_haldane_chern_number():
+    """Chern number -1 in the topological phase and 0 in the trivial one; spin channels add"""
+    assert anomalous_hall_conductivity(haldane_model(0.1), 48)["chern"] == pytest.approx(-1.0, abs=1e-4)
+    assert anomalous_hall_conductivity(haldane_model(1.5), 48)["chern"] == pytest.approx(0.0, abs=1e-4)
+
+    result = anomalous_hall_conductivity(haldane_model(0.1, nspin=2), 48, [0.0, 5.0])
+    assert result["unit"] == "e^2/h"
+    assert np.allclose(result["sigma_up"], [1.0, 0.0], atol=1e-4)
+    assert np.allclose(result["sigma"], result["sigma_up"] + result["sigma_down"])
+
+    evals, omega, spin = berry_curvature(haldane_model(0.1, nspin=2), [[0.1, 0.2]])
+    assert evals.shape == omega.shape == spin.shape == (4, 1)
+    assert np.allclose(omega.sum(axis=0), 0.0)
+
+
+def test_adaptive_refinement():
+    """Refining every cell equals a finer uniform mesh; hot-spot refinement converges near a small gap"""
+    ham = haldane_model(0.76)
+    full = anomalous_hall_conductivity(ham, 12, levels=1, zoom=3, refine_fraction=1.0)
+    assert full["sigma"] == pytest.approx(anomalous_hall_conductivity(ham, 36)["sigma"])
+    assert full["n_evaluated"] == 12 ** 2 + 36 ** 2
+
+    coarse = anomalous_hall_conductivity(ham, 24)
+    adaptive = anomalous_hall_conductivity(ham, 24, levels=3, refine_fraction=0.05)
+    assert abs(adaptive["chern"] + 1) < 0.01 < abs(coarse["chern"] + 1)
+    assert adaptive["n_evaluated"] < 96 ** 2
+
+
+def test_collinear_model_has_no_ahc(mn2n_params):
+    """Without spin-orbit coupling both spin channels of the collinear model vanish"""
+    result = anomalous_hall_conductivity(create_bloch_hamiltonian(mn2n_params), 16, levels=1)
+    assert np.allclose([result["sigma_up"], result["sigma_down"]], 0.0, atol=1e-8)
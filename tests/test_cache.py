@@ -0,0 +1,59 @@
+import os
+import numpy as np
+from pyamtb.cache import NeighborCache
+from pyamtb.read_datas import read_poscar
+from pyamtb.tight_binding_model import neighbor_list
+import pyamtb.tight_binding_model as tbm
+
+
+def test_neighbor_list_is_cached(mn2n_params, tmp_path, monkeypatch):
+    """A second run with the same structure and settings skips the neighbor search"""
+    mn2n_params.cache_dir = str(tmp_path / "cache")
+    poscar_data = read_poscar(mn2n_params.poscar, selected_elements=mn2n_params.use_elements)
+    first = neighbor_list(poscar_data, mn2n_params.use_elements, mn2n_params)
+    assert len(os.listdir(mn2n_params.cache_dir)) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("neighbor search should not run on a cache hit")
+    monkeypatch.setattr(tbm, "neighbor_pairs", fail)
+    second = neighbor_list(poscar_data, mn2n_params.use_elements, mn2n_params)
+    for a, b in zip(first, second):
+        assert np.array_equal(a, b)
+
+
+def test_key_depends_on_structure_and_settings(mn2n_params):
+    """Changing the cutoff or the coordinates changes the key"""
+    poscar_data = read_poscar(mn2n_params.poscar)
+    key = NeighborCache.make_key(poscar_data, ["Mn", "N"], 2, 0.1, 2.6)
+    assert key == NeighborCache.make_key(poscar_data, ["Mn", "N"], 2, 0.1, 2.6)
+    assert key != NeighborCache.make_key(poscar_data, ["Mn", "N"], 2, 0.1, 3.0)
+    assert key != NeighborCache.make_key(poscar_data, ["Mn", "N"], 2, 0.1, 2.6, image_range=2)
+    poscar_data["coordinates"] = poscar_data["coordinates"] + 0.01
+    assert key != NeighborCache.make_key(poscar_data, ["Mn", "N"], 2, 0.1, 2.6)
+
+
+def test_corrupt_entry_is_discarded(tmp_path):
+    """Entries that fail validation are deleted and reported as misses"""
+    cache = NeighborCache(str(tmp_path))
+    neighbors = (np.array([0]), np.array([5]), np.zeros((1, 3), dtype=int), np.array([1.0]))
+    cache.store("bad", neighbors, n_atoms=2)
+    assert cache.load("bad") is None
+    assert not os.listdir(tmp_path)
+    (tmp_path / "junk.npz").write_bytes(b"not a zip file")
+    assert cache.load("junk") is None
+
+
+def test_lru_eviction_keeps_size_bounded(tmp_path):
+    """Least recently used entries are evicted first"""
+    cache = NeighborCache(str(tmp_path), max_bytes=10**9)
+    neighbors = (np.zeros(200, dtype=int), np.zeros(200, dtype=int), np.zeros((200, 3), dtype=int), np.ones(200))
+    for name in ("a", "b", "c"):
+        cache.store(name, neighbors, n_atoms=1)
+    entry_size = os.path.getsize(tmp_path / "a.npz")
+    os.utime(tmp_path / "a.npz", (1, 1))
+    os.utime(tmp_path / "b.npz", (2, 2))
+    os.utime(tmp_path / "c.npz", (3, 3))
+    assert cache.load("a") is not None
+    cache.max_bytes = 2 * entry_size
+    cache.evict()
+    assert sorted(os.listdir(tmp_path)) == ["a.npz", "c.npz"]
@@ -0,0 +1,44 @@
+import numpy as np
+from pyamtb.check_distance import calculate_distances
+
+SKEWED_POSCAR = """skewed
+1
+2.0 0 0
+1.7 1.0 0
+0 0 3.0
+Cu O
+2 1
+Direct
+0.1 0.2 0.0
+0.6 0.7 0.5
+0.3 0.9 0.25
+"""
+
+
+def brute_force_shells(lattice, coords, symbols, element1, element2, cutoff, n_images=6):
+    """Loop over a generous image range and count rounded distances"""
+    counts = {}
+    for i, si in enumerate(symbols):
+        for j, sj in enumerate(symbols):
+            if si != element1 or sj != element2:
+                continue
+            for R in np.ndindex(2 * n_images + 1, 2 * n_images + 1, 2 * n_images + 1):
+                d = np.linalg.norm((coords[j] + np.array(R) - n_images - coords[i]) @ lattice)
+                if 1e-6 <= d <= cutoff:
+                    counts[round(d, 4)] = counts.get(round(d, 4), 0) + 1
+    return counts
+
+
+def test_shells_match_brute_force(tmp_path):
+    """A skewed cell needs images beyond +-1; shells and multiplicities match a wide brute-force scan"""
+    path = tmp_path / "POSCAR"
+    path.write_text(SKEWED_POSCAR)
+    lattice = np.array([[2.0, 0, 0], [1.7, 1.0, 0], [0, 0, 3.0]])
+    coords = np.array([[0.1, 0.2, 0.0], [0.6, 0.7, 0.5], [0.3, 0.9, 0.25]])
+    for element1, element2 in [("Cu", "Cu"), ("Cu", "O")]:
+        shells = calculate_distances(str(path), element1, element2, cutoff=3.9)
+        expected = brute_force_shells(lattice, coords, ["Cu", "Cu", "O"], element1, element2, 3.9)
+        assert {s["distance"]: s["count"] for s in shells} == expected
+        example = shells[0]
+        d = np.linalg.norm((coords[example["atom2_index"]] + example["R_vector"] - coords[example["atom1_index"]]) @ lattice)
+        assert abs(d - example["distance"]) < 1e-4
@@ -0,0 +1,45 @@
+import numpy as np
+from pyamtb.dos import monkhorst_pack, calculate_dos
+from pyamtb.tight_binding_model import create_bloch_hamiltonian
+
+
+def test_monkhorst_pack_slices():
+    """Slices of the flat index reproduce the full symmetric mesh"""
+    full = monkhorst_pack([4, 3])
+    assert full.shape == (12, 2)
+    assert np.allclose(np.sort(np.unique(full[:, 0])), [-0.375, -0.125, 0.125, 0.375])
+    assert np.allclose(np.unique(full[:, 1]), [-1 / 3, 0, 1 / 3])
+    assert np.allclose(np.vstack([monkhorst_pack([4, 3], 0, 5), monkhorst_pack([4, 3], 5, 12)]), full)
+
+
+def test_gaussian_dos_matches_direct_sum(mn2n_params):
+    """Deposit plus convolution agrees with summing a Gaussian for every eigenvalue"""
+    ham = create_bloch_hamiltonian(mn2n_params)
+    energies = np.linspace(-4, 4, 801)
+    result = calculate_dos(ham, [6, 6], energies, smearing=0.1, chunk_size=7)
+    evals = ham.solve_all(monkhorst_pack([6, 6])).ravel()
+    direct = np.exp(-0.5 * ((energies[:, None] - evals) / 0.1) ** 2).sum(axis=1) / (np.sqrt(2 * np.pi) * 0.1 * 36)
+    assert result["nk"] == 36
+    assert np.allclose(result["dos"], direct, atol=2e-3 * direct.max())
+    assert np.allclose(result["dos_up"] + result["dos_down"], result["dos"])
+
+
+def test_histogram_counts_all_states(mn2n_params):
+    """A window covering the spectrum integrates to the number of bands, split by spin"""
+    ham = create_bloch_hamiltonian(mn2n_params)
+    energies = np.linspace(-10, 10, 2001)
+    result = calculate_dos(ham, 5, energies, method="histogram")
+    step = energies[1] - energies[0]
+    assert np.isclose(result["dos"].sum() * step, ham.nstate)
+    assert np.isclose(result["dos_up"].sum() * step, ham.norb)
+    assert not np.allclose(result["dos_up"], result["dos_down"])
+
+
+def test_parallel_dos_matches_serial(mn2n_params):
+    """Partial accumulators from the process pool add up to the serial result"""
+    ham = create_bloch_hamiltonian(mn2n_params)
+    energies = np.linspace(-3, 3, 301)
+    serial = calculate_dos(ham, [8, 8], energies, chunk_size=10)
+    parallel = calculate_dos(ham, [8, 8], energies, workers=2, chunk_size=10)
+    assert np.allclose(serial["dos"], parallel["dos"])
+    assert np.allclose(serial["dos_up"], parallel["dos_up"])
@@ -0,0 +1,51 @@
+import sys
+import numpy as np
+from pyamtb.hamiltonian import BlochHamiltonian
+from pyamtb.fermi_surface import marching_squares, fermi_surface, plot_fermi_surface
+
+
+def square_lattice(t=-1.0, m=0.3):
+    """One orbital per cell with nearest-neighbour hopping and a sigma_z exchange field"""
+    return BlochHamiltonian(np.eye(3), [[0, 0, 0]], [[[m, 0], [0, -m]]], [0, 0], [0, 0],
+                            [[1, 0, 0], [0, 1, 0]], [t, t], dimk=2, nspin=2)
+
+
+def dispersion(k, t=-1.0):
+    return 2 * t * (np.cos(2 * np.pi * k[..., 0]) + np.cos(2 * np.pi * k[..., 1]))
+
+
+def test_marching_squares_circle():
+    """The contour of x^2 + y^2 - r^2 has the length of the circle"""
+    x = np.linspace(-1, 1, 81)
+    values = x[None, :] ** 2 + x[:, None] ** 2 - 0.5 ** 2
+    segments, index = marching_squares(values[None], x[None], x[None])
+    length = np.linalg.norm(segments[:, 1] - segments[:, 0], axis=-1).sum()
+    assert np.all(index == 0)
+    assert np.isclose(length, np.pi, rtol=1e-3)
+    assert np.allclose(np.linalg.norm(segments, axis=-1), 0.5, atol=2e-3)
+
+
+def test_spin_resolved_contours_lie_on_the_dispersion():
+    """Each spin channel gives the contour shifted by its exchange splitting"""
+    ham = square_lattice()
+    result = fermi_surface(ham, energy=-1.0, mesh=32)
+    assert set(result["spin"]) == {0, 1}
+    shift = np.where(result["spin"] == 0, 0.3, -0.3)[:, None]
+    assert np.allclose(dispersion(result["segments"]) + shift, -1.0, atol=0.02)
+
+
+def test_refinement_only_evaluates_crossed_cells():
+    """Refining a coarse grid matches the fine-grid accuracy with fewer k-points"""
+    ham = square_lattice()
+    refined = fermi_surface(ham, energy=-1.0, mesh=16, refine=4, levels=2)
+    error = np.abs(dispersion(refined["segments"]) + np.where(refined["spin"] == 0, 0.3, -0.3)[:, None] + 1.0)
+    assert error.max() < 1e-3
+    assert refined["n_evaluated"] < 0.25 * (16 * 4 * 4 + 1) ** 2
+
+
+def test_plot_fermi_surface_without_pyplot(tmp_path, monkeypatch):
+    """Contours are drawn on an Agg canvas, so pyplot is never needed"""
+    monkeypatch.setitem(sys.modules, "matplotlib.pyplot", None)
+    result = fermi_surface(square_lattice(), -1.0, mesh=16, refine=0)
+    plot_fermi_surface(result, str(tmp_path / "fermi.png"))
+    assert (tmp_path / "fermi.png").stat().st_size > 0
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from pyamtb.hamiltonian import BlochHamiltonian
+from pyamtb.tight_binding_model import create_bloch_hamiltonian, create_pythtb_model, calculate_band_structure
+
+pythtb = pytest.importorskip("pythtb")
+
+
+def random_spinful_model(seed=0):
+    """A small pythtb model with spin-dependent hoppings"""
+    rng = np.random.default_rng(seed)
+    model = pythtb.tb_model(2, 2, [[1.0, 0.0], [0.3, 1.2]], rng.random((3, 2)), nspin=2)
+    for orb in range(3):
+        model.set_onsite(rng.normal(size=4), orb)
+    for i, j, R in [(0, 1, [0, 0]), (1, 2, [1, 0]), (0, 0, [0, 1]), (2, 0, [1, -1])]:
+        model.set_hop(rng.normal(size=4), i, j, R)
+    return model
+
+
+def test_native_eigenvalues_match_pythtb(mn2n_params):
+    """Bands from the batched solver agree with pythtb's solve_all"""
+    mn2n_params.maxdistance = 6.0
+    model = create_pythtb_model(mn2n_params)
+    ham = create_bloch_hamiltonian(mn2n_params)
+    k_vec, k_dist, k_node = ham.k_path(mn2n_params.kpath, 50)
+    ref_vec, ref_dist, ref_node = model.k_path(mn2n_params.kpath, 50, report=False)
+    assert np.allclose(k_vec, ref_vec) and np.allclose(k_dist, ref_dist) and np.allclose(k_node, ref_node)
+    assert np.allclose(ham.solve_all(k_vec), model.solve_all(k_vec))
+
+
+def test_spin_dependent_hoppings_and_round_trip():
+    """Matrix-valued hoppings survive conversion in both directions"""
+    model = random_spinful_model()
+    ham = BlochHamiltonian.from_pythtb(model)
+    k = np.random.default_rng(1).random((20, 2))
+    assert np.allclose(ham.solve_all(k), model.solve_all(k))
+    assert np.allclose(ham.to_pythtb().solve_all(k), model.solve_all(k))
+
+
+def test_spinless_model_over_many_k_points():
+    """nspin=1 onsite energies are added on the diagonal for any number of k-points"""
+    rng = np.random.default_rng(5)
+    model = pythtb.tb_model(2, 2, [[1.0, 0.0], [0.3, 1.2]], rng.random((3, 2)))
+    model.set_onsite(rng.normal(size=3))
+    for i, j, R in [(0, 1, [0, 0]), (1, 2, [1, 0]), (0, 0, [0, 1]), (2, 0, [1, -1])]:
+        model.set_hop(rng.normal(), i, j, R)
+    ham = BlochHamiltonian.from_pythtb(model)
+    for nk in (1, 3, 20):
+        k = rng.random((nk, 2))
+        assert np.allclose(ham.solve_all(k), model.solve_all(k))
+
+
+def test_hamiltonian_is_hermitian_and_eigenvectors_diagonalize():
+    """Each H[k] is Hermitian and the returned eigenpairs satisfy H v = E v"""
+    ham = BlochHamiltonian.from_pythtb(random_spinful_model())
+    k = np.random.default_rng(2).random((5, 2))
+    H = ham.hamiltonian(k)
+    assert np.allclose(H, H.conj().transpose(0, 2, 1))
+    evals, evecs = ham.solve_all(k, eig_vectors=True)
+    assert evecs.shape == (6, 5, 3, 2)
+    vecs = evecs.reshape(6, 5, 6)
+    for n in range(6):
+        assert np.allclose(np.einsum("kij,kj->ki", H, vecs[n]), evals[n][:, None] * vecs[n])
+
+
+def test_calculate_band_structure_with_native_solver(mn2n_params):
+    """The default solver produces a band plot without going through pythtb"""
+    mn2n_params.is_black_degenerate_bands = False
+    calculate_band_structure(create_bloch_hamiltonian(mn2n_params), mn2n_params)
+
+
+def test_spin_diagonal_fast_path(mn2n_params):
+    """Collinear models are solved as two spin blocks that reproduce the full 2*norb problem"""
+    mn2n_params.maxdistance = 6.0
+    ham = create_bloch_hamiltonian(mn2n_params)
+    assert ham.spin_diagonal
+    assert not BlochHamiltonian.from_pythtb(random_spinful_model()).spin_diagonal
+    k = np.random.default_rng(3).random((20, 2))
+    H = ham.hamiltonian(k)
+    assert np.allclose(ham.solve_all(k), np.linalg.eigvalsh(H).T)
+
+    evals, spin, evecs = ham.solve_spin(k, eig_vectors=True)
+    vecs = evecs.reshape(6, 20, 6)
+    for n in range(6):
+        assert np.allclose(np.einsum("kij,kj->ki", H, vecs[n]), evals[n][:, None] * vecs[n])
+    # the spin label is the sigma_z expectation value of the eigenvector
+    weight = np.abs(evecs) ** 2
+    assert np.allclose(weight[..., 0].sum(-1) - weight[..., 1].sum(-1), spin)
+
+    sparse = ham.solve_sparse(k[:3], nev=2, sigma=0.2)
+    full = np.linalg.eigvalsh(H[:3]).T
+    nearest = np.sort(np.take_along_axis(full, np.argsort(np.abs(full - 0.2), axis=0)[:2], axis=0), axis=0)
+    assert np.allclose(sparse, nearest)
@@ -0,0 +1,42 @@
+import numpy as np
+from pyamtb.hamiltonian import BlochHamiltonian
+from pyamtb.hoppings import HoppingTable, HOPPING_DTYPE
+from pyamtb.parameters import Parameters
+from pyamtb.tight_binding_model import calculate_all_couplings, calculate_hopping_table, remove_duplicate_hoppings
+
+
+def test_deduplicate_merges_only_conjugate_pairs():
+    """(i, j, R) and (j, i, -R) are merged; (i, j, -R) with i != j is a different bond"""
+    table = HoppingTable.from_arrays(
+        i=[0, 1, 0, 0, 0, 2],
+        j=[1, 0, 1, 0, 0, 2],
+        R=[[1, 0, 0], [-1, 0, 0], [-1, 0, 0], [0, 1, 0], [0, -1, 0], [1, 1, 0]],
+        t=[1.0, 1.0, 0.5, 0.2, 0.2, 0.1])
+    unique = table.deduplicate()
+    assert unique.i.tolist() == [0, 0, 0, 2]
+    assert unique.R.tolist() == [[1, 0, 0], [-1, 0, 0], [0, 1, 0], [1, 1, 0]]
+
+
+def test_remove_duplicate_hoppings_keeps_list_format(random_structure):
+    """The list-of-dicts API still returns one hopping per dict"""
+    params = Parameters()
+    params.dimk = 3
+    couplings = calculate_all_couplings(random_structure, ["Mn", "N"], params=params)
+    unique = remove_duplicate_hoppings(couplings)
+    table = calculate_hopping_table(random_structure, ["Mn", "N"], params).deduplicate()
+    assert len(unique) == len(table)
+    assert all(len(hop["coupling_values"]) == 1 for hop in unique)
+    assert [hop["R_vectors"][0] for hop in unique] == table.R.tolist()
+    keys = {(hop["atom1_index"], hop["atom2_index"], tuple(hop["R_vectors"][0])) for hop in unique}
+    for i, j, R in keys:
+        assert i == j or (j, i, tuple(-r for r in R)) not in keys
+
+
+def test_table_columns_feed_native_backend_without_copy(random_structure):
+    """BlochHamiltonian references the table's columns directly"""
+    params = Parameters()
+    table = calculate_hopping_table(random_structure, ["Mn", "N"], params).deduplicate()
+    assert table.data.dtype == HOPPING_DTYPE
+    ham = BlochHamiltonian.from_hopping_table(table, random_structure["lattice"], random_structure["coordinates"],
+                                              np.zeros(len(random_structure["coordinates"])), dimk=2)
+    assert np.shares_memory(ham.hop_i, table.data) and np.shares_memory(ham.hop_R, table.data)
@@ -0,0 +1,38 @@
+import subprocess
+import sys
+import pytest
+
+HEAVY_MODULES = ("matplotlib", "pythtb", "scipy")
+
+
+def imported_modules(statement):
+    """Top-level modules loaded by a fresh interpreter running the statement, from -X importtime"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            capture_output=True, text=True, check=True)
+    return {line.split("|")[-1].strip().split(".")[0]
+            for line in result.stderr.splitlines() if line.startswith("import time:")}
+
+
+@pytest.mark.parametrize("statement", ["import pyamtb", "import pyamtb.cli", "import pyamtb.parameters"])
+def test_import_is_lightweight(statement):
+    """Importing the package or the CLI does not load plotting or pythtb"""
+    assert not imported_modules(statement) & set(HEAVY_MODULES)
+
+
+def test_cli_help_does_not_import_numpy():
+    """Argument parsing happens before any calculation module is imported"""
+    assert "numpy" not in imported_modules("import pyamtb.cli")
+    result = subprocess.run([sys.executable, "-m", "pyamtb.cli", "--help"], capture_output=True, text=True)
+    assert result.returncode == 0 and "calculate" in result.stdout
+
+
+def test_lazy_attributes():
+    """Public names resolve on first access and the default parameters are created on demand"""
+    import pyamtb
+    import pyamtb.parameters as parameters
+    from pyamtb.tight_binding_model import calculate_band_structure
+    assert pyamtb.calculate_band_structure is calculate_band_structure
+    assert "calculate_distances" in dir(pyamtb)
+    assert parameters.params is parameters.default_parameters()
+    with pytest.raises(AttributeError):
+        pyamtb.not_a_name
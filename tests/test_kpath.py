@@ -0,0 +1,48 @@
+import numpy as np
+from pyamtb.kpath import path_points, refine_flags, adaptive_k_path
+from pyamtb.tight_binding_model import create_bloch_hamiltonian, calculate_band_structure
+
+
+def test_path_points_follow_segments():
+    """Distances along the path map back onto the straight segments between nodes"""
+    kpath = [[0, 0], [0.5, 0], [0.5, 0.5]]
+    k = path_points(kpath, [0.0, 1.0, 2.0], [0.0, 0.5, 1.0, 1.5, 2.0])
+    assert np.allclose(k, [[0, 0], [0.25, 0], [0.5, 0], [0.5, 0.25], [0.5, 0.5]])
+
+
+def test_crossing_is_flagged():
+    """Two linear bands that swap eigenvectors are flagged only around the crossing"""
+    k_dist = np.linspace(0, 1, 11)
+    up, down = k_dist - 0.45, 0.45 - k_dist
+    evals = np.sort([up, down], axis=0)
+    evecs = np.zeros((2, 11, 2))
+    evecs[0, :, 0] = evecs[1, :, 1] = 1.0
+    # after the crossing the lower state is the other eigenvector
+    evecs[:, 5:] = evecs[::-1, 5:]
+    flags = refine_flags(k_dist, evals, evecs, [0.0, 1.0], tolerance=1e-3, energy_threshold=0.06)
+    assert np.flatnonzero(flags).tolist() == [3, 4, 5]
+
+
+def test_adaptive_path_matches_dense_path(mn2n_params):
+    """A few hundred adaptive points reproduce a 5000-point uniform path"""
+    ham = create_bloch_hamiltonian(mn2n_params)
+    k_vec, k_dist, _ = ham.k_path(mn2n_params.kpath, 5001)
+    reference = ham.solve_all(k_vec)
+    coarse = ham.k_path(mn2n_params.kpath, 31)
+    _, dist, evals, _ = adaptive_k_path(lambda k: ham.solve_all(k, eig_vectors=True), mn2n_params.kpath,
+                                        *coarse, tolerance=1e-3, resolution=1e-4)
+    assert len(dist) < 1000
+    assert np.all(np.diff(dist) > 0)
+    for band in range(len(evals)):
+        assert np.abs(np.interp(k_dist, dist, evals[band]) - reference[band]).max() < 2e-3
+
+
+def test_band_structure_with_adaptive_path(mn2n_params, tmp_path):
+    """calculate_band_structure accepts the adaptive sampler and can store its points"""
+    mn2n_params.adaptive_kpath = True
+    mn2n_params.num_k_points = 20
+    mn2n_params.store_dir = str(tmp_path / "bands")
+    calculate_band_structure(create_bloch_hamiltonian(mn2n_params), mn2n_params)
+    from pyamtb.store import BandStore
+    store = BandStore(mn2n_params.store_dir)
+    assert store.nk > 20 and len(store.metadata["k_dist"]) == store.nk
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from pyamtb.neighbors import (lattice_translations, find_neighbors, image_range, image_translations,
+                              cell_list_neighbors, neighbor_pairs)
+from pyamtb.parameters import Parameters
+from pyamtb.tight_binding_model import calculate_all_couplings, get_coupling_strength, hopping_strength
+
+
+def brute_force_neighbors(coords, lattice, R_vectors, mindist, maxdistance):
+    """Reference implementation looping over every (i, j, R)"""
+    found = []
+    for i in range(len(coords)):
+        for j in range(i, len(coords)):
+            for R in R_vectors:
+                d = np.linalg.norm(np.dot(coords[j] + R - coords[i], lattice))
+                if mindist <= d <= maxdistance:
+                    found.append((i, j, tuple(R), d))
+    return found
+
+
+def test_lattice_translations_respects_dimk():
+    """Translations only extend along periodic directions"""
+    assert lattice_translations(1, 2).shape == (5, 3)
+    assert lattice_translations(2, 1).shape == (9, 3)
+    assert lattice_translations(3, 1).shape == (27, 3)
+    assert not lattice_translations(2, 2)[:, 2].any()
+    with pytest.raises(ValueError):
+        lattice_translations(4, 1)
+
+
+def test_find_neighbors_matches_brute_force(random_structure):
+    """The broadcast engine finds the same pairs, in the same order"""
+    coords, lattice = random_structure["coordinates"], random_structure["lattice"]
+    R_vectors = lattice_translations(3, 1)
+    atom1, atom2, R, d = find_neighbors(coords, lattice, R_vectors, 0.1, 2.6)
+    expected = brute_force_neighbors(coords, lattice, R_vectors, 0.1, 2.6)
+    assert len(expected) == len(atom1)
+    for (i, j, R_ref, d_ref), a, b, r, dist in zip(expected, atom1, atom2, R, d):
+        assert (i, j, R_ref) == (a, b, tuple(r))
+        assert np.isclose(d_ref, dist)
+
+
+def test_calculate_all_couplings_groups_by_pair(random_structure):
+    """Every i <= j pair gets an entry and couplings follow hopping_strength"""
+    params = Parameters()
+    params.dimk, params.max_neighbors, params.same_atom_negative_coupling = 3, 1, True
+    couplings = calculate_all_couplings(random_structure, ["Mn", "N"], params=params)
+    n_atoms = len(random_structure["coordinates"])
+    assert len(couplings) == n_atoms * (n_atoms + 1) // 2
+    for hop in couplings:
+        t_ref, R_ref, d_ref = get_coupling_strength(hop["atom1_index"], hop["atom2_index"], random_structure, params)
+        assert np.allclose(hop["coupling_values"], t_ref)
+        assert np.allclose(hop["distance_values"], d_ref)
+        same = random_structure["atom_symbols"][hop["atom1_index"]] == random_structure["atom_symbols"][hop["atom2_index"]]
+        sign = -1 if same else 1
+        assert np.allclose(hop["coupling_values"], sign * hopping_strength(np.array(d_ref), params))
+
+
+def test_cell_list_matches_full_image_search():
+    """The cell list finds every pair inside the cutoff, for skewed cells and any dimk"""
+    rng = np.random.default_rng(1)
+    for dimk in (1, 2, 3):
+        lattice = np.diag([1.0, 1.5, 3.0]) + rng.uniform(-0.4, 0.4, (3, 3))
+        coords = rng.uniform(-0.5, 1.5, (15, 3))
+        cutoff = 3.2
+        result = cell_list_neighbors(coords, lattice, 0.1, cutoff, dimk)
+        R_vectors = image_translations(lattice, cutoff, dimk, coords)
+        atom1, atom2, R, d = find_neighbors(coords, lattice, R_vectors, 0.1, cutoff)
+        order = np.lexsort((R[:, 2], R[:, 1], R[:, 0], atom2, atom1))
+        for got, expected in zip(result, (atom1[order], atom2[order], R[order], d[order])):
+            assert np.allclose(got, expected)
+        assert not result[2][:, dimk:].any()
+
+
+def test_image_range_grows_with_cutoff():
+    """A cutoff longer than the cell needs more than one image"""
+    lattice = np.eye(3)
+    assert image_range(lattice, 0.5, 3).tolist() == [2, 2, 2]
+    assert image_range(lattice, 2.5, 2).tolist() == [4, 4, 0]
+    assert image_range(lattice, 2.5, 2, np.zeros((1, 3))).tolist() == [3, 3, 0]
+
+
+def test_neighbor_pairs_cell_list_recovers_bonds_dropped_by_max_neighbors():
+    """A too-small max_neighbors drops bonds, the cell list does not"""
+    lattice = np.eye(3)
+    coords = np.zeros((1, 3))
+    fixed = neighbor_pairs(coords, lattice, 1, 0.1, 2.5, max_neighbors=1)
+    auto = neighbor_pairs(coords, lattice, 1, 0.1, 2.5)
+    assert len(fixed[0]) == 2
+    assert sorted(auto[2][:, 0].tolist()) == [-2, -1, 1, 2]
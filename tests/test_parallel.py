@@ -0,0 +1,47 @@
+import os
+import numpy as np
+from pyamtb.parallel import solve_parallel, limit_blas_threads, BLAS_THREAD_VARS
+
+
+def test_parallel_matches_serial(random_model):
+    """Eigenvalues and eigenvectors written to shared memory match a serial solve"""
+    ham = random_model(n_orb=12, n_hop=60)
+    k = np.random.default_rng(1).random((30, 2))
+    evals, evecs = solve_parallel(ham, k, workers=2, eig_vectors=True, chunk_size=7)
+    ref_evals, ref_evecs = ham.solve_all(k, eig_vectors=True)
+    assert np.allclose(evals, ref_evals)
+    assert np.allclose(np.abs(np.einsum("nkos,nkos->nk", evecs.conj(), ref_evecs)), 1.0)
+
+
+def test_parallel_sparse_solver(random_model):
+    """The sparse solver can also run in the process pool"""
+    ham = random_model(n_orb=12, n_hop=60)
+    k = np.random.default_rng(2).random((4, 2))
+    evals = solve_parallel(ham, k, workers=2, sparse_nev=3, sigma=0.1)
+    assert np.allclose(evals, ham.solve_sparse(k, 3, 0.1))
+
+
+def test_parallel_spin_dependent_model(random_model):
+    """The full 2*norb solve fills the (nbands, nk, norb, 2) shared buffers, also with the sparse solver"""
+    ham = random_model(n_orb=12, n_hop=60, spin_dependent=True)
+    assert not ham.spin_diagonal
+    k = np.random.default_rng(4).random((25, 2))
+    evals, evecs = solve_parallel(ham, k, workers=2, eig_vectors=True, chunk_size=6)
+    ref_evals, ref_evecs = ham.solve_all(k, eig_vectors=True)
+    assert evecs.shape == (24, 25, 12, 2)
+    assert np.allclose(evals, ref_evals)
+    assert np.allclose(np.abs(np.einsum("nkos,nkos->nk", evecs.conj(), ref_evecs)), 1.0)
+
+    evals, evecs = solve_parallel(ham, k[:5], workers=2, eig_vectors=True, sparse_nev=4, sigma=0.1)
+    ref_evals, ref_evecs = ham.solve_sparse(k[:5], 4, 0.1, eig_vectors=True)
+    assert evecs.shape == (4, 5, 12, 2)
+    assert np.allclose(evals, ref_evals)
+    assert np.allclose(np.abs(np.einsum("nkos,nkos->nk", evecs.conj(), ref_evecs)), 1.0)
+
+
+def test_limit_blas_threads_restores_environment():
+    """Thread limits only apply inside the context"""
+    before = {name: os.environ.get(name) for name in BLAS_THREAD_VARS}
+    with limit_blas_threads(1):
+        assert all(os.environ[name] == "1" for name in BLAS_THREAD_VARS)
+    assert before == {name: os.environ.get(name) for name in BLAS_THREAD_VARS}
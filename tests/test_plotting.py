@@ -0,0 +1,55 @@
+import numpy as np
+from pyamtb.plotting import band_lines, save_band_data, load_band_data, plot_bands
+from pyamtb.tight_binding_model import create_bloch_hamiltonian, calculate_band_structure
+
+
+def test_band_lines():
+    """One polyline per band, split only where the segment label changes"""
+    k_dist = np.array([0.0, 1.0, 3.0, 4.0])
+    evals = np.array([[0.0, 1.0, 2.0, 3.0], [5.0, 4.0, 3.0, 2.0]])
+    lines, labels = band_lines(k_dist, evals)
+    assert len(lines) == 2 and labels is None
+    assert np.allclose(lines[1], [[0.0, 5.0], [1.0, 4.0], [3.0, 3.0], [4.0, 2.0]])
+
+    lines, labels = band_lines(k_dist, evals, np.array([[0, 0, 1], [2, 2, 2]]))
+    assert labels.tolist() == [0, 1, 2]
+    assert np.allclose(lines[0], [[0.0, 0.0], [1.0, 1.0], [3.0, 2.0]])
+    assert np.allclose(lines[1], [[3.0, 2.0], [4.0, 3.0]])
+    assert len(lines[2]) == 4
+
+
+def test_band_data_round_trip(tmp_path):
+    """npz keeps arrays and labels, CSV has one row per k-point"""
+    rng = np.random.default_rng(0)
+    k_dist, evals, spin = np.linspace(0, 1, 5), rng.normal(size=(3, 5)), rng.uniform(-1, 1, (3, 5))
+    save_band_data(str(tmp_path / "bands.npz"), k_dist, evals, [0.0, 1.0], ["G", "X"], spin)
+    data = load_band_data(tmp_path / "bands.npz")
+    assert np.allclose(data["evals"], evals) and np.allclose(data["spin"], spin)
+    assert data["klabel"] == ["G", "X"]
+
+    save_band_data(str(tmp_path / "bands.csv"), k_dist, evals, [0.0, 1.0], ["G", "X"])
+    table = np.loadtxt(tmp_path / "bands.csv", delimiter=",")
+    assert table.shape == (5, 4)
+    assert np.allclose(table[:, 1:], evals.T)
+
+
+def test_plot_bands_with_spin(tmp_path):
+    """Spin-colored plots with degenerate pairs are written headless"""
+    k_dist, evals = np.linspace(0, 1, 50), np.random.default_rng(1).normal(size=(4, 50))
+    degenerate = np.zeros(evals.shape, dtype=bool)
+    degenerate[:2, 10:20] = True
+    plot_bands(str(tmp_path / "bands.png"), k_dist, evals, [0.0, 1.0], ["G", "X"],
+               np.sign(evals), degenerate)
+    assert (tmp_path / "bands.png").stat().st_size > 0
+
+
+def test_calculate_band_structure_data_only(mn2n_params, tmp_path):
+    """With plotting off only the data file is written, and it matches the returned bands"""
+    mn2n_params.output_filename = str(tmp_path / "bands")
+    mn2n_params.is_plot_bands = False
+    mn2n_params.band_data_format = "npz"
+    result = calculate_band_structure(create_bloch_hamiltonian(mn2n_params), mn2n_params)
+    assert not (tmp_path / f"bands.{mn2n_params.output_format}").exists()
+    data = load_band_data(tmp_path / "bands.npz")
+    assert np.allclose(data["evals"], result["evals"])
+    assert set(np.unique(data["spin"])) <= {-1.0, 1.0}
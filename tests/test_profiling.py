@@ -0,0 +1,45 @@
+import json
+from pyamtb.profiling import Profiler, profiling, span
+from pyamtb.tight_binding_model import create_bloch_hamiltonian, calculate_band_structure
+
+
+def test_spans_nest_and_merge():
+    """Nested spans get "/" paths, repeated spans are merged, counts can be filled in afterwards"""
+    with span("inactive", n=1) as counts:
+        assert counts == {"n": 1}
+
+    with profiling(Profiler()) as profiler:
+        with span("outer"):
+            for n in range(3):
+                with span("inner", n=n) as counts:
+                    items = list(range(1000 * (n + 1)))
+                    counts["items"] = len(items)
+    report = profiler.report()
+    spans = {record["name"]: record for record in report["spans"]}
+    assert list(spans) == ["outer", "outer/inner"]
+    assert spans["outer/inner"]["calls"] == 3
+    assert spans["outer/inner"]["n"] == 2 and spans["outer/inner"]["items"] == 3000
+    assert spans["outer"]["wall"] >= spans["outer/inner"]["wall"]
+    assert spans["outer"]["peak_memory"] >= spans["outer/inner"]["peak_memory"] > 0
+    assert report["hot_stage"] == "outer/inner"
+
+
+def test_profile_band_calculation(mn2n_params, tmp_path):
+    """Model and band stages are recorded with their sizes, the report and cProfile stats are written"""
+    mn2n_params.is_plot_bands = False
+    mn2n_params.num_k_points = 50
+    profiler = Profiler(cprofile_stage="diagonalize")
+    with profiling(profiler):
+        calculate_band_structure(create_bloch_hamiltonian(mn2n_params), mn2n_params)
+    profiler.save(tmp_path / "profile.json", command="test")
+    assert profiler.dump_cprofile(tmp_path / "diagonalize.prof")
+
+    report = json.loads((tmp_path / "profile.json").read_text())
+    spans = {record["name"]: record for record in report["spans"]}
+    assert report["meta"]["command"] == "test"
+    assert spans["create_bloch_hamiltonian/read_poscar"]["atoms"] == 3
+    assert spans["create_bloch_hamiltonian/assemble"]["orbitals"] == 3
+    assert spans["create_bloch_hamiltonian/hopping_table"]["hoppings"] > 0
+    assert spans["calculate_band_structure/diagonalize"]["k_points"] == 50
+    assert "calculate_band_structure/plot" not in spans
+    assert (tmp_path / "diagonalize.prof").stat().st_size > 0
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from pyamtb.slab import build_slab, layer_weights, surface_weights, slab_k_path
+from pyamtb.tight_binding_model import create_bloch_hamiltonian
+
+
+def test_supercell_folds_bands(mn2n_params):
+    """The supercell spectrum at G is the primitive spectrum on the folded k-points"""
+    ham = create_bloch_hamiltonian(mn2n_params)
+    supercell, cells = build_slab(ham, [2, 3, 1])
+    assert supercell.norb == 6 * ham.norb and supercell.dimk == 2
+    assert cells.shape == (supercell.norb, 3)
+    k_folded = [[a / 2, b / 3] for a in range(2) for b in range(3)]
+    assert np.allclose(np.sort(ham.solve_all(k_folded).ravel()), supercell.solve_all([[0.0, 0.0]])[:, 0])
+
+
+@pytest.mark.parametrize("direction", [0, 1])
+def test_slab_matches_pythtb_cut_piece(mn2n_params, direction):
+    """Open boundaries along one direction give the same bands as pythtb's cut_piece"""
+    from pyamtb.tight_binding_model import create_pythtb_model
+    pytest.importorskip("pythtb")
+    ham = create_bloch_hamiltonian(mn2n_params)
+    repeats = [6 if d == direction else 1 for d in range(3)]
+    slab, cells = build_slab(ham, repeats, [direction])
+    cut = create_pythtb_model(mn2n_params).cut_piece(6, direction, glue_edgs=False)
+    k = np.linspace(-0.5, 0.5, 7)[:, None]
+    assert slab.dimk == 1 and slab.per == [1 - direction]
+    assert np.allclose(slab.solve_all(k), cut.solve_all(k))
+
+
+def test_layer_and_surface_weights(mn2n_params):
+    """Layer weights sum to one; the chunked sparse path agrees with the dense one near sigma"""
+    ham, cells = build_slab(create_bloch_hamiltonian(mn2n_params), [8, 1, 1], [0])
+    k = np.linspace(-0.5, 0.5, 5)[:, None]
+    evals, evecs = ham.solve_all(k, eig_vectors=True)
+    weights = layer_weights(evecs, cells[:, 0])
+    assert weights.shape == (ham.nstate, 5, 8)
+    assert np.allclose(weights.sum(axis=2), 1.0)
+
+    dense, surface = surface_weights(ham, cells[:, 0], k, n_surface=2)
+    assert np.allclose(dense, evals)
+    assert np.allclose(surface[..., 0], weights[..., :2].sum(axis=2))
+    assert np.allclose(surface[..., 1], weights[..., 6:].sum(axis=2))
+
+    sparse, _ = surface_weights(ham, cells[:, 0], k, nev=6, sigma=0.3)
+    assert sparse.shape == (6, 5)
+    assert np.isclose(sparse[:, None, :], evals[None, :, :]).any(axis=1).all()
+
+
+def test_slab_k_path_and_errors(mn2n_params):
+    """A single remaining periodic direction uses -X -> G -> X; invalid builds are rejected"""
+    ham = create_bloch_hamiltonian(mn2n_params)
+    slab, _ = build_slab(ham, [4, 1, 1], [0])
+    assert slab_k_path(mn2n_params, slab) == ([[-0.5], [0.0], [0.5]], ["-X", "G", "X"])
+    with pytest.raises(ValueError):
+        build_slab(ham, [1, 1, 2])
+    with pytest.raises(ValueError):
+        build_slab(ham, [1, 1, 1], [2])
+    with pytest.raises(ValueError):
+        build_slab(ham, [2, 2, 1], [0, 1])
@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+import pyamtb.sparse
+from pyamtb.hamiltonian import BlochHamiltonian
+from pyamtb.sparse import to_csr, eigsh_nearest, lanczos_nearest
+from pyamtb.tight_binding_model import create_bloch_hamiltonian, solve_bands
+
+
+@pytest.fixture(params=["scipy", "numpy"])
+def backend(request, monkeypatch):
+    """Run each test with scipy (when installed) and with the pure-NumPy fallback"""
+    if request.param == "scipy":
+        pytest.importorskip("scipy")
+    else:
+        monkeypatch.setattr(pyamtb.sparse, "_scipy_sparse", lambda: (None, None))
+    return request.param
+
+
+@pytest.mark.parametrize("spin_dependent", [False, True])
+def test_sparse_hamiltonian_matches_dense(backend, random_model, spin_dependent):
+    """The CSR matrix holds exactly the dense Bloch Hamiltonian, also with 2x2 spin hopping blocks"""
+    ham = random_model(spin_dependent=spin_dependent)
+    assert ham.spin_diagonal != spin_dependent
+    k = np.array([0.13, 0.41])
+    assert np.allclose(ham.sparse_hamiltonian(k).toarray(), ham.hamiltonian(k)[0])
+
+
+@pytest.mark.parametrize("spin_dependent", [False, True])
+def test_solve_sparse_returns_eigenvalues_nearest_target(backend, random_model, spin_dependent):
+    """Only the requested eigenpairs around sigma are computed"""
+    ham = random_model(spin_dependent=spin_dependent)
+    k = np.random.default_rng(3).random((2, 2))
+    dense = np.linalg.eigvalsh(ham.hamiltonian(k)).T
+    evals, evecs = ham.solve_sparse(k, 6, sigma=0.2, eig_vectors=True)
+    assert evals.shape == (6, 2) and evecs.shape == (6, 2, 30, 2)
+    for ik in range(2):
+        nearest = np.sort(dense[np.argsort(np.abs(dense[:, ik] - 0.2))[:6], ik])
+        assert np.allclose(evals[:, ik], nearest)
+        H = ham.hamiltonian(k[ik])[0]
+        vecs = evecs[:, ik].reshape(6, -1)
+        assert np.allclose(vecs @ H.T, evals[:, ik, None] * vecs)
+
+
+def test_eigsh_nearest_with_sigma_on_an_eigenvalue(backend):
+    """An isolated zero-energy orbital makes H - sigma singular at sigma = 0"""
+    rng = np.random.default_rng(6)
+    n = 40
+    onsite = np.r_[0.0, rng.normal(size=n - 1)]
+    hop = rng.normal(size=n - 2)
+    # orbital 0 is decoupled from the chain 1..n-1
+    row = np.r_[np.arange(1, n), np.arange(1, n - 1), np.arange(2, n)]
+    col = np.r_[np.arange(1, n), np.arange(2, n), np.arange(1, n - 1)]
+    matrix = to_csr(np.r_[onsite[1:], hop, hop].astype(complex), row, col, (n, n))
+    dense = np.linalg.eigvalsh(matrix.toarray())
+    vals, vecs = eigsh_nearest(matrix, 5, sigma=0.0, eig_vectors=True)
+    assert np.allclose(vals, np.sort(dense[np.argsort(np.abs(dense))[:5]]))
+    assert np.any(np.abs(vals) < 1e-10)
+    assert np.allclose(matrix.toarray() @ vecs, vecs * vals)
+
+
+def test_solve_sparse_on_flat_band_target(backend):
+    """solve_sparse at sigma exactly on a dispersionless level, as for the Lieb flat band"""
+    ham = BlochHamiltonian(np.eye(2), [[0, 0], [0.5, 0], [0, 0.5], [0.5, 0.5]], [0.0, 0.3, -0.2, 0.0],
+                           [1, 2, 1], [2, 1, 2], [[0, 0], [1, 0], [0, 1]], [1.0, 0.5, -0.7], dimk=2)
+    k = np.random.default_rng(7).random((3, 2))
+    dense = ham.solve_all(k)
+    evals = ham.solve_sparse(k, 2, sigma=0.0)
+    nearest = np.sort(np.take_along_axis(dense, np.argsort(np.abs(dense), axis=0)[:2], axis=0), axis=0)
+    assert np.allclose(evals, nearest)
+
+
+def test_to_csr_sums_duplicates(backend):
+    """Repeated (row, col) entries are added together"""
+    matrix = to_csr(np.array([1.0, 2.0, 3.0]), np.array([0, 0, 1]), np.array([1, 1, 0]), (2, 2))
+    assert np.allclose(matrix.toarray(), [[0, 3], [3, 0]])
+
+
+def test_lanczos_nearest_on_diagonal_matrix():
+    """Lanczos finds interior eigenvalues of a known spectrum"""
+    diagonal = np.linspace(-1, 1, 41)
+    vals, vecs = lanczos_nearest(lambda x: diagonal * x, 41, 3, sigma=0.26)
+    assert np.allclose(np.sort(vals), [0.2, 0.25, 0.3])
+
+
+def test_lanczos_nearest_restarts_with_small_basis():
+    """Interior eigenpairs converge with a basis much smaller than the matrix"""
+    rng = np.random.default_rng(4)
+    n = 400
+    diagonal, off = rng.normal(size=n), 0.5 * rng.normal(size=n - 1)
+
+    def matvec(x):
+        y = diagonal * x
+        y[:-1] += off * x[1:]
+        y[1:] += off * x[:-1]
+        return y
+
+    vals, vecs = lanczos_nearest(matvec, n, 4, sigma=0.1, max_iter=40)
+    dense = np.linalg.eigvalsh(np.diag(diagonal) + np.diag(off, 1) + np.diag(off, -1))
+    assert np.allclose(np.sort(vals), np.sort(dense[np.argsort(np.abs(dense - 0.1))[:4]]))
+    residual = np.stack([matvec(v) for v in vecs.T], axis=1) - vecs * vals
+    assert np.all(np.linalg.norm(residual, axis=0) < 1e-8)
+
+
+def test_lanczos_nearest_reports_unconverged_pairs():
+    """Running out of restarts is an error, not a silently wrong answer"""
+    diagonal = np.linspace(-1, 1, 400)
+    with pytest.raises(RuntimeError):
+        lanczos_nearest(lambda x: diagonal * x, 400, 4, sigma=0.0, max_iter=20, max_restarts=1)
+
+
+def test_solve_bands_with_sparse_solver(mn2n_params):
+    """solver = "sparse" returns sparse_num_bands bands around the target energy"""
+    mn2n_params.solver = "sparse"
+    mn2n_params.sparse_num_bands = 2
+    mn2n_params.sparse_target_energy = 0.0
+    ham = create_bloch_hamiltonian(mn2n_params)
+    k_vec = ham.k_path(mn2n_params.kpath, 20)[0]
+    assert solve_bands(ham, k_vec, mn2n_params).shape == (2, 20)
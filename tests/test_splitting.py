@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from pyamtb.hamiltonian import BlochHamiltonian
+from pyamtb.splitting import spin_splitting, spin_splitting_map, classify_nodal_pattern
+
+
+def d_wave_model(m=0.5, t=-1.0, dt=0.3, tab=-0.4):
+    """Two antiparallel sublattices whose hoppings prefer x on A and y on B"""
+    onsite = [[[m, 0], [0, -m]], [[-m, 0], [0, m]]]
+    hops = [(0, 0, [1, 0, 0], t + dt), (0, 0, [0, 1, 0], t - dt),
+            (1, 1, [1, 0, 0], t - dt), (1, 1, [0, 1, 0], t + dt),
+            (0, 1, [0, 0, 0], tab), (0, 1, [-1, 0, 0], tab), (0, 1, [0, -1, 0], tab), (0, 1, [-1, -1, 0], tab)]
+    i, j, R, hop_t = zip(*hops)
+    return BlochHamiltonian(np.eye(3), [[0, 0, 0], [0.5, 0.5, 0]], onsite, i, j, R, hop_t, dimk=2, nspin=2)
+
+
+def test_d_wave_splitting_map():
+    """The maximum matches a dense scan and the nodal pattern is d-wave"""
+    ham = d_wave_model()
+    result = spin_splitting_map(ham, mesh=12, levels=4)
+    k = np.stack(np.meshgrid(*[np.linspace(-0.5, 0.5, 201)] * 2, indexing="ij"), axis=-1).reshape(-1, 2)
+    dense = np.abs(spin_splitting(ham, k)).max()
+    assert result["max_splitting"] == pytest.approx(dense, rel=1e-3)
+    assert result["nodal_pattern"] == "d-wave"
+    assert result["n_evaluated"] < 201 ** 2 / 20
+    # the splitting is odd under a 90 degree rotation
+    rotated = spin_splitting(ham, [result["k_max"][::-1] * [1, -1]])
+    assert np.allclose(rotated, -spin_splitting(ham, [result["k_max"]]))
+
+
+def test_classify_nodal_pattern():
+    assert classify_nodal_pattern(0) == "s-wave"
+    assert classify_nodal_pattern(8) == "g-wave"
+    assert classify_nodal_pattern(12) == "i-wave"
+    assert classify_nodal_pattern(6) == "6 sign changes"
@@ -0,0 +1,60 @@
+import json
+import os
+import numpy as np
+import pytest
+from pyamtb.store import BandStore, solve_to_store
+from pyamtb.tight_binding_model import (create_bloch_hamiltonian, calculate_band_structure, spin_polarization,
+                                        degenerate_spin_pairs, check_flat_bands)
+
+
+@pytest.fixture
+def mn2n_store(mn2n_params, tmp_path):
+    """Bands and eigenvectors of Mn2N on a random k-point set, streamed into a store"""
+    ham = create_bloch_hamiltonian(mn2n_params)
+    k = np.random.default_rng(0).random((50, 2))
+    store = solve_to_store(ham, k, str(tmp_path / "store"), eig_vectors=True, chunk_size=7, metadata={"note": "test"})
+    return ham, k, store
+
+
+def test_store_matches_in_memory_solve(mn2n_store):
+    """Chunked writes reproduce solve_all, and the arrays are opened lazily"""
+    ham, k, store = mn2n_store
+    evals, evecs = ham.solve_all(k, eig_vectors=True)
+    assert store.complete and store.metadata == {"note": "test"}
+    assert isinstance(store.evals, np.memmap) and isinstance(store.evecs, np.memmap)
+    assert np.allclose(store.evals, evals)
+    assert np.allclose(np.abs(np.einsum("nkos,nkos->nk", store.evecs.conj(), evecs)), 1.0)
+    assert np.allclose(store.k_points, k)
+
+
+def test_chunked_analysis_matches_full_arrays(mn2n_store):
+    """Spin projections, degenerate pairs and flat bands agree with the in-memory versions"""
+    _, _, store = mn2n_store
+    spin, norm = spin_polarization(np.asarray(store.evecs))
+    assert np.allclose(store.spin_polarization(chunk_size=9)[0], spin)
+    mask = degenerate_spin_pairs(np.asarray(store.evals), spin, norm, 1e-3)
+    assert np.array_equal(store.degenerate_mask(1e-3, chunk_size=9), mask)
+    assert store.flat_bands(0.5, 5, band_block=4) == check_flat_bands(np.asarray(store.evals), 0.5, 5)
+
+
+def test_parallel_workers_write_disjoint_chunks(mn2n_params, tmp_path):
+    """Worker processes write their chunks directly into the memory-mapped files"""
+    ham = create_bloch_hamiltonian(mn2n_params)
+    k = np.random.default_rng(1).random((40, 2))
+    store = solve_to_store(ham, k, str(tmp_path / "store"), workers=2, chunk_size=6)
+    assert store.evecs is None
+    assert np.allclose(store.evals, ham.solve_all(k))
+
+
+def test_band_calculation_writes_store(mn2n_params, tmp_path):
+    """calculate_band_structure streams into store_dir and records the k-path in the manifest"""
+    mn2n_params.store_dir = str(tmp_path / "bands")
+    mn2n_params.num_k_points = 40
+    calculate_band_structure(create_bloch_hamiltonian(mn2n_params), mn2n_params)
+    store = BandStore(mn2n_params.store_dir)
+    assert store.evals.shape == (6, 40)
+    assert store.metadata["klabel"] == mn2n_params.klabel
+    assert store.metadata["params"]["t0_distance"] == 2.5
+    assert os.path.exists(os.path.join(mn2n_params.store_dir, "degenerate.npy"))
+    with open(os.path.join(mn2n_params.store_dir, "manifest.json")) as f:
+        assert json.load(f)["complete"]
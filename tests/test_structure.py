@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+from pyamtb.read_datas import read_poscar, read_xdatcar
+from pyamtb.structure import load_structure, clear_structure_cache
+import pyamtb.structure as structure
+
+XDATCAR = """Mn2N
+5
+1 0 0
+0 1 0
+0 0 5
+Mn N
+2 1
+Direct configuration=     1
+0.5 0 0.5
+0 0.5 0.5
+0 0 0.5
+Direct configuration=     2
+0.51 0 0.5
+0 0.49 0.5
+0 0 0.52
+Direct configuration=     3
+0.52 0 0.5
+0 0.48 0.5
+0 0 0.54
+"""
+
+CARTESIAN_SELECTIVE = """cartesian
+2.0
+1 0 0
+0 2 0
+0 0 3
+Mn N O
+1 1 1
+Selective dynamics
+Cartesian
+0.5 1.0 1.5 T T F
+1.0 0.5 0.0 F F F
+0.0 0.0 0.0 T T T
+
+  0.0 0.0 0.0
+"""
+
+
+def test_xdatcar_frames(tmp_path):
+    """All frames of a constant-cell XDATCAR load in one pass"""
+    path = tmp_path / "XDATCAR"
+    path.write_text(XDATCAR)
+    data = read_xdatcar(str(path), selected_elements=["N"])
+    assert data["coordinates"].shape == (3, 1, 3)
+    assert np.allclose(data["coordinates"][:, 0, 2], [0.5, 0.52, 0.54])
+    assert data["lattice"].shape == (3, 3, 3) and np.allclose(data["lattice"][2], np.diag([5, 5, 25]))
+    assert read_poscar(str(path))["total_atoms"] == 3
+
+
+def test_variable_cell_xdatcar(tmp_path):
+    """Repeated headers give one lattice per frame"""
+    frame = XDATCAR.split("Direct configuration=     2")[0]
+    second = frame.replace("0 0 5\n", "0 0 6\n").replace("configuration=     1", "configuration=     2")
+    path = tmp_path / "XDATCAR"
+    path.write_text(frame + second)
+    data = read_xdatcar(str(path))
+    assert data["coordinates"].shape == (2, 3, 3)
+    assert np.allclose(data["lattice"][:, 2, 2], [25, 30])
+
+
+def test_cartesian_selective_dynamics(tmp_path):
+    """Selective-dynamics flags and trailing velocity blocks are ignored, Cartesian positions are scaled"""
+    path = tmp_path / "CONTCAR"
+    path.write_text(CARTESIAN_SELECTIVE)
+    data = read_poscar(str(path), selected_elements=["O", "Mn"])
+    assert data["elements"] == ["O", "Mn"] and data["atom_symbols"] == ["Mn", "O"]
+    assert np.allclose(data["coordinates"], [[0.5, 0.5, 0.5], [0.0, 0.0, 0.0]])
+    cart = read_poscar(str(path), to_direct=False)
+    assert np.allclose(cart["coordinates"][1], [2.0, 1.0, 0.0])
+
+
+def test_structure_is_parsed_once(tmp_path, monkeypatch):
+    """Repeated reads of an unchanged file reuse the cached parse, edits invalidate it"""
+    clear_structure_cache()
+    path = tmp_path / "XDATCAR"
+    path.write_text(XDATCAR)
+    calls = []
+    parse = structure.parse_structure
+    monkeypatch.setattr(structure, "parse_structure", lambda *a: calls.append(1) or parse(*a))
+    first = read_poscar(str(path))
+    first["coordinates"] += 1.0
+    assert np.allclose(read_poscar(str(path))["coordinates"][0], [0.5, 0, 0.5])
+    assert len(calls) == 1
+    with pytest.raises(ValueError):
+        load_structure(str(path))["coordinates"][0, 0, 0] = 1.0
+    path.write_text(XDATCAR.replace("0.5 0 0.5", "0.25 0 0.5"))
+    assert np.allclose(read_poscar(str(path))["coordinates"][0], [0.25, 0, 0.5])
+    assert len(calls) == 2
+
+
+def test_parse_error_reports_line(tmp_path, capsys):
+    """Errors name the bad line instead of printing the whole file"""
+    path = tmp_path / "POSCAR"
+    path.write_text(XDATCAR.replace("0 0.5 0.5", "0 x 0.5", 1))
+    with pytest.raises(ValueError, match="第9行"):
+        read_poscar(str(path))
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,31 @@
+import copy
+import numpy as np
+from pyamtb.sweep import parse_values, sweep_band_structure
+from pyamtb.tight_binding_model import create_bloch_hamiltonian
+
+
+def test_parse_values():
+    """Ranges include both end points; lists and scalars are accepted"""
+    assert np.allclose(parse_values("0.5:1.5:3"), [0.5, 1.0, 1.5])
+    assert np.allclose(parse_values("1,2.5"), [1.0, 2.5])
+    assert np.allclose(parse_values(2.0), [2.0])
+
+
+def test_sweep_matches_individual_models(mn2n_params):
+    """Every grid point equals a model built from scratch with the same parameters"""
+    result = sweep_band_structure(mn2n_params, t0=[0.5, 1.0], hopping_decay="0.5:1.5:2", t0_distance=[2.5])
+    assert result["evals"].shape[:3] == (2, 2, 1)
+    for a, t0 in enumerate(result["t0"]):
+        for b, decay in enumerate(result["hopping_decay"]):
+            params = copy.copy(mn2n_params)
+            params.t0, params.lambda_ = t0, decay
+            ham = create_bloch_hamiltonian(params)
+            assert np.allclose(result["evals"][a, b, 0], ham.solve_all(result["k_vec"]))
+
+
+def test_parallel_sweep_matches_serial(mn2n_params):
+    """Parameter points solved in the process pool match the serial sweep"""
+    grid = dict(t0="0.5:1.5:3", hopping_decay=[1.0, 2.0], t0_distance=[2.0, 2.5])
+    serial = sweep_band_structure(mn2n_params, workers=1, **grid)
+    parallel = sweep_band_structure(mn2n_params, workers=2, chunk_size=5, **grid)
+    assert np.allclose(serial["evals"], parallel["evals"])